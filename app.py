@@ -1,18 +1,28 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, g, Response, stream_with_context
 from flask_cors import CORS
 import json
 import os
-import re
-from difflib import SequenceMatcher
-import torch
-from sentence_transformers import SentenceTransformer, util
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import requests
-from email.mime.multipart import MIMEMultipart
+import gc
+from collections import namedtuple
+from semantic import clean_text, split_questions
+from model_loader import LazyLoader
+from query_cache import QueryCache
+from inference import match_questions
+from inference_client import InferenceClient, InferenceUnavailable
+from dataset_store import DatasetStore
+from importer import start_import, get_job, save_upload
 import psycopg2
-from datetime import datetime
+from db import ConnectionPool
+from mail_queue import MailQueue
+from session_store import make_session_store
+from router import IntentRouter
+from availability import AvailabilityIndex, ROOM_COLUMNS, ESTADOS_LIBRES, ESTADOS_NO_RESERVABLES, room_from_row
+from ticket_writer import TicketWriter
+from metrics import (REGISTRY, CONTENT_TYPE, ENABLED as METRICS_ENABLED, CHAT_SECONDS, STAGE_SECONDS,
+                     CHAT_BRANCHES, DB_SECONDS, DB_ERRORS, timed)
+from ticket_queue import ChangeFeed, ESTADOS_ACTIVOS, fetch_queue, fetch_changes, update_status
+from datetime import datetime, date
+import time
 import uuid
 
 
@@ -23,66 +33,176 @@ CORS(app)
 def home():
     return send_file('chatbot.html')
 
+@app.route('/health')
+def health():
+    """El proceso está vivo (no espera al modelo)"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    """Listo para recibir tráfico: el modelo semántico ya está cargado"""
+    if inference_client is not None:
+        if inference_client.ping():
+            return jsonify({'status': 'ready', 'inference': INFERENCE_URL})
+        if not INFERENCE_FALLBACK:
+            return jsonify({'status': 'inference_down', 'inference': INFERENCE_URL}), 503
+    # Sin calentamiento al arrancar, el primer chequeo dispara la carga
+    semantic_model.start_warmup()
+    status = semantic_model.status()
+    code = 200 if status == 'ready' else 503
+    return jsonify({'status': status, 'load_seconds': semantic_model.load_seconds}), code
+
 # Carga del dataset desde archivo JSON
 
 DATA_FILE = os.path.join(os.path.dirname(__file__), 'dataset.json')
 
-def load_dataset():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-DATASET = load_dataset()
-
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r'[¿?¡!.,]', '', text)
-    return text.strip()
-
-
-def split_questions(text):
-    # Dividir por conectores o signos de puntuación
-    parts = re.split(r'\?|y |además|también|,|\.|;', text.lower())
-    # Quitar vacíos y limpiar espacios
-    return [p.strip() for p in parts if len(p.strip()) > 3]
+# Dataset en memoria: solo se relee dataset.json si cambió en disco
+store = DatasetStore(DATA_FILE)
+# Índice id/intent/submenús del dataset, reconstruido en cada cambio
+DATASET, DATASET_INDEX = store.current()[:2]
+# Versión del dataset (igual en todos los workers que leen los mismos archivos)
+DATASET_VERSION = store.current().etag
+
+# Reglas por palabra clave (campo "triggers" del dataset), antes del modelo
+router = IntentRouter(DATASET)
+
+def set_dataset(snapshot):
+    """Publica una versión nueva del dataset y su índice en un solo paso"""
+    global DATASET, DATASET_INDEX, DATASET_VERSION
+    DATASET, DATASET_INDEX, DATASET_VERSION = snapshot.items, snapshot.index, snapshot.etag
+    router.load(DATASET)
+
+def refresh_dataset():
+    """Toma el dataset del disco si otro worker (o alguien fuera de la app)
+    editó el archivo. Se revisa como mucho cada store.check_interval segundos."""
+    if store.refresh():
+        set_dataset(store.current())
+        update_index(lambda index: index.rebuild(DATASET))
 
 # ============================================
-# Conexion a postgreeSQL
-conn = psycopg2.connect(database="Hotel", host='localhost', user="postgres", password="1234", port="5432")
-cur = conn.cursor()
+# Conexion a postgreeSQL (pool: una conexión por petición)
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+DB_PARAMS = dict(database="Hotel", password="1234")
+db_pool = ConnectionPool(min_size=DB_POOL_MIN, max_size=DB_POOL_MAX, **DB_PARAMS)
+
+def get_db():
+    """Conexión de la petición actual (se devuelve al pool al terminar)"""
+    if 'db' not in g:
+        g.db = db_pool.getconn()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.putconn(conn)
 
 # ============================================
 
 # ============================================
 # Chatbot semántico (modelo de comprensión)
 # ============================================
-data = load_dataset()
-questions = [clean_text(item["question"]) for item in data]
-responses = [item["response"] for item in data]
-print("Cargando modelo de comprensión semántica... (esto tarda unos segundos)")
-model = SentenceTransformer("paraphrase-multilingual-mpnet-base-v2")
-embeddings = model.encode(questions, convert_to_tensor=True)
+# El modelo se carga de forma diferida: el menú, /faq y el panel de admin
+# responden sin él. Con MODEL_WARMUP=1 se carga en segundo plano al arrancar.
+MODEL_NAME = "paraphrase-multilingual-mpnet-base-v2"
+# Modo de inferencia: fp32 (por defecto), int8 u onnx
+ENCODER_MODE = os.environ.get('ENCODER_MODE', 'fp32')
+MODEL_WARMUP = os.environ.get('MODEL_WARMUP', '1') == '1'
+# Pre-fork (gunicorn.conf.py): cargar el modelo en el master antes del fork,
+# sin hilo, para que los workers compartan los pesos y los embeddings
+MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '0') == '1'
+
+# Servidor de inferencia aparte (inference_server.py): con INFERENCE_URL los
+# workers web no cargan el modelo; si el servidor no responde y
+# INFERENCE_FALLBACK=1, se carga el modelo local como respaldo
+INFERENCE_URL = os.environ.get('INFERENCE_URL')
+INFERENCE_FALLBACK = os.environ.get('INFERENCE_FALLBACK', '1') == '1'
+inference_client = InferenceClient(INFERENCE_URL) if INFERENCE_URL else None
+
+# Micro-batching: junta los encode de peticiones concurrentes a /chat
+ENCODE_BATCH_WINDOW_MS = float(os.environ.get('ENCODE_BATCH_WINDOW_MS', 5))
+ENCODE_BATCH_MAX = int(os.environ.get('ENCODE_BATCH_MAX', 64))
+
+# items: versión del dataset con la que se construyó el índice
+SemanticEngine = namedtuple('SemanticEngine', ['model', 'index', 'encoder', 'items'])
+
+def load_semantic():
+    # torch y sentence_transformers se importan recién aquí
+    from encoder import load_encoder, cache_name
+    from embedding_index import EmbeddingIndex
+    from batcher import EncodeBatcher
+
+    model = load_encoder(MODEL_NAME, ENCODER_MODE)
+    # Los embeddings se leen del caché en disco; solo se codifican preguntas nuevas.
+    # Los cambios del panel de admin actualizan el índice fila por fila.
+    items = DATASET
+    index = EmbeddingIndex(model, cache_name(MODEL_NAME, ENCODER_MODE), items)
+    encoder = EncodeBatcher(model, window_ms=ENCODE_BATCH_WINDOW_MS, max_batch=ENCODE_BATCH_MAX)
+    return SemanticEngine(model, index, encoder, items)
+
+def catch_up_index(engine):
+    """Si el dataset cambió mientras se cargaba el modelo, reconstruir"""
+    if DATASET is not engine.items:
+        engine.index.rebuild(DATASET)
+
+semantic_model = LazyLoader(load_semantic, name='modelo de comprensión semántica',
+                            on_loaded=catch_up_index)
+if inference_client is not None:
+    pass  # el modelo vive en el servidor de inferencia
+elif MODEL_PRELOAD:
+    semantic_model.get()
+elif MODEL_WARMUP:
+    semantic_model.start_warmup()
+
+def update_index(apply):
+    """Aplica un cambio del admin al índice solo si el modelo ya está
+    cargado; si no, el índice se construirá con el dataset vigente"""
+    engine = semantic_model.peek()
+    if engine is not None:
+        apply(engine.index)
+
+
+# Caché de preguntas repetidas: evita pasar por el modelo
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 10000))
+query_cache = QueryCache(QUERY_CACHE_SIZE)
+
+
+def match_subquestions(subquestions):
+    """[(respuesta, score)] por subpregunta: en el servidor de inferencia si
+    está configurado, o con el modelo de este proceso"""
+    if inference_client is not None:
+        try:
+            with STAGE_SECONDS.time('inference'):
+                return inference_client.match(subquestions)
+        except InferenceUnavailable as e:
+            if not INFERENCE_FALLBACK:
+                raise
+            print("❌ Servidor de inferencia no disponible, usando el modelo local:", e)
+    engine = semantic_model.get()
+    return match_questions(engine.index, engine.encoder, query_cache, subquestions)
 
 
 def get_responses(user_input, threshold=0.5):
-    subquestions = split_questions(user_input)
-    found_responses = []
-
-    for sub in subquestions:
-        sub_clean = clean_text(sub)
-        user_emb = model.encode(sub_clean, convert_to_tensor=True)
-        similarities = util.cos_sim(user_emb, embeddings)
+    with STAGE_SECONDS.time('split_questions'):
+        subquestions = [clean_text(sub) for sub in split_questions(user_input)]
+    found_responses = [response for response, score in match_subquestions(subquestions)
+                       if score >= threshold]
 
-        best_match_index = int(torch.argmax(similarities))
-        best_score = float(similarities[0][best_match_index])
+    return list(dict.fromkeys(found_responses))
 
-        if best_score >= threshold:
-            found_responses.append(responses[best_match_index])
 
-    
-
-    return list(dict.fromkeys(found_responses))
+def iter_responses(user_input, threshold=0.5):
+    """Como get_responses, pero entrega cada respuesta apenas se resuelve
+    su subpregunta (una por una, en orden)"""
+    seen = set()
+    with STAGE_SECONDS.time('split_questions'):
+        subs = split_questions(user_input)
+    for sub in subs:
+        for response, score in match_subquestions([clean_text(sub)]):
+            if score >= threshold and response not in seen:
+                seen.add(response)
+                yield response
 
 # Menú principal estructurado
 MAIN_MENU = {
@@ -96,11 +216,23 @@ MAIN_MENU = {
     "8": {"name": "Reportar un problema", "intent": "quejas"}
 }
 
+# Formularios que abre el enrutador por palabras clave, por intent
+ROUTE_FORMS = {
+    "reserva_info": ("Perfecto 😊 Necesito algunos datos para ayudarte con tu reserva.", 'formulario_fecha'),
+    "quejas": ("Perfecto 😟 Necesito algunos datos para ayudarte con tu queja.", 'formulario_queja'),
+}
+
 # Contexto temporal de usuario (por sesión)
-USER_CONTEXT = {}  # { session_id: { "intent": str, "submenu": list } }
+# { session_id: { "intent": str, "submenu": {"intent": str, "version": str} } }
+# El submenú se guarda como referencia (intent + versión del dataset), no
+# como copia de los items. Las sesiones vencen tras 30 minutos sin uso.
+def make_chat_sessions():
+    return make_session_store('chat', ttl=30 * 60, max_entries=50000)
+
+USER_CONTEXT = make_chat_sessions()
 
 # Funciones auxiliares
-def show_main_menu():
+def render_main_menu():
     menu_text = "🏖️ *Bienvenido al Hotel Paraíso Azul*\n\nSelecciona una opción:\n"
     for key, item in MAIN_MENU.items():
         menu_text += f"{key}. {item['name']}\n"
@@ -108,158 +240,261 @@ def show_main_menu():
     
     return menu_text
 
+# El menú principal no cambia: se renderiza una sola vez
+MAIN_MENU_TEXT = render_main_menu()
+
+def show_main_menu():
+    return MAIN_MENU_TEXT
+
 def show_submenu(intent):
-    items = [it for it in DATASET if it.get('intent') == intent]
-    if not items:
-        return "No hay información disponible para esta sección."
-    submenu_text = f"Has seleccionado '{intent}'. Estas son las opciones disponibles:\n"
-    for idx, it in enumerate(items, start=1):
-        submenu_text += f"{idx}. {it['question']}\n"
-    submenu_text += "\nEscribe el número de la pregunta para ver la respuesta o 'menu' para regresar al inicio."
-    return submenu_text
+    return DATASET_INDEX.submenu_text(intent)
+
+def resolve_submenu(ref):
+    """Items del submenú guardado en la sesión, o None si el dataset cambió
+    desde que se mostró (la numeración podría no coincidir)"""
+    if ref.get('version') != DATASET_VERSION:
+        return None
+    return DATASET_INDEX.items_for(ref['intent'])
 
 # Lógica principal del chatbot
 @app.route('/chat', methods=['POST'])
+@timed(CHAT_SECONDS, 'chat')
 def chat():
-    # Si el usuario está en contexto de contacto directo
-    
     data = request.get_json()
     user_message = data.get('message', '').strip()
     session_id = data.get('session', 'default')
+    return jsonify(chat_step(user_message, session_id) or semantic_reply(user_message, session_id))
+
+@timed(STAGE_SECONDS, 'chat_step')
+def chat_step(user_message, session_id):
+    """Respuesta que no necesita el modelo (menús, submenús, formularios,
+    palabras clave) o None si hay que pasar al modelo semántico"""
+    # Misma versión del dataset que los demás workers: los submenús guardados
+    # en la sesión se comparan contra ella
+    refresh_dataset()
     msg = user_message.lower()
 
     context = USER_CONTEXT.get(session_id, {})
 
     # Si el usuario pide salir
     if msg in ['salir', 'adios', 'gracias']:
+        CHAT_BRANCHES.inc('menu')
         USER_CONTEXT.pop(session_id, None)
-        return jsonify({'reply': "👋 ¡Gracias por visitar el Hotel Paraíso Azul! Esperamos verte pronto.", 'source': 'exit'})
+        return {'reply': "👋 ¡Gracias por visitar el Hotel Paraíso Azul! Esperamos verte pronto.", 'source': 'exit'}
 
     # Si el usuario está en un submenú
     if context.get('submenu'):
-        submenu = context['submenu']
+        CHAT_BRANCHES.inc('submenu')
+        submenu = resolve_submenu(context['submenu'])
 
         if context.get('intent') == 'reserva_info' and msg.isdigit():
             idx = int(msg) - 1
 
             if idx == 1:  
-                return jsonify({
+                return {
                     'reply': "Perfecto 😊 Vamos a iniciar tu reserva.",
                     'source': 'formulario_fecha'
-                })
+                }
         
         if context.get('intent') == 'quejas' and msg.isdigit():
-            return jsonify({
+            return {
                 'reply': "Vamos a registrar tu queja.",
                 'source': "formulario_queja"
-            })
+            }
 
 
         if msg.isdigit():
+            if submenu is None:
+                # El dataset cambió: mostrar el submenú actualizado
+                intent = context['submenu']['intent']
+                USER_CONTEXT[session_id] = {"intent": intent, "submenu": {"intent": intent, "version": DATASET_VERSION}}
+                return {'reply': "El menú se actualizó.\n\n" + show_submenu(intent), 'source': 'submenu'}
             idx = int(msg) - 1
             if 0 <= idx < len(submenu):
                 item = submenu[idx]
-                return jsonify({'reply': item['response'], 'source': 'submenu'})
+                return {'reply': item['response'], 'source': 'submenu'}
             else:
-                return jsonify({'reply': "Opción no válida. Intenta de nuevo.", 'source': 'submenu'})
+                return {'reply': "Opción no válida. Intenta de nuevo.", 'source': 'submenu'}
         elif msg in ['menu', 'inicio']:
             USER_CONTEXT.pop(session_id, None)
-            return jsonify({'reply': show_main_menu(), 'source': 'menu'})
+            return {'reply': show_main_menu(), 'source': 'menu'}
         else:
-            return jsonify({'reply': "Por favor, selecciona un número válido o escribe 'menu' para regresar.", 'source': 'submenu'})
+            return {'reply': "Por favor, selecciona un número válido o escribe 'menu' para regresar.", 'source': 'submenu'}
 
     # Si el usuario saluda o pide el menú
     if msg in ['hola', 'buenos días', 'buenas tardes', 'menu', 'inicio']:
+        CHAT_BRANCHES.inc('menu')
         USER_CONTEXT.pop(session_id, None)
-        return jsonify({'reply': show_main_menu(), 'source': 'menu'})
+        return {'reply': show_main_menu(), 'source': 'menu'}
 
     # Si el usuario está en contexto de contacto directo
     if context.get('intent') == 'contacto_directo':
+        # Respuesta a la pregunta del fallback
+        CHAT_BRANCHES.inc('fallback')
         if msg in ['sí', 'si', 'claro', 'ok', 'quiero']:
             USER_CONTEXT.pop(session_id, None)
-            return jsonify({
+            return {
                 'reply': "Abriendo formulario de contacto...",
                 'source': 'formulario',
                 'form': '/formulario_contacto'
-            })
+            }
 
         elif msg in ['no', 'nah', 'no gracias']:
             # Reinicia el chatbot completamente
             USER_CONTEXT.pop(session_id, None)
-            return jsonify({
+            return {
                 'reply': "Entendido 😊. Volviendo al menú principal...\n\n" + show_main_menu(),
                 'source': 'menu'
-            })
+            }
 
         else:
-            return jsonify({
+            return {
                 'reply': "¿Quieres contactar directamente con el personal del hotel? (Responde 'sí' o 'no')",
                 'source': 'confirmacion'
-            })
-
-    # Detectar si el usuario quiere hacer una reserva
-    if any(p in msg for p in ["reservar", "quiero hacer una reserva", "hacer una reserva", "quiero reservar", "reserva"]):
-        return jsonify({
-            'reply': "Perfecto 😊 Necesito algunos datos para ayudarte con tu reserva.",
-            'source': 'formulario_fecha'
-    })
-    
-    # Detectar si el usuario quiere hacer una queja
-    if any(p in msg for p in [
-        "queja", "quejas", "poner una queja", "hacer una queja",
-        "quiero quejarme", "reclamo", "reclamos", "reportar un problema",
-        "hacer un reclamo", "reclamar", "reclamación", "problema", "Quiero reportar un problema"
-    ]):
-        return jsonify({
-            'reply': "Perfecto 😟 Necesito algunos datos para ayudarte con tu queja.",
-            'source': "formulario_queja"
-        })
-
+            }
+
+    # Detectar por palabras clave si el usuario quiere reservar, quejarse, etc.
+    with STAGE_SECONDS.time('router'):
+        route = router.route(user_message)
+    if route:
+        CHAT_BRANCHES.inc('keyword')
+        if route.intent in ROUTE_FORMS:
+            reply, source = ROUTE_FORMS[route.intent]
+            return {'reply': reply, 'source': source}
+        # Intent sin formulario: mostrar su submenú
+        dataset_index, version = DATASET_INDEX, DATASET_VERSION
+        USER_CONTEXT[session_id] = {"intent": route.intent, "submenu": {"intent": route.intent, "version": version}}
+        return {'reply': dataset_index.submenu_text(route.intent), 'source': 'submenu'}
 
 
     # Si elige una opción del menú principal
     if msg in MAIN_MENU:
+        CHAT_BRANCHES.inc('menu')
         intent = MAIN_MENU[msg]['intent']
-        items = [it for it in DATASET if it.get('intent') == intent]
-        USER_CONTEXT[session_id] = {"intent": intent, "submenu": items}
-        reply = show_submenu(intent)
-        return jsonify({'reply': reply, 'source': 'submenu'})
+        dataset_index, version = DATASET_INDEX, DATASET_VERSION
+        if dataset_index.items_for(intent):
+            USER_CONTEXT[session_id] = {"intent": intent, "submenu": {"intent": intent, "version": version}}
+        else:
+            USER_CONTEXT[session_id] = {"intent": intent}
+        reply = dataset_index.submenu_text(intent)
+        return {'reply': reply, 'source': 'submenu'}
 
     if msg == "8":  
-        return jsonify({
+        CHAT_BRANCHES.inc('menu')
+        return {
             'reply': "Vamos a registrar tu queja.",
             'source': "formulario_queja"
-        })
+        }
 
 
-    
-   # Si no coincide con ninguna opción, usa el modelo semántico
+    # Si no coincide con ninguna opción, usa el modelo semántico
+    return None
+
+def semantic_reply(user_message, session_id):
+    """Respuesta con el modelo semántico (lo único lento del chat)"""
     semantic_responses = get_responses(user_message)
     if semantic_responses:
-        reply_text = "\n".join(semantic_responses)
-    
-    else:
-        USER_CONTEXT[session_id] = {"intent": "contacto_directo"}
-        reply_text = "Lo siento, no estoy seguro de entenderte. 😕 ¿Quieres contactar directamente con el personal del hotel? (Responde 'si' o 'no')"
-    
-    return jsonify({'reply': reply_text, 'source': 'semantic'})
+        CHAT_BRANCHES.inc('semantic')
+        return {'reply': "\n".join(semantic_responses), 'source': 'semantic'}
+    return no_match_reply(session_id)
+
+def no_match_reply(session_id):
+    CHAT_BRANCHES.inc('fallback')
+    USER_CONTEXT[session_id] = {"intent": "contacto_directo"}
+    reply_text = "Lo siento, no estoy seguro de entenderte. 😕 ¿Quieres contactar directamente con el personal del hotel? (Responde 'si' o 'no')"
+    return {'reply': reply_text, 'source': 'semantic'}
+
+
+# Streaming: cada respuesta se envía como evento SSE apenas se resuelve su
+# subpregunta, sin esperar a las demás
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def chat_events(user_message, session_id):
+    """Eventos de /chat/stream: un 'answer' por respuesta y un 'done' al final"""
+    with CHAT_SECONDS.time('stream'):
+        reply = chat_step(user_message, session_id)
+        if reply is not None:
+            yield sse('answer', reply)
+            yield sse('done', {'source': reply['source'], 'answers': 1})
+            return
+
+        answers = 0
+        for response in iter_responses(user_message):
+            answers += 1
+            yield sse('answer', {'reply': response, 'source': 'semantic'})
+        if answers:
+            CHAT_BRANCHES.inc('semantic')
+        else:
+            yield sse('answer', no_match_reply(session_id))
+        yield sse('done', {'source': 'semantic', 'answers': answers})
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.get_json()
+    user_message = data.get('message', '').strip()
+    session_id = data.get('session', 'default')
+    return Response(stream_with_context(chat_events(user_message, session_id)),
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+
+# Configuración del servidor SMTP de Gmail
+SMTP_SERVER = "smtp.gmail.com"
+SMTP_PORT = 587
+REMITENTE = "www.lui81@gmail.com"
+SMTP_PASSWORD = "orcl xqap lsua ikou"
+DESTINATARIO_CONTACTO = "contactohotelparaiso@gmail.com"
 
+# Cola de correos: el envío real ocurre en segundo plano
+MAIL_QUEUE_DB = os.path.join(os.path.dirname(__file__), 'mail_queue.db')
+def make_mail_queue():
+    queue = MailQueue(MAIL_QUEUE_DB, SMTP_SERVER, SMTP_PORT, REMITENTE, SMTP_PASSWORD)
+    queue.start()
+    return queue
+
+mail_queue = make_mail_queue()
+
+
+# ============================================
+# Pre-fork (gunicorn con preload_app, ver gunicorn.conf.py)
+# ============================================
+def before_fork():
+    """En el master, antes de crear los workers: soltar lo que no se puede
+    compartir entre procesos y congelar el heap ya cargado"""
+    db_pool.closeall()
+    mail_queue.close()
+    USER_CONTEXT.close()
+    ADMIN_TOKENS.close()
+    if ticket_writer:
+        ticket_writer.close()
+    REGISTRY.stop_export()
+    # Los objetos creados hasta aquí (modelo, dataset, índices) pasan a la
+    # generación permanente: el GC de los workers no los recorre y no
+    # ensucia sus páginas compartidas
+    gc.collect()
+    gc.freeze()
+
+def after_fork(torch_threads=None):
+    """En cada worker: hilos y conexiones propias"""
+    global mail_queue, ticket_writer, USER_CONTEXT, ADMIN_TOKENS
+    mail_queue = make_mail_queue()
+    ticket_writer = make_ticket_writer()
+    # Con SESSION_BACKEND=sqlite cada worker abre su conexión al mismo archivo
+    USER_CONTEXT = make_chat_sessions()
+    ADMIN_TOKENS = make_admin_tokens()
+    # Lo que midió el master queda en su archivo; el worker arranca de cero
+    REGISTRY.reset()
+    REGISTRY.start_export()
+    if torch_threads and semantic_model.ready:
+        import torch
+        torch.set_num_threads(torch_threads)
 
 
 def enviar_correo(nombre, correo, mensaje):
     try:
-        # Configuración del servidor SMTP de Gmail
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        remitente = "www.lui81@gmail.com"  
-        password = "orcl xqap lsua ikou"  
-
-        # Crear mensaje
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = f"Nuevo mensaje de contacto - {nombre}"
-        msg["From"] = remitente
-        msg["To"] = "contactohotelparaiso@gmail.com"
-
         # Cuerpo del correo
         html = f"""
         <html>
@@ -272,19 +507,16 @@ def enviar_correo(nombre, correo, mensaje):
           </body>
         </html>
         """
-        msg.attach(MIMEText(html, "html"))
 
-        # Enviar correo
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(remitente, password)
-            server.sendmail(remitente, msg["To"], msg.as_string())
+        # Encolar correo (se envía en segundo plano, con reintentos)
+        mail_queue.enqueue(REMITENTE, DESTINATARIO_CONTACTO,
+                           f"Nuevo mensaje de contacto - {nombre}", html)
 
-        print("✅ Correo enviado correctamente")
+        print("✅ Correo encolado correctamente")
         return True
 
     except Exception as e:
-        print("❌ Error al enviar correo:", e)
+        print("❌ Error al encolar correo:", e)
         return False
 
 
@@ -300,37 +532,130 @@ def enviar_contacto():
     else:
         return jsonify({'reply': '❌ Hubo un problema al enviar tu mensaje. Intenta más tarde.'})
 
-def generar_codigo_ticket():
-    try:
-        cur.execute("SELECT codigo_ticket FROM tickets ORDER BY id_ticket DESC LIMIT 1")
-        row = cur.fetchone()
-
-        if row and row[0]:
-            ultimo_num = int(row[0].split('-')[1])
-            nuevo_num = ultimo_num + 1
-        else:
-            nuevo_num = 1
-
-        return f"Res-{nuevo_num:03d}"  
-    except Exception as e:
-        print("❌ Error generando código:", e)
-        return "Res-000"  
+# Inserts de tickets (también los usa asgi.py con el driver async)
+SQL_INSERT_QUEJA = """
+    INSERT INTO tickets (
+        codigo_ticket, nombre_cliente, telefono_cliente, correo_cliente, estado, fecha_creacion, mensaje
+    )
+    VALUES (siguiente_codigo_ticket('QJ', 'tickets_qj_seq'), %s, %s, %s, %s, %s, %s)
+    RETURNING codigo_ticket
+"""
+
+SQL_INSERT_RESERVA = """
+    INSERT INTO tickets (
+        codigo_ticket, nombre_cliente, telefono_cliente, correo_cliente,
+        fecha_entrada, fecha_salida, estado, fecha_creacion, id_habitacion
+    )
+    VALUES (siguiente_codigo_ticket('Res', 'tickets_res_seq'), %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING codigo_ticket
+"""
+
+SQL_BLOQUEAR_HABITACION = "SELECT estado FROM habitaciones WHERE id_habitacion = %s FOR UPDATE"
+
+# ¿La habitación tiene otra reserva que se cruza con [entrada, salida)?
+# Parámetros: id_habitacion, estados libres (lista), salida, entrada
+SQL_RESERVA_SOLAPADA = """
+    SELECT 1 FROM tickets
+    WHERE id_habitacion = %s AND estado <> ALL(%s)
+      AND fecha_entrada < %s AND fecha_salida > %s
+    LIMIT 1
+"""
+
+RESERVA_FECHAS_INVALIDAS = "❌ Las fechas no son válidas: la salida debe ser posterior a la entrada."
+RESERVA_SIN_HABITACIONES = "😕 No hay habitaciones disponibles para esas fechas. Prueba con otras fechas o escríbenos."
+RESERVA_ERROR = "❌ Hubo un problema al registrar tu reserva. Intenta más tarde."
 
-def generar_codigo_ticket_queja():
+# ============================================
+# Disponibilidad de habitaciones (índice en memoria, ver availability.py)
+# ============================================
+AVAILABILITY_REFRESH = float(os.environ.get('AVAILABILITY_REFRESH', 5))
+ROOM_CANDIDATES = 5  # Habitaciones a intentar si otro proceso toma la primera
+availability = AvailabilityIndex()
+availability_checked = 0.0
+
+def refresh_availability(force=False):
+    """Trae de la base los tickets cambiados desde la última consulta
+    (como mucho cada AVAILABILITY_REFRESH segundos)"""
+    global availability_checked
+    now = time.monotonic()
+    if not force and now - availability_checked < AVAILABILITY_REFRESH:
+        return
+    availability_checked = now
     try:
-        cur.execute("SELECT codigo_ticket FROM tickets ORDER BY id_ticket DESC LIMIT 1")
-        row = cur.fetchone()
-
-        if row and row[0]:
-            ultimo_num = int(row[0].split('-')[1])
-            nuevo_num = ultimo_num + 1
-        else:
-            nuevo_num = 1
-
-        return f"QJ-{nuevo_num:03d}"  
+        with DB_SECONDS.time('availability_sync'), db_pool.connection() as conn:
+            availability.sync(conn)
     except Exception as e:
-        print("❌ Error generando código:", e)
-        return "QJ-000"  
+        DB_ERRORS.inc('availability_sync')
+        print("❌ Error actualizando la disponibilidad:", e)
+
+def room_reservable(room_id, locked):
+    """¿La fila bloqueada (estado,) se puede reservar? Si la habitación se
+    borró o pasó a mantenimiento después de cargar el índice, lo corrige"""
+    if locked is None:
+        availability.remove_room(room_id)
+        return False
+    if locked[0] in ESTADOS_NO_RESERVABLES:
+        room = availability.rooms.get(room_id)
+        if room is not None:
+            availability.set_room(dict(room, estado=locked[0]))
+        return False
+    return True
+
+# ============================================
+# Escritura diferida de tickets (opcional, ver ticket_writer.py)
+# ============================================
+TICKET_WRITE_BEHIND = os.environ.get('TICKET_WRITE_BEHIND', '0') == '1'
+TICKET_WRITER_DB = os.environ.get('TICKET_WRITER_DB', os.path.join(os.path.dirname(__file__), 'ticket_writer.db'))
+TICKET_FLUSH_MS = float(os.environ.get('TICKET_FLUSH_MS', 50))
+
+def tickets_flushed(rows):
+    """Reservas ya en PostgreSQL: en el índice pasan de id_envio a su código
+    (o se sueltan si otro proceso tomó la habitación)"""
+    for row in rows:
+        if row['tipo'] != 'reserva':
+            continue
+        datos = row['datos']
+        availability.remove_booking(row['id_envio'])
+        if row['habitacion'] is not None:
+            availability.put_booking(row['codigo'], row['habitacion'], datos['entrada'], datos['salida'])
+
+def make_ticket_writer():
+    if not TICKET_WRITE_BEHIND:
+        return None
+    writer = TicketWriter(TICKET_WRITER_DB, db_pool, on_flushed=tickets_flushed, window_ms=TICKET_FLUSH_MS)
+    writer.start()
+    return writer
+
+ticket_writer = make_ticket_writer()
+
+def encolar_queja(data):
+    """Modo write-behind de /enviar-queja (también lo usa asgi.py)"""
+    nombre = data.get("nombre")
+    _, codigo = ticket_writer.enqueue('queja', {
+        'nombre': nombre, 'telefono': data.get("telefono"), 'correo': data.get("correo"),
+        'estado': "pendiente", 'creado': datetime.now().isoformat(), 'mensaje': data.get("motivo"),
+    })
+    return {"reply": f"✔ Gracias {nombre}, tu queja fue registrada.", "codigo": codigo}
+
+def encolar_reserva(data, libres):
+    """Modo write-behind de /enviar-fecha: la habitación se aparta en el
+    índice y se confirma al escribir el lote (también lo usa asgi.py)"""
+    fecha_inicio, fecha_final = data.get('fecha_inicio'), data.get('fecha_final')
+    id_envio = uuid.uuid4().hex
+    room = next((room for room in libres
+                 if availability.claim(id_envio, room['id_habitacion'], fecha_inicio, fecha_final)), None)
+    if room is None:
+        return {'reply': RESERVA_SIN_HABITACIONES, 'codigo': None, 'disponible': False}
+    _, codigo = ticket_writer.enqueue('reserva', {
+        'nombre': data.get('nombre'), 'telefono': data.get('numero'), 'correo': data.get('correo'),
+        'entrada': fecha_inicio, 'salida': fecha_final, 'estado': "pendiente",
+        'creado': datetime.now().isoformat(), 'habitacion': room['id_habitacion'],
+    }, id_envio=id_envio)
+    return {
+        'reply': "📅 Tu solicitud de reserva fue recibida. El personal del hotel te contactará pronto "
+                 "para confirmar tu habitación.",
+        'codigo': codigo
+    }
 
 @app.post("/enviar-queja")
 def enviar_queja():
@@ -343,27 +668,32 @@ def enviar_queja():
     print("📩 Nueva reserva recibida:")
     print(data)
 
-    codigo = generar_codigo_ticket_queja()   
+    if ticket_writer:
+        return jsonify(encolar_queja(data))
+
     estado = "pendiente"
     fecha_creacion = datetime.now()
+    codigo = None
+    conn = get_db()
     try:
-        cur.execute("""
-            INSERT INTO tickets (
-                codigo_ticket, nombre_cliente, telefono_cliente, correo_cliente, estado, fecha_creacion, mensaje
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            codigo, nombre, telefono, correo,
-            estado, fecha_creacion, motivo
-        ))
-        conn.commit()
+        # El código sale de la secuencia de quejas dentro del mismo INSERT
+        # (ver migrations/001_ticket_sequences.sql)
+        with DB_SECONDS.time('insert_queja'):
+            cur = conn.cursor()
+            cur.execute(SQL_INSERT_QUEJA, (
+                nombre, telefono, correo,
+                estado, fecha_creacion, motivo
+            ))
+            codigo = cur.fetchone()[0]
+            conn.commit()
 
     except Exception as e:
+        DB_ERRORS.inc('insert_queja')
         conn.rollback()
         print("❌ Error guardando en PostgreSQL:", e)
 
     # Aquí podrías guardar en DB o enviar correo
-    return jsonify({"reply": f"✔ Gracias {nombre}, tu queja fue registrada."})
+    return jsonify({"reply": f"✔ Gracias {nombre}, tu queja fue registrada.", "codigo": codigo})
 
 
 
@@ -380,62 +710,114 @@ def enviar_fecha():
     print("📩 Nueva reserva recibida:")
     print(data)
 
-    codigo = generar_codigo_ticket()   
+    # Candidatas según el índice en memoria; la base tiene la última palabra
+    refresh_availability()
+    try:
+        libres = availability.free_rooms(fecha_inicio, fecha_final, capacidad=data.get('personas'),
+                                         limit=ROOM_CANDIDATES)
+    except (TypeError, ValueError):
+        return jsonify({'reply': RESERVA_FECHAS_INVALIDAS, 'codigo': None})
+    if not libres:
+        return jsonify({'reply': RESERVA_SIN_HABITACIONES, 'codigo': None, 'disponible': False})
+    if ticket_writer:
+        return jsonify(encolar_reserva(data, libres))
+
     estado = "pendiente"
     fecha_creacion = datetime.now()
 
-    try:
-        cur.execute("""
-            INSERT INTO tickets (
-                codigo_ticket, nombre_cliente, telefono_cliente, correo_cliente,
-                fecha_entrada, fecha_salida, estado, fecha_creacion
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            codigo, nombre, numero, correo,
-            fecha_inicio, fecha_final,
-            estado, fecha_creacion
-        ))
-        conn.commit()
-
-    except Exception as e:
-        conn.rollback()
-        print("❌ Error guardando en PostgreSQL:", e)
+    conn = get_db()
+    for room in libres:
+        room_id = room['id_habitacion']
+        try:
+            # Un solo viaje a la base: el código sale de la secuencia de reservas.
+            # La habitación queda bloqueada hasta el commit, así dos reservas
+            # simultáneas no pueden tomar las mismas noches.
+            with DB_SECONDS.time('reserva'):
+                cur = conn.cursor()
+                cur.execute(SQL_BLOQUEAR_HABITACION, (room_id,))
+                locked = cur.fetchone()
+                if not room_reservable(room_id, locked):
+                    conn.rollback()
+                    continue
+                cur.execute(SQL_RESERVA_SOLAPADA, (room_id, list(ESTADOS_LIBRES), fecha_final, fecha_inicio))
+                if cur.fetchone():
+                    # Otro proceso la tomó y el índice aún no lo sabe
+                    conn.rollback()
+                    continue
+                cur.execute(SQL_INSERT_RESERVA, (
+                    nombre, numero, correo,
+                    fecha_inicio, fecha_final,
+                    estado, fecha_creacion, room_id
+                ))
+                codigo = cur.fetchone()[0]
+                conn.commit()
+        except Exception as e:
+            DB_ERRORS.inc('reserva')
+            conn.rollback()
+            print("❌ Error guardando en PostgreSQL:", e)
+            return jsonify({'reply': RESERVA_ERROR, 'codigo': None})
+
+        availability.put_booking(codigo, room_id, fecha_inicio, fecha_final)
+        return jsonify({
+            'reply': f"📅 Tu solicitud de reserva fue enviada correctamente (habitación {room['numero_habitacion']}). "
+                     "El personal del hotel te contactará pronto.",
+            'codigo': codigo,
+            'habitacion': room['numero_habitacion']
+        })
 
-    return jsonify({
-        'reply': '📅 Tu solicitud de reserva fue enviada correctamente. El personal del hotel te contactará pronto.'
-    })
+    refresh_availability(force=True)
+    return jsonify({'reply': RESERVA_SIN_HABITACIONES, 'codigo': None, 'disponible': False})
 
 
 
 #  Endpoints adicionales opcionales (debug/consulta)
 @app.route('/menu', methods=['GET'])
 def menu():
-    intents = {}
-    for item in DATASET:
-        intent = item.get('intent', 'general')
-        intents[intent] = intents.get(intent, 0) + 1
-    menu_list = [{'intent': k, 'count': v} for k, v in intents.items()]
-    return jsonify({'menu': menu_list})
+    return jsonify({'menu': DATASET_INDEX.menu})
 
 @app.route('/menu/<intent>', methods=['GET'])
 def menu_intent(intent):
-    items = [{'id': it['id'], 'question': it['question']} for it in DATASET if it.get('intent') == intent]
+    items = DATASET_INDEX.menu_items.get(intent, [])
     return jsonify({'intent': intent, 'items': items})
 
 @app.route('/faq/<int:item_id>', methods=['GET'])
 def faq(item_id):
-    for it in DATASET:
-        if int(it.get('id')) == int(item_id):
-            return jsonify({'id': it.get('id'), 'question': it.get('question'), 'answer': it.get('response')})
+    it = DATASET_INDEX.get(item_id)
+    if it:
+        return jsonify({'id': it.get('id'), 'question': it.get('question'), 'answer': it.get('response')})
     return jsonify({'error': 'not found'}), 404
 
+# ============================================
+# Métricas (formato de texto de Prometheus, ver metrics.py)
+# ============================================
+# Se leen al momento del scrape; mail_queue y ticket_writer se recrean tras el fork
+REGISTRY.gauge('hotel_db_pool_connections', 'Conexiones del pool de PostgreSQL', lambda: {
+    (estado,): db_pool.stats()[estado] for estado in ('in_use', 'idle')}, ('estado',))
+REGISTRY.gauge('hotel_mail_queue_pending', 'Correos esperando en la cola',
+               lambda: mail_queue.stats().get('pendiente', 0))
+REGISTRY.gauge('hotel_ticket_writer_pending', 'Tickets en la cola de escritura diferida',
+               lambda: ticket_writer.stats()['pendientes'] if ticket_writer else None)
+REGISTRY.gauge('hotel_ticket_writer_lag_seconds', 'Antigüedad del ticket más viejo sin escribir en PostgreSQL',
+               lambda: ticket_writer.stats()['lag_s'] if ticket_writer else None)
+REGISTRY.gauge('hotel_model_ready', '1 si el modelo semántico ya está cargado', lambda: int(semantic_model.ready))
+# Con METRICS_DIR (varios workers) /metrics suma los valores de todos
+REGISTRY.start_export()
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'not found'}), 404
+    return Response(REGISTRY.render(), headers={'Content-Type': CONTENT_TYPE})
+
 # ============================================
 # PANEL DE ADMINISTRADOR
 # ============================================
 
 ADMIN_PASSWORD = 'admin123'  # Contraseña por defecto
-ADMIN_TOKENS = {}  # Token temporal para sesiones
+def make_admin_tokens():
+    return make_session_store('admin', ttl=8 * 60 * 60)  # Token temporal para sesiones (8 h)
+
+ADMIN_TOKENS = make_admin_tokens()
 
 def verify_admin_token(token):
     """Verifica si el token es válido"""
@@ -468,118 +850,345 @@ def admin_panel():
 
 @app.route('/admin/stats', methods=['GET'])
 def admin_stats():
-    """Retorna estadísticas del dataset"""
-    global DATASET
-    DATASET = load_dataset()
-    
-    intents = set(item.get('intent', 'general') for item in DATASET)
-    last_modified = os.path.getmtime(DATA_FILE)
-    from datetime import datetime
-    last_mod_date = datetime.fromtimestamp(last_modified).strftime('%Y-%m-%d %H:%M:%S')
-    
-    return jsonify({
-        'total_items': len(DATASET),
-        'unique_intents': len(intents),
-        'last_modified': last_mod_date
-    })
+    """Retorna estadísticas del dataset (calculadas una vez por versión)"""
+    refresh_dataset()
+    return jsonify(store.current().stats)
+
+@app.route('/admin/inference-stats', methods=['GET'])
+def admin_inference_stats():
+    """Retorna métricas del micro-batching y del caché de preguntas"""
+    engine = semantic_model.peek()
+    return jsonify({'model': semantic_model.status(),
+                    'batcher': engine.encoder.stats() if engine else None,
+                    'inference': inference_client.stats() if inference_client else None,
+                    'query_cache': query_cache.stats(),
+                    'sessions': USER_CONTEXT.stats(), 'router': router.stats()})
+
+@app.route('/admin/db-stats', methods=['GET'])
+def admin_db_stats():
+    """Métricas del pool de PostgreSQL (tamaño, espera, reconexiones)"""
+    return jsonify(db_pool.stats())
+
+@app.route('/admin/mail-queue', methods=['GET'])
+def admin_mail_queue():
+    """Estado de la cola de correos y mensajes que no se pudieron enviar"""
+    return jsonify({'stats': mail_queue.stats(), 'dead_letters': mail_queue.dead_letters()})
+
+@app.route('/admin/mail-queue/retry', methods=['POST'])
+def admin_mail_queue_retry():
+    """Reencola los mensajes de la dead-letter"""
+    return jsonify({'success': True, 'requeued': mail_queue.retry_dead()})
+
+@app.route('/admin/ticket-writer', methods=['GET'])
+def admin_ticket_writer():
+    """Cola de escritura diferida: pendientes, lag y tickets rechazados"""
+    if not ticket_writer:
+        return jsonify({'activo': False})
+    return jsonify({'activo': True, 'stats': ticket_writer.stats(), 'dead_letters': ticket_writer.dead_letters()})
+
+@app.route('/admin/ticket-writer/retry', methods=['POST'])
+def admin_ticket_writer_retry():
+    """Reencola los tickets rechazados"""
+    if not ticket_writer:
+        return jsonify({'success': False, 'error': 'TICKET_WRITE_BEHIND no está activo'}), 400
+    return jsonify({'success': True, 'requeued': ticket_writer.retry_dead()})
 
 @app.route('/admin/items', methods=['GET'])
 def admin_get_items():
-    """Retorna todos los items del dataset"""
-    global DATASET
-    DATASET = load_dataset()
-    return jsonify({'items': DATASET})
+    """Retorna los items del dataset, opcionalmente paginados
+    (?page=1&per_page=50). Responde 304 si el ETag no cambió."""
+    refresh_dataset()
+    snap = store.current()
+
+    if snap.etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(snap.etag)
+        return response
+
+    page = request.args.get('page', type=int)
+    if page:
+        per_page = max(1, min(request.args.get('per_page', 50, type=int), 500))
+        start = (max(page, 1) - 1) * per_page
+        response = jsonify({
+            'items': snap.items[start:start + per_page],
+            'total': len(snap.items),
+            'page': max(page, 1),
+            'per_page': per_page
+        })
+    else:
+        response = jsonify({'items': snap.items})
+
+    response.set_etag(snap.etag)
+    return response
 
 @app.route('/admin/add-item', methods=['POST'])
 def admin_add_item():
     """Agrega un nuevo item al dataset"""
-    global DATASET, embeddings, questions, responses, model
-    
     data = request.get_json()
     
     # Validar datos
     if not data.get('id') or not data.get('question') or not data.get('response'):
         return jsonify({'success': False, 'error': 'Faltan campos requeridos'}), 400
     
-    # Verificar que el ID sea único
-    if any(item['id'] == data['id'] for item in DATASET):
-        return jsonify({'success': False, 'error': 'El ID ya existe'}), 400
-    
     new_item = {
         'id': data['id'],
         'question': data['question'],
         'response': data['response'],
         'intent': data.get('intent', 'general')
     }
+    if data.get('triggers'):
+        new_item['triggers'] = data['triggers']
     
-    DATASET.append(new_item)
-    
-    # Guardar cambios
-    save_dataset()
+    # Guardar cambios (verifica que el ID sea único)
+    if not store.add_item(new_item):
+        return jsonify({'success': False, 'error': 'El ID ya existe'}), 400
+    set_dataset(store.current())
     
-    # Recargar modelo
-    reload_model()
+    # Codificar solo la pregunta nueva
+    update_index(lambda index: index.add(new_item))
     
     return jsonify({'success': True, 'message': 'Item agregado exitosamente'})
 
 @app.route('/admin/update-item', methods=['POST'])
 def admin_update_item():
     """Actualiza un item existente"""
-    global DATASET, embeddings, questions, responses, model
-    
     data = request.get_json()
     item_id = data.get('id')
     
     # Buscar y actualizar el item
-    for item in DATASET:
-        if item['id'] == item_id:
-            item['question'] = data.get('question', item['question'])
-            item['response'] = data.get('response', item['response'])
-            item['intent'] = data.get('intent', item.get('intent', 'general'))
-            
-            # Guardar cambios
-            save_dataset()
-            
-            # Recargar modelo
-            reload_model()
-            
-            return jsonify({'success': True, 'message': 'Item actualizado exitosamente'})
+    changes = {key: data[key] for key in ('question', 'response', 'intent', 'triggers') if key in data}
+    item = store.update_item(item_id, changes)
+    if item is None:
+        return jsonify({'success': False, 'error': 'Item no encontrado'}), 404
+    set_dataset(store.current())
+    
+    # Recodificar solo si cambió la pregunta
+    update_index(lambda index: index.update(item))
     
-    return jsonify({'success': False, 'error': 'Item no encontrado'}), 404
+    return jsonify({'success': True, 'message': 'Item actualizado exitosamente'})
 
 @app.route('/admin/delete-item', methods=['POST'])
 def admin_delete_item():
     """Elimina un item del dataset"""
-    global DATASET, embeddings, questions, responses, model
-    
     data = request.get_json()
     item_id = data.get('id')
     
     # Buscar y eliminar el item
-    for i, item in enumerate(DATASET):
-        if item['id'] == item_id:
-            DATASET.pop(i)
-            
-            # Guardar cambios
-            save_dataset()
-            
-            # Recargar modelo
-            reload_model()
-            
-            return jsonify({'success': True, 'message': 'Item eliminado exitosamente'})
+    if not store.delete_item(item_id):
+        return jsonify({'success': False, 'error': 'Item no encontrado'}), 404
+    set_dataset(store.current())
     
-    return jsonify({'success': False, 'error': 'Item no encontrado'}), 404
+    # Quitar la fila del índice
+    update_index(lambda index: index.delete(item_id))
+    
+    return jsonify({'success': True, 'message': 'Item eliminado exitosamente'})
+
+# ============================================
+# Cola de tickets (paginada por cursor, ver ticket_queue.py)
+# ============================================
+TICKETS_FEED_WAIT = 25  # Segundos máximos de un long-poll de /admin/tickets/changes
+ticket_feed = ChangeFeed(db_pool)
+
+@app.route('/admin/tickets/pending', methods=['GET'])
+def admin_tickets_pending():
+    """Tickets activos de a páginas: ?limit=50&cursor=<next_cursor de la página
+    anterior>, opcional ?estado=pendiente,en_proceso. La primera página trae el total."""
+    estados = request.args.get('estado')
+    estados = estados.split(',') if estados else ESTADOS_ACTIVOS
+    cursor = request.args.get('cursor')
+    conn = get_db()
+    try:
+        with DB_SECONDS.time('tickets_pending'):
+            page = fetch_queue(conn, estados, cursor, request.args.get('limit', 50, type=int), with_count=not cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        DB_ERRORS.inc('tickets_pending')
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(dict(page, success=True))
+
+@app.route('/admin/tickets/update-status', methods=['POST'])
+def admin_tickets_update_status():
+    """Cambia el estado de uno ({"id_ticket": 5}) o varios ({"ids": [5, 6]}) tickets"""
+    data = request.get_json()
+    ids = data.get('ids') or ([data['id_ticket']] if data.get('id_ticket') is not None else [])
+    conn = get_db()
+    try:
+        with DB_SECONDS.time('tickets_update_status'):
+            rows = update_status(conn, ids, data.get('estado'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        DB_ERRORS.inc('tickets_update_status')
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    # Una reserva cancelada o rechazada libera la habitación
+    for _, codigo, room_id, entrada, salida, estado in rows:
+        availability.apply_ticket(codigo, room_id, entrada, salida, estado)
+    return jsonify({'success': True, 'updated': [row[0] for row in rows]})
+
+@app.route('/admin/tickets/changes', methods=['GET'])
+def admin_tickets_changes():
+    """Long-poll de tickets nuevos o cambiados: ?cursor=<cursor anterior>.
+    Sin cursor responde enseguida con el cursor actual; con cursor espera
+    hasta ?wait= segundos (máximo 25) a que haya cambios."""
+    cursor = request.args.get('cursor')
+    wait = min(request.args.get('wait', TICKETS_FEED_WAIT, type=float), TICKETS_FEED_WAIT)
+    try:
+        # Se espera sin ocupar una conexión del pool
+        if cursor and wait > 0 and not ticket_feed.wait(cursor, wait):
+            return jsonify({'success': True, 'tickets': [], 'cursor': cursor, 'more': False})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    conn = get_db()
+    try:
+        with DB_SECONDS.time('tickets_changes'):
+            changes = fetch_changes(conn, cursor, request.args.get('limit', 200, type=int))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        DB_ERRORS.inc('tickets_changes')
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(dict(changes, success=True))
+
+# ============================================
+# Habitaciones
+# ============================================
+ROOM_FIELDS = ROOM_COLUMNS[1:]  # Todo menos id_habitacion
+
+@app.route('/admin/habitaciones', methods=['GET'])
+def admin_habitaciones():
+    """Lista de habitaciones"""
+    conn = get_db()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {', '.join(ROOM_COLUMNS)} FROM habitaciones ORDER BY id_habitacion")
+        habitaciones = [room_from_row(row) for row in cur.fetchall()]
+        conn.rollback()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True, 'habitaciones': habitaciones})
+
+@app.route('/admin/habitaciones/add', methods=['POST'])
+def admin_add_habitacion():
+    """Agrega una habitación"""
+    data = request.get_json()
+    missing = [key for key in ('id_habitacion', 'numero_habitacion', 'capacidad', 'precio_noche', 'estado')
+               if data.get(key) in (None, '')]
+    if missing:
+        return jsonify({'success': False, 'error': f"Faltan campos: {', '.join(missing)}"}), 400
+
+    room = {key: data.get(key) for key in ROOM_COLUMNS}
+    try:
+        room['capacidad'] = int(room['capacidad'])
+        room['precio_noche'] = float(room['precio_noche'])
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Capacidad o precio inválido'}), 400
+    conn = get_db()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"INSERT INTO habitaciones ({', '.join(ROOM_COLUMNS)}) VALUES ({', '.join(['%s'] * len(ROOM_COLUMNS))})",
+                    [room[key] for key in ROOM_COLUMNS])
+        conn.commit()
+    except psycopg2.IntegrityError:
+        conn.rollback()
+        return jsonify({'success': False, 'error': 'El ID o el número de habitación ya existe'}), 400
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    availability.set_room(room)
+    return jsonify({'success': True, 'message': 'Habitación agregada exitosamente'})
+
+@app.route('/admin/habitaciones/update', methods=['POST'])
+def admin_update_habitacion():
+    """Actualiza una habitación"""
+    data = request.get_json()
+    room_id = data.get('id_habitacion')
+    changes = {key: data[key] for key in ROOM_FIELDS if key in data}
+    if not changes:
+        return jsonify({'success': False, 'error': 'No hay cambios'}), 400
+
+    conn = get_db()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"UPDATE habitaciones SET {', '.join(f'{key} = %s' for key in changes)} "
+                    f"WHERE id_habitacion = %s RETURNING {', '.join(ROOM_COLUMNS)}",
+                    list(changes.values()) + [room_id])
+        row = cur.fetchone()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    if row is None:
+        return jsonify({'success': False, 'error': 'Habitación no encontrada'}), 404
+
+    availability.set_room(room_from_row(row))
+    return jsonify({'success': True, 'message': 'Habitación actualizada exitosamente'})
+
+@app.route('/admin/habitaciones/delete', methods=['POST'])
+def admin_delete_habitacion():
+    """Elimina una habitación sin reservas pendientes"""
+    data = request.get_json()
+    room_id = data.get('id_habitacion')
+
+    conn = get_db()
+    try:
+        cur = conn.cursor()
+        cur.execute(SQL_BLOQUEAR_HABITACION, (room_id,))
+        cur.execute(SQL_RESERVA_SOLAPADA, (room_id, list(ESTADOS_LIBRES), date.max.isoformat(),
+                                           date.today().isoformat()))
+        if cur.fetchone():
+            conn.rollback()
+            return jsonify({'success': False, 'error': 'La habitación tiene reservas pendientes'}), 400
+        cur.execute("DELETE FROM habitaciones WHERE id_habitacion = %s", (room_id,))
+        deleted = cur.rowcount
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    if not deleted:
+        return jsonify({'success': False, 'error': 'Habitación no encontrada'}), 404
+
+    availability.remove_room(room_id)
+    return jsonify({'success': True, 'message': 'Habitación eliminada exitosamente'})
+
+@app.route('/admin/habitaciones/disponibles', methods=['GET'])
+def admin_habitaciones_disponibles():
+    """Habitaciones libres entre ?entrada= y ?salida= (YYYY-MM-DD), opcional ?capacidad="""
+    refresh_availability()
+    start = time.perf_counter()
+    try:
+        entrada, salida = request.args.get('entrada'), request.args.get('salida')
+        capacidad = request.args.get('capacidad', type=int)
+        total = availability.count_free(entrada, salida, capacidad)
+        habitaciones = availability.free_rooms(entrada, salida, capacidad, limit=request.args.get('limit', 100, type=int))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Fechas inválidas'}), 400
+    return jsonify({'success': True, 'total': total, 'habitaciones': habitaciones,
+                    'ms': round((time.perf_counter() - start) * 1000, 3),
+                    'indice': availability.stats()})
 
 @app.route('/admin/export', methods=['GET'])
 def admin_export():
     """Descarga el archivo dataset.json actual"""
+    # Incluir en el archivo los cambios que aún están en el log
+    store.compact()
     return send_file(DATA_FILE, as_attachment=True, download_name='dataset.json')
 
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'uploads')
+# Estado de las importaciones, visible desde todos los workers
+IMPORT_JOBS_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'imports')
+
 @app.route('/admin/import', methods=['POST'])
 def admin_import():
-    """Importa un archivo JSON de dataset"""
-    global DATASET, embeddings, questions, responses, model
-    
+    """Importa un dataset JSON o CSV en segundo plano.
+    Devuelve el id del job para consultar el progreso."""
     if 'file' not in request.files:
         return jsonify({'success': False, 'error': 'No se envió archivo'}), 400
     
@@ -588,42 +1197,33 @@ def admin_import():
     if file.filename == '':
         return jsonify({'success': False, 'error': 'Archivo vacío'}), 400
     
-    if not file.filename.endswith('.json'):
-        return jsonify({'success': False, 'error': 'El archivo debe ser JSON'}), 400
+    if not file.filename.lower().endswith(('.json', '.csv')):
+        return jsonify({'success': False, 'error': 'El archivo debe ser JSON o CSV'}), 400
     
-    try:
-        imported_data = json.load(file)
-        
-        # Validar estructura
-        if not isinstance(imported_data, list):
-            return jsonify({'success': False, 'error': 'El JSON debe contener una lista de items'}), 400
-        
-        # Validar que cada item tenga los campos necesarios
-        for item in imported_data:
-            if not all(key in item for key in ['id', 'question', 'response']):
-                return jsonify({'success': False, 'error': 'Items inválidos. Deben tener id, question y response'}), 400
-        
-        # Reemplazar dataset
-        DATASET = imported_data
-        save_dataset()
-        reload_model()
-        
-        return jsonify({'success': True, 'message': f'Se importaron {len(imported_data)} items exitosamente'})
+    path = save_upload(file, UPLOAD_DIR)
+    skip_invalid = request.form.get('skip_invalid') in ('1', 'true')
+    job = start_import(path, file.filename, apply_import, IMPORT_JOBS_DIR, skip_invalid=skip_invalid)
     
-    except json.JSONDecodeError:
-        return jsonify({'success': False, 'error': 'JSON inválido'}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-def save_dataset():
-    """Guarda el dataset en el archivo JSON"""
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(DATASET, f, ensure_ascii=False, indent=2)
+    return jsonify({'success': True, 'job_id': job.id, 'status_url': f'/admin/import/{job.id}'}), 202
+
+@app.route('/admin/import/<job_id>', methods=['GET'])
+def admin_import_status(job_id):
+    """Progreso de una importación"""
+    job = get_job(job_id, IMPORT_JOBS_DIR)
+    if not job:
+        return jsonify({'success': False, 'error': 'Importación no encontrada'}), 404
+    return jsonify(job)
+
+def apply_import(items, job):
+    """Publica un dataset importado: primero los embeddings (en lotes,
+    mientras el dataset actual sigue atendiendo) y luego los datos"""
+    update_index(lambda index: index.prepare(items, on_progress=job.embedding_progress))
+    set_dataset(store.replace_all(items))
+    reload_model()
 
 def reload_model():
-    """Recarga el dataset después de cambios"""
-    global DATASET
-    DATASET = load_dataset()
+    """Recarga el índice semántico después de cambios"""
+    update_index(lambda index: index.rebuild(DATASET))
     print("✅ Dataset actualizado después de cambios")
 
 # Ejecución del servidor Flask
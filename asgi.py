@@ -0,0 +1,219 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+# El pool síncrono de app.py no hace falta abierto en este modo
+os.environ.setdefault('DB_POOL_MIN', '0')
+
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as core
+from db import DB_DEFAULTS
+from metrics import CHAT_SECONDS, DB_ERRORS, DB_SECONDS
+from session_store import MemorySessionStore
+
+# Modo async (ASGI) con el mismo contrato que app.py.
+# Uso: uvicorn asgi:app --host 0.0.0.0 --port 5000
+#
+# /chat, /menu, /faq y /enviar-* se atienden en el event loop: la lógica de
+# menús corre directo (en un hilo si las sesiones están en SQLite), el
+# modelo semántico en un executor y los tickets con
+# un pool async de PostgreSQL (psycopg 3), así una petición que espera no
+# ocupa un hilo. Las demás rutas (admin, archivos estáticos) pasan a la app
+# Flask de siempre.
+
+ASYNC_MODEL_THREADS = int(os.environ.get('ASYNC_MODEL_THREADS', 8))
+ASYNC_DB_POOL_MIN = int(os.environ.get('ASYNC_DB_POOL_MIN', 1))
+ASYNC_DB_POOL_MAX = int(os.environ.get('ASYNC_DB_POOL_MAX', 20))
+
+# Hilos para model.encode; el micro-batcher junta sus peticiones en lotes
+model_executor = ThreadPoolExecutor(max_workers=ASYNC_MODEL_THREADS, thread_name_prefix='modelo')
+db_pool = AsyncConnectionPool(make_conninfo(**dict(DB_DEFAULTS, **core.DB_PARAMS)),
+                              min_size=ASYNC_DB_POOL_MIN, max_size=ASYNC_DB_POOL_MAX, open=False)
+# Con SESSION_BACKEND=sqlite cada paso del chat lee y escribe la sesión en disco
+SESSIONS_IN_MEMORY = isinstance(core.USER_CONTEXT, MemorySessionStore)
+
+
+async def chat_step(user_message, session_id):
+    """core.chat_step en el event loop solo si no va a bloquear: sesiones en
+    memoria y sin revisión del dataset en disco pendiente"""
+    if SESSIONS_IN_MEMORY and not core.store.refresh_due():
+        return core.chat_step(user_message, session_id)
+    return await run_in_threadpool(core.chat_step, user_message, session_id)
+
+
+async def chat(request):
+    data = await request.json()
+    user_message = data.get('message', '').strip()
+    session_id = data.get('session', 'default')
+
+    with CHAT_SECONDS.time('chat'):
+        reply = await chat_step(user_message, session_id)
+        if reply is None:
+            loop = asyncio.get_running_loop()
+            reply = await loop.run_in_executor(model_executor, core.semantic_reply, user_message, session_id)
+    return JSONResponse(reply)
+
+
+async def chat_stream(request):
+    data = await request.json()
+    events = core.chat_events(data.get('message', '').strip(), data.get('session', 'default'))
+
+    async def stream():
+        # Cada paso del generador puede esperar al modelo: en el executor
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await loop.run_in_executor(model_executor, next, events, None)
+            if event is None:
+                return
+            yield event
+
+    return StreamingResponse(stream(), media_type='text/event-stream', headers=core.SSE_HEADERS)
+
+
+async def menu(request):
+    return JSONResponse({'menu': core.DATASET_INDEX.menu})
+
+
+async def menu_intent(request):
+    intent = request.path_params['intent']
+    items = core.DATASET_INDEX.menu_items.get(intent, [])
+    return JSONResponse({'intent': intent, 'items': items})
+
+
+async def faq(request):
+    it = core.DATASET_INDEX.get(request.path_params['item_id'])
+    if it:
+        return JSONResponse({'id': it.get('id'), 'question': it.get('question'), 'answer': it.get('response')})
+    return JSONResponse({'error': 'not found'}, status_code=404)
+
+
+async def insert_ticket(sql, params):
+    """Código del ticket creado o None si falló (igual que la versión Flask)"""
+    try:
+        with DB_SECONDS.time('insert_queja'):
+            async with db_pool.connection() as conn:
+                cur = await conn.execute(sql, params)
+                return (await cur.fetchone())[0]
+    except Exception as e:
+        DB_ERRORS.inc('insert_queja')
+        print("❌ Error guardando en PostgreSQL:", e)
+        return None
+
+
+async def enviar_queja(request):
+    data = await request.json()
+    nombre = data.get("nombre")
+
+    print("📩 Nueva reserva recibida:")
+    print(data)
+
+    if core.ticket_writer:
+        # Write-behind: una escritura local en SQLite, fuera del event loop
+        return JSONResponse(await run_in_threadpool(core.encolar_queja, data))
+
+    codigo = await insert_ticket(core.SQL_INSERT_QUEJA, (
+        nombre, data.get("telefono"), data.get("correo"),
+        "pendiente", datetime.now(), data.get("motivo")
+    ))
+    return JSONResponse({"reply": f"✔ Gracias {nombre}, tu queja fue registrada.", "codigo": codigo})
+
+
+async def enviar_fecha(request):
+    """Misma lógica que enviar_fecha de app.py, con el pool async"""
+    data = await request.json()
+    fecha_inicio = data.get('fecha_inicio')
+    fecha_final = data.get('fecha_final')
+
+    print("📩 Nueva reserva recibida:")
+    print(data)
+
+    # Cambios de otros procesos (usa el pool síncrono, como mucho cada pocos segundos)
+    await run_in_threadpool(core.refresh_availability)
+    try:
+        libres = core.availability.free_rooms(fecha_inicio, fecha_final, capacidad=data.get('personas'),
+                                              limit=core.ROOM_CANDIDATES)
+    except (TypeError, ValueError):
+        return JSONResponse({'reply': core.RESERVA_FECHAS_INVALIDAS, 'codigo': None})
+    if not libres:
+        return JSONResponse({'reply': core.RESERVA_SIN_HABITACIONES, 'codigo': None, 'disponible': False})
+    if core.ticket_writer:
+        return JSONResponse(await run_in_threadpool(core.encolar_reserva, data, libres))
+
+    for room in libres:
+        room_id = room['id_habitacion']
+        try:
+            with DB_SECONDS.time('reserva'):
+                async with db_pool.connection() as conn:
+                    async with conn.transaction():
+                        cur = await conn.execute(core.SQL_BLOQUEAR_HABITACION, (room_id,))
+                        if not core.room_reservable(room_id, await cur.fetchone()):
+                            continue
+                        cur = await conn.execute(core.SQL_RESERVA_SOLAPADA, (
+                            room_id, list(core.ESTADOS_LIBRES), fecha_final, fecha_inicio
+                        ))
+                        if await cur.fetchone():
+                            continue
+                        cur = await conn.execute(core.SQL_INSERT_RESERVA, (
+                            data.get('nombre'), data.get('numero'), data.get('correo'),
+                            fecha_inicio, fecha_final, "pendiente", datetime.now(), room_id
+                        ))
+                        codigo = (await cur.fetchone())[0]
+        except Exception as e:
+            DB_ERRORS.inc('reserva')
+            print("❌ Error guardando en PostgreSQL:", e)
+            return JSONResponse({'reply': core.RESERVA_ERROR, 'codigo': None})
+
+        core.availability.put_booking(codigo, room_id, fecha_inicio, fecha_final)
+        return JSONResponse({
+            'reply': f"📅 Tu solicitud de reserva fue enviada correctamente (habitación {room['numero_habitacion']}). "
+                     "El personal del hotel te contactará pronto.",
+            'codigo': codigo,
+            'habitacion': room['numero_habitacion']
+        })
+
+    # Todas las candidatas estaban tomadas: el índice quedó atrasado
+    await run_in_threadpool(core.refresh_availability, force=True)
+    return JSONResponse({'reply': core.RESERVA_SIN_HABITACIONES, 'codigo': None, 'disponible': False})
+
+
+async def enviar_contacto(request):
+    data = await request.json()
+    # Encolar es una escritura corta en SQLite: fuera del event loop
+    ok = await run_in_threadpool(core.enviar_correo, data.get('nombre'), data.get('correo'), data.get('mensaje'))
+    if ok:
+        return JSONResponse({'reply': '✅ Gracias por tu mensaje. El personal del hotel te contactará pronto.'})
+    return JSONResponse({'reply': '❌ Hubo un problema al enviar tu mensaje. Intenta más tarde.'})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await db_pool.open(wait=False)
+    yield
+    await db_pool.close()
+    model_executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/chat', chat, methods=['POST']),
+        Route('/chat/stream', chat_stream, methods=['POST']),
+        Route('/menu', menu, methods=['GET']),
+        Route('/menu/{intent}', menu_intent, methods=['GET']),
+        Route('/faq/{item_id:int}', faq, methods=['GET']),
+        Route('/enviar-queja', enviar_queja, methods=['POST']),
+        Route('/enviar-fecha', enviar_fecha, methods=['POST']),
+        Route('/enviar-contacto', enviar_contacto, methods=['POST']),
+        # Todo lo demás: la app Flask (admin, páginas, /health, /ready, /metrics)
+        Mount('/', app=WSGIMiddleware(core.app)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,270 @@
+import bisect
+import threading
+import time
+from datetime import date, timedelta
+
+# Disponibilidad de habitaciones en memoria.
+# Cada habitación tiene un bit; por cada día hay una máscara (int) con los
+# bits de las habitaciones ocupadas esa noche. "¿Qué habitaciones están
+# libres del 3 al 7?" es un OR de 4 máscaras y un AND con las habitaciones
+# reservables, sin recorrer las reservas.
+# Además se guardan las reservas de cada habitación ordenadas por fecha
+# (intervalos [entrada, salida)) para actualizar las máscaras al quitar una.
+
+ROOM_COLUMNS = ('id_habitacion', 'numero_habitacion', 'capacidad', 'precio_noche',
+                'estado', 'descripcion', 'id_tipo')
+
+# Estados de ticket que no ocupan la habitación
+ESTADOS_LIBRES = ('cancelado', 'rechazado')
+# Estados de habitación que no se pueden reservar
+ESTADOS_NO_RESERVABLES = ('mantenimiento',)
+
+MAX_NOCHES = 365
+
+
+def to_day(value):
+    """date, datetime o 'YYYY-MM-DD' -> número de día (ordinal)"""
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def room_from_row(row):
+    """Fila de habitaciones (en el orden de ROOM_COLUMNS) -> dict para JSON"""
+    room = dict(zip(ROOM_COLUMNS, row))
+    if room['precio_noche'] is not None:
+        room['precio_noche'] = float(room['precio_noche'])
+    return room
+
+
+def _bits(mask, limit=None):
+    """Posiciones de los bits encendidos, de menor a mayor"""
+    positions = []
+    while mask and (limit is None or len(positions) < limit):
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._last_change = None
+        self._last_full = 0.0
+
+    def _reset(self):
+        self.rooms = {}        # id_habitacion -> fila de habitaciones (dict)
+        self._bit = {}         # id_habitacion -> posición del bit
+        self._room_at = []     # posición -> id_habitacion
+        self._reservable = 0   # máscara de habitaciones reservables
+        self._capacity_masks = {}
+        self._bookings = {}    # codigo_ticket -> (id_habitacion, entrada, salida)
+        self._by_room = {}     # id_habitacion -> [(entrada, salida, codigo)] ordenado
+        self._days = {}        # día -> máscara de habitaciones ocupadas
+
+    # ---- habitaciones ----
+
+    def set_room(self, room):
+        with self._lock:
+            room_id = room['id_habitacion']
+            self.rooms[room_id] = dict(room)
+            if room_id not in self._bit:
+                self._bit[room_id] = len(self._room_at)
+                self._room_at.append(room_id)
+            bit = 1 << self._bit[room_id]
+            if room.get('estado') in ESTADOS_NO_RESERVABLES:
+                self._reservable &= ~bit
+            else:
+                self._reservable |= bit
+            self._capacity_masks = {}
+
+    def remove_room(self, room_id):
+        """La posición del bit queda reservada (no se reutiliza)"""
+        with self._lock:
+            if self.rooms.pop(room_id, None) is None:
+                return False
+            self._reservable &= ~(1 << self._bit[room_id])
+            self._capacity_masks = {}
+            for _, _, codigo in list(self._by_room.get(room_id, [])):
+                self.remove_booking(codigo)
+            return True
+
+    # ---- reservas ----
+
+    def put_booking(self, codigo, room_id, entrada, salida):
+        """Agrega o mueve la reserva `codigo` (fechas como date o texto)"""
+        start, end = to_day(entrada), to_day(salida)
+        with self._lock:
+            if self._bookings.get(codigo) == (room_id, start, end):
+                return
+            self.remove_booking(codigo)
+            if room_id not in self._bit or end <= start:
+                return
+            self._bookings[codigo] = (room_id, start, end)
+            bisect.insort(self._by_room.setdefault(room_id, []), (start, end, codigo))
+            bit = 1 << self._bit[room_id]
+            for day in range(start, end):
+                self._days[day] = self._days.get(day, 0) | bit
+
+    def remove_booking(self, codigo):
+        with self._lock:
+            booking = self._bookings.pop(codigo, None)
+            if booking is None:
+                return False
+            room_id, start, end = booking
+            intervals = self._by_room[room_id]
+            intervals.remove((start, end, codigo))
+            bit = 1 << self._bit[room_id]
+            for day in range(start, end):
+                # La noche puede seguir ocupada por otra reserva vieja solapada
+                if not self._covered(intervals, day):
+                    mask = self._days.get(day, 0) & ~bit
+                    if mask:
+                        self._days[day] = mask
+                    else:
+                        self._days.pop(day, None)
+            return True
+
+    def claim(self, codigo, room_id, entrada, salida):
+        """put_booking solo si la habitación sigue libre esas noches (atómico)"""
+        with self._lock:
+            if not self.is_free(room_id, entrada, salida):
+                return False
+            self.put_booking(codigo, room_id, entrada, salida)
+            return True
+
+    def apply_ticket(self, codigo, room_id, entrada, salida, estado):
+        """Refleja una fila de tickets (nueva, cambiada o cancelada)"""
+        if room_id is None or entrada is None or salida is None or estado in ESTADOS_LIBRES:
+            self.remove_booking(codigo)
+        else:
+            self.put_booking(codigo, room_id, entrada, salida)
+
+    # ---- consultas ----
+
+    def free_mask(self, entrada, salida, capacidad=None):
+        start, end = to_day(entrada), to_day(salida)
+        if end <= start or end - start > MAX_NOCHES:
+            raise ValueError('Rango de fechas inválido')
+        days = self._days
+        occupied = 0
+        for day in range(start, end):
+            occupied |= days.get(day, 0)
+        free = self._reservable & ~occupied
+        if capacidad:
+            free &= self._capacity_mask(int(capacidad))
+        return free
+
+    def free_rooms(self, entrada, salida, capacidad=None, limit=None):
+        """Habitaciones libres todas las noches de [entrada, salida)"""
+        with self._lock:
+            free = self.free_mask(entrada, salida, capacidad)
+            return [self.rooms[self._room_at[pos]] for pos in _bits(free, limit)]
+
+    def count_free(self, entrada, salida, capacidad=None):
+        with self._lock:
+            return bin(self.free_mask(entrada, salida, capacidad)).count('1')
+
+    def is_free(self, room_id, entrada, salida):
+        with self._lock:
+            if room_id not in self.rooms:
+                return False
+            return bool(self.free_mask(entrada, salida) >> self._bit[room_id] & 1)
+
+    def stats(self):
+        with self._lock:
+            return {'habitaciones': len(self.rooms), 'reservas': len(self._bookings),
+                    'dias': len(self._days),
+                    'ultimo_cambio': self._last_change.isoformat() if self._last_change else None}
+
+    def _capacity_mask(self, capacidad):
+        mask = self._capacity_masks.get(capacidad)
+        if mask is None:
+            mask = 0
+            for room_id, room in self.rooms.items():
+                if (room.get('capacidad') or 0) >= capacidad:
+                    mask |= 1 << self._bit[room_id]
+            self._capacity_masks[capacidad] = mask
+        return mask
+
+    @staticmethod
+    def _covered(intervals, day):
+        pos = bisect.bisect_right(intervals, (day, float('inf'), ''))
+        return any(start <= day < end for start, end, _ in intervals[:pos])
+
+    # ---- carga desde PostgreSQL ----
+
+    def load(self, rooms, tickets):
+        """Construcción completa. rooms: dicts de habitaciones; tickets:
+        (codigo, id_habitacion, entrada, salida, estado).
+        Se arma aparte y se publica de una vez: las consultas no esperan."""
+        fresh = AvailabilityIndex()
+        fresh._build(rooms, tickets)
+        with self._lock:
+            for name in ('rooms', '_bit', '_room_at', '_reservable', '_capacity_masks',
+                         '_bookings', '_by_room', '_days'):
+                setattr(self, name, getattr(fresh, name))
+
+    def _build(self, rooms, tickets):
+        with self._lock:
+            for room in rooms:
+                self.set_room(room)
+
+            # Máscaras por día armadas en bytearrays y convertidas una sola vez
+            size = (len(self._room_at) + 7) // 8
+            days = {}
+            for codigo, room_id, entrada, salida, estado in tickets:
+                if room_id is None or entrada is None or salida is None or estado in ESTADOS_LIBRES:
+                    continue
+                if room_id not in self._bit:
+                    continue
+                start, end = to_day(entrada), to_day(salida)
+                if end <= start:
+                    continue
+                self._bookings[codigo] = (room_id, start, end)
+                self._by_room.setdefault(room_id, []).append((start, end, codigo))
+                pos = self._bit[room_id]
+                for day in range(start, end):
+                    buf = days.get(day)
+                    if buf is None:
+                        buf = days[day] = bytearray(size)
+                    buf[pos >> 3] |= 1 << (pos & 7)
+            for intervals in self._by_room.values():
+                intervals.sort()
+            self._days = {day: int.from_bytes(buf, 'little') for day, buf in days.items()}
+
+    def sync(self, conn, full_every=60.0):
+        """Trae de la base solo los tickets cambiados desde la última vez
+        (columna actualizado_en, ver migrations/002). Cada `full_every`
+        segundos recarga todo para notar tickets y habitaciones borrados."""
+        cur = conn.cursor()
+        if self._last_change is None or time.monotonic() - self._last_full > full_every:
+            cur.execute(f"SELECT {', '.join(ROOM_COLUMNS)} FROM habitaciones")
+            rooms = [room_from_row(row) for row in cur.fetchall()]
+            cur.execute("""
+                SELECT codigo_ticket, id_habitacion, fecha_entrada, fecha_salida, estado
+                FROM tickets WHERE id_habitacion IS NOT NULL
+            """)
+            tickets = cur.fetchall()
+            cur.execute("SELECT COALESCE(MAX(actualizado_en), LOCALTIMESTAMP) FROM tickets")
+            last_change = cur.fetchone()[0]
+            conn.rollback()
+            self.load(rooms, tickets)
+            self._last_change = last_change
+            self._last_full = time.monotonic()
+            return
+
+        # Margen de 5 s: transacciones que terminaron después con una marca anterior
+        cur.execute("""
+            SELECT codigo_ticket, id_habitacion, fecha_entrada, fecha_salida, estado, actualizado_en
+            FROM tickets WHERE actualizado_en > %s ORDER BY actualizado_en
+        """, (self._last_change - timedelta(seconds=5),))
+        rows = cur.fetchall()
+        conn.rollback()
+        with self._lock:
+            for codigo, room_id, entrada, salida, estado, changed in rows:
+                self.apply_ticket(codigo, room_id, entrada, salida, estado)
+                if changed > self._last_change:
+                    self._last_change = changed
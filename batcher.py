@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+
+class EncodeBatcher:
+    """Agrupa las llamadas a model.encode de varios hilos en un solo lote.
+
+    Cada petición espera como máximo `window_ms` a que lleguen otras, o
+    hasta juntar `max_batch` textos, y recibe solo sus propias filas.
+    Tiene la misma firma que model.encode, así que se puede usar en su lugar.
+
+    El hilo se arranca con el primer encode y se vuelve a crear si el
+    proceso cambió (worker de gunicorn creado con fork después de cargar
+    el modelo en el master: los hilos no sobreviven al fork).
+    """
+
+    def __init__(self, model, window_ms=5, max_batch=64):
+        self.model = model
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'texts': 0,
+            'max_batch_size': 0,
+            'max_queue_depth': 0,
+            'batch_sizes': {},
+        }
+        self._worker = None
+        self._pid = None
+
+    def encode(self, texts, convert_to_tensor=True, **kwargs):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        if self._pid != os.getpid():
+            self._start()
+
+        future = Future()
+        self._queue.put((list(texts), future))
+        with self._lock:
+            depth = self._queue.qsize()
+            if depth > self._stats['max_queue_depth']:
+                self._stats['max_queue_depth'] = depth
+
+        result = future.result()
+        return result[0] if single else result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['batch_sizes'] = dict(self._stats['batch_sizes'])
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_batch_size'] = stats['texts'] / stats['batches'] if stats['batches'] else 0
+        return stats
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Heredado por fork: la cola puede tener esperas del hilo muerto
+                self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, args=(self._queue,), name='encode-batcher', daemon=True)
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def _run(self, requests):
+        while True:
+            pending = [requests.get()]
+            total = len(pending[0][0])
+            deadline = time.perf_counter() + self.window
+
+            # Juntar peticiones hasta que venza la ventana o se llene el lote
+            while total < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                total += len(item[0])
+
+            self._encode_batch(pending, total)
+
+    def _encode_batch(self, pending, total):
+        texts = [text for item_texts, _ in pending for text in item_texts]
+        try:
+            embeddings = self.model.encode(texts, convert_to_tensor=True) if texts else torch.empty(0)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        start = 0
+        for item_texts, future in pending:
+            end = start + len(item_texts)
+            future.set_result(embeddings[start:end])
+            start = end
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['texts'] += total
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], total)
+            sizes = self._stats['batch_sizes']
+            sizes[total] = sizes.get(total, 0) + 1
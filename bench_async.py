@@ -0,0 +1,118 @@
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlparse
+
+# Prueba de carga: requests/seg y latencias (p50/p99) de /chat y /menu
+# contra uno o más servidores, p. ej. Flask (gunicorn) vs. ASGI (uvicorn).
+# Además abre conexiones ociosas que quedan abiertas durante la prueba.
+# Uso: python bench_async.py [url ...] [--concurrencia N] [--segundos S] [--ociosas N]
+#   python bench_async.py http://127.0.0.1:5000 http://127.0.0.1:8000 --ociosas 2000
+
+PETICIONES = [
+    ('GET', '/menu', None),
+    ('POST', '/chat', {'message': 'menu'}),
+    ('POST', '/chat', {'message': '¿A qué hora es el check-in?'}),
+]
+
+
+def argumentos():
+    urls, opciones = [], {'--concurrencia': 100, '--segundos': 20, '--ociosas': 0}
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg in opciones:
+            opciones[arg] = int(args.pop(0))
+        else:
+            urls.append(arg)
+    return urls or ['http://127.0.0.1:5000'], opciones
+
+
+async def peticion(reader, writer, host, method, path, payload):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('ascii') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while True:
+        linea = (await reader.readline()).strip()
+        if not linea:
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        if nombre.lower() == 'content-length':
+            length = int(valor)
+        elif nombre.lower() == 'transfer-encoding' and 'chunked' in valor.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+async def cliente(url, fin, latencias, errores, n):
+    parsed = urlparse(url)
+    reader = writer = None
+    i = n
+    while time.perf_counter() < fin:
+        method, path, payload = PETICIONES[i % len(PETICIONES)]
+        if payload is not None:
+            # Una sesión por petición: el contexto de una no cambia la siguiente
+            payload = dict(payload, session=f"carga-{n}-{i}")
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parsed.hostname, parsed.port or 80)
+            status = await peticion(reader, writer, parsed.netloc, method, path, payload)
+            if status != 200:
+                errores.append(status)
+            latencias.append(time.perf_counter() - inicio)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            errores.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def ociosas(url, cantidad):
+    parsed = urlparse(url)
+    conexiones = []
+    for _ in range(cantidad):
+        try:
+            conexiones.append((await asyncio.open_connection(parsed.hostname, parsed.port or 80))[1])
+        except OSError:
+            break
+    return conexiones
+
+
+def percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+async def medir(url, concurrencia, segundos, cantidad_ociosas):
+    abiertas = await ociosas(url, cantidad_ociosas)
+    latencias, errores = [], []
+    fin = time.perf_counter() + segundos
+    await asyncio.gather(*(cliente(url, fin, latencias, errores, n) for n in range(concurrencia)))
+    for writer in abiertas:
+        writer.close()
+
+    latencias.sort()
+    print(f"{url} | {len(latencias) / segundos:8.1f} req/s | p50 {percentil(latencias, 0.5) * 1000:7.1f} ms | "
+          f"p99 {percentil(latencias, 0.99) * 1000:7.1f} ms | errores {len(errores)} | "
+          f"ociosas {len(abiertas)}/{cantidad_ociosas}")
+
+
+urls, opciones = argumentos()
+for url in urls:
+    asyncio.run(medir(url, opciones['--concurrencia'], opciones['--segundos'], opciones['--ociosas']))
@@ -0,0 +1,84 @@
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from availability import AvailabilityIndex
+
+# Benchmark del índice de disponibilidad (en memoria, sin base de datos):
+# carga completa, consultas "habitaciones libres entre estas fechas" y
+# altas/bajas de reservas.
+# Uso: python bench_availability.py [habitaciones] [reservas]
+
+HABITACIONES = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+RESERVAS = int(sys.argv[2]) if len(sys.argv) > 2 else 300000
+CONSULTAS = 2000
+INICIO = date(2030, 1, 1)
+DIAS = 730
+
+random.seed(7)
+rooms = [{'id_habitacion': i, 'numero_habitacion': str(100 + i), 'capacidad': random.choice([1, 2, 2, 3, 4, 6]),
+          'precio_noche': 80.0, 'estado': 'mantenimiento' if i % 97 == 0 else 'disponible',
+          'descripcion': None, 'id_tipo': 1}
+         for i in range(1, HABITACIONES + 1)]
+
+
+def rango(max_noches=7):
+    entrada = INICIO + timedelta(days=random.randrange(DIAS))
+    return entrada, entrada + timedelta(days=random.randint(1, max_noches))
+
+
+tickets = []
+for n in range(RESERVAS):
+    entrada, salida = rango()
+    tickets.append((f"Res-{n}", random.randint(1, HABITACIONES), entrada, salida, 'pendiente'))
+
+
+def medir(nombre, funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    print(f"{nombre:<42} prom {sum(tiempos) / len(tiempos) * 1e6:9.1f} µs | "
+          f"p99 {tiempos[int(len(tiempos) * 0.99)] * 1e6:9.1f} µs")
+
+
+index = AvailabilityIndex()
+inicio = time.perf_counter()
+index.load(rooms, tickets)
+print(f"Carga de {HABITACIONES} habitaciones y {RESERVAS} reservas: {time.perf_counter() - inicio:.2f} s")
+print(index.stats())
+
+medir("Cantidad libre (1-7 noches)", lambda: index.count_free(*rango()), CONSULTAS)
+medir("Primeras 5 libres (1-7 noches)", lambda: index.free_rooms(*rango(), limit=5), CONSULTAS)
+medir("Primeras 5 libres, capacidad >= 4", lambda: index.free_rooms(*rango(), capacidad=4, limit=5), CONSULTAS)
+medir("Primeras 5 libres (hasta 30 noches)", lambda: index.free_rooms(*rango(30), limit=5), CONSULTAS)
+medir("Todas las libres (1-7 noches)", lambda: index.free_rooms(*rango()), 200)
+medir("¿Habitación libre? (1-7 noches)", lambda: index.is_free(random.randint(1, HABITACIONES), *rango()), CONSULTAS)
+
+nuevas = iter(range(CONSULTAS * 10))
+
+
+def alta():
+    n = next(nuevas)
+    index.put_booking(f"Nueva-{n}", random.randint(1, HABITACIONES), *rango())
+
+
+medir("Alta de reserva", alta, CONSULTAS)
+medir("Baja de reserva", lambda: index.remove_booking(f"Res-{random.randrange(RESERVAS)}"), CONSULTAS)
+
+
+# Verificación contra fuerza bruta en una muestra
+def libres_fuerza_bruta(entrada, salida):
+    ocupadas = {room for codigo, (room, start, end) in index._bookings.items()
+                if start < salida.toordinal() and end > entrada.toordinal()}
+    return {r['id_habitacion'] for r in rooms
+            if r['estado'] != 'mantenimiento' and r['id_habitacion'] not in ocupadas}
+
+
+for _ in range(20):
+    entrada, salida = rango()
+    assert {r['id_habitacion'] for r in index.free_rooms(entrada, salida)} == libres_fuerza_bruta(entrada, salida)
+print("✅ Resultados iguales a la búsqueda por fuerza bruta")
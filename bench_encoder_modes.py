@@ -0,0 +1,65 @@
+import json
+import statistics
+import time
+
+from encoder import ENCODER_MODES, load_encoder
+from semantic import clean_text, best_matches
+from vector_index import ExactIndex
+
+# Arnés de precisión/latencia de los modos de inferencia.
+# Reproduce parafraseos de las preguntas de dataset.json y compara el top-1
+# de cada modo contra fp32.
+MODEL_NAME = "paraphrase-multilingual-mpnet-base-v2"
+
+with open('dataset.json', 'r', encoding='utf-8') as f:
+    data = json.load(f)
+
+questions = [clean_text(item["question"]) for item in data]
+
+plantillas = [
+    "{}",
+    "hola {}",
+    "{} por favor",
+    "disculpe {}",
+    "me gustaría saber {}",
+    "una pregunta {}",
+]
+parafraseos = [clean_text(p.format(q)) for q in questions for p in plantillas]
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+resultados = {}
+for mode in ENCODER_MODES:
+    try:
+        model = load_encoder(MODEL_NAME, mode)
+    except Exception as e:
+        print(f"⚠️ Modo {mode} no disponible: {e}")
+        continue
+
+    search_index = ExactIndex(model.encode(questions, convert_to_tensor=True))
+    model.encode(parafraseos[:4], convert_to_tensor=True)  # calentamiento
+
+    latencias = []
+    top1 = []
+    for texto in parafraseos:
+        inicio = time.perf_counter()
+        match = best_matches(model, search_index, [texto])[0]
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        top1.append(match[0][0])
+
+    resultados[mode] = (top1, latencias)
+
+base = resultados.get('fp32')
+print(f"\n{'modo':>5} | {'top-1 cambia':>12} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+print("-" * 45)
+for mode, (top1, latencias) in resultados.items():
+    if base:
+        cambios = sum(a != b for a, b in zip(base[0], top1)) / len(top1)
+        cambios = f"{cambios:.1%}"
+    else:
+        cambios = "-"
+    print(f"{mode:>5} | {cambios:>12} | {statistics.median(latencias):>8.2f} | {percentil(latencias, 99):>8.2f}")
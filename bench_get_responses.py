@@ -0,0 +1,51 @@
+import json
+import time
+
+import torch
+from sentence_transformers import SentenceTransformer, util
+
+from semantic import clean_text, best_matches
+from vector_index import ExactIndex
+
+# Micro-benchmark: un encode por subpregunta vs. un encode por lote
+REPETICIONES = 20
+
+with open('dataset.json', 'r', encoding='utf-8') as f:
+    data = json.load(f)
+
+questions = [clean_text(item["question"]) for item in data]
+
+print("Cargando modelo...")
+model = SentenceTransformer("paraphrase-multilingual-mpnet-base-v2")
+embeddings = model.encode(questions, convert_to_tensor=True)
+search_index = ExactIndex(embeddings)
+
+
+def por_fragmento(subquestions):
+    resultados = []
+    for sub in subquestions:
+        user_emb = model.encode(sub, convert_to_tensor=True)
+        similarities = util.cos_sim(user_emb, embeddings)
+        best_match_index = int(torch.argmax(similarities))
+        resultados.append((best_match_index, float(similarities[0][best_match_index])))
+    return resultados
+
+
+def medir(fn, subquestions):
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        fn(subquestions)
+    return (time.perf_counter() - inicio) / REPETICIONES * 1000
+
+
+print(f"{'frases':>6} | {'por fragmento (ms)':>18} | {'por lote (ms)':>13} | {'speedup':>7} | iguales")
+print("-" * 66)
+for n in range(1, 11):
+    subquestions = questions[:n]
+    esperado = por_fragmento(subquestions)
+    obtenido = best_matches(model, search_index, subquestions)
+    iguales = [i for i, _ in esperado] == [row[0][0] for row in obtenido]
+
+    t_fragmento = medir(por_fragmento, subquestions)
+    t_lote = medir(lambda subs: best_matches(model, search_index, subs), subquestions)
+    print(f"{n:>6} | {t_fragmento:>18.2f} | {t_lote:>13.2f} | {t_fragmento / t_lote:>6.2f}x | {iguales}")
@@ -0,0 +1,117 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from metrics import Counter, Histogram, Registry, timed
+
+# Costo de la instrumentación por llamada, con métricas encendidas y con
+# METRICS=0, frente a un bloque sin instrumentar. También verifica que el
+# texto de /metrics tenga el formato que espera Prometheus y que con
+# METRICS_DIR se sumen los valores de varios workers (creados con fork).
+# Uso: python bench_metrics.py
+
+N = 200000
+
+
+def medir(nombre, funcion, base=0.0):
+    inicio = time.perf_counter()
+    funcion()
+    por_llamada = (time.perf_counter() - inicio) / N * 1e9
+    print(f"{nombre:<32} {por_llamada:8.0f} ns/llamada ({por_llamada - base:+.0f} ns)")
+    return por_llamada
+
+
+def recorrer(hist, counter):
+    def bucle():
+        for _ in range(N):
+            with hist.time('encode'):
+                pass
+            counter.inc('semantic')
+    return bucle
+
+
+def vacio():
+    for _ in range(N):
+        pass
+
+
+base = medir("sin instrumentar", vacio)
+encendidas = (Histogram('h', '', ('stage',), enabled=True), Counter('c', '', ('branch',), enabled=True))
+apagadas = (Histogram('h', '', ('stage',), enabled=False), Counter('c', '', ('branch',), enabled=False))
+medir("time() + inc() encendidas", recorrer(*encendidas), base)
+medir("time() + inc() con METRICS=0", recorrer(*apagadas), base)
+
+
+def funcion():
+    return 1
+
+
+for nombre, hist in (("@timed encendidas", encendidas[0]), ("@timed con METRICS=0", apagadas[0])):
+    decorada = timed(hist, 'chat')(funcion)
+    medir(nombre, lambda: [decorada() for _ in range(N)], base)
+
+# Formato de texto: cada línea es un comentario o "nombre{etiquetas} valor"
+registry = Registry()
+hist = registry.histogram('hotel_chat_stage_seconds', 'Duración de cada etapa', ('stage',))
+counter = registry.counter('hotel_chat_branch_total', 'Ramas', ('branch',))
+registry.gauge('hotel_model_ready', 'Modelo listo', lambda: 1)
+registry.gauge('hotel_ticket_writer_lag_seconds', 'Apagado', lambda: None)
+for value in (0.0003, 0.004, 0.02, 0.3, 12.0):
+    hist.observe(value, 'encode')
+counter.inc('fallback', amount=3)
+counter.inc('con "comillas"')
+text = registry.render()
+muestra = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]+="([^"\\]|\\.)*",?)*\})? [0-9.e+-]+$')
+for line in text.splitlines():
+    assert line.startswith('# ') or muestra.match(line), line
+assert 'hotel_chat_stage_seconds_bucket{stage="encode",le="+Inf"} 5' in text, text
+assert 'hotel_chat_stage_seconds_bucket{stage="encode",le="0.0005"} 1' in text, text
+assert 'hotel_chat_stage_seconds_count{stage="encode"} 5' in text, text
+assert 'hotel_chat_branch_total{branch="fallback"} 3' in text, text
+assert 'hotel_model_ready 1.0' in text and '\nhotel_ticket_writer_lag_seconds ' not in text, text
+print("✅ Formato de /metrics válido")
+
+# Varios workers: el master mide algo antes del fork, tres workers suman lo
+# suyo, uno termina antes del scrape y otro atiende /metrics
+tmp_dir = tempfile.mkdtemp()
+registry = Registry()
+counter = registry.counter('hotel_chat_branch_total', 'Ramas', ('branch',))
+hist = registry.histogram('hotel_chat_seconds', 'Chat', ('endpoint',))
+registry.gauge('hotel_model_ready', 'Modelo listo', lambda: 1)
+counter.inc('semantic')
+registry.start_export(tmp_dir)
+registry.stop_export()  # before_fork
+
+workers = []
+for n in range(3):
+    pid = os.fork()
+    if pid == 0:
+        registry.reset()  # after_fork
+        registry.start_export(tmp_dir)
+        counter.inc('semantic', amount=10 * (n + 1))
+        hist.observe(0.01, 'chat')
+        if n == 0:
+            registry.stop_export()  # worker que terminó
+            os._exit(0)
+        time.sleep(1.5)
+        if n == 1:
+            with open(os.path.join(tmp_dir, 'scrape.txt'), 'w', encoding='utf-8') as f:
+                f.write(registry.render())
+        time.sleep(0.5)
+        os._exit(0)
+    workers.append(pid)
+for pid in workers:
+    os.waitpid(pid, 0)
+
+with open(os.path.join(tmp_dir, 'scrape.txt'), encoding='utf-8') as f:
+    text = f.read()
+shutil.rmtree(tmp_dir)
+for line in text.splitlines():
+    assert line.startswith('# ') or muestra.match(line), line
+assert 'hotel_chat_branch_total{branch="semantic"} 61' in text, text
+assert 'hotel_chat_seconds_count{endpoint="chat"} 3' in text, text
+vivos = [line for line in text.splitlines() if line.startswith('hotel_model_ready{')]
+assert len(vivos) == 2 and {f'pid="{pid}"' in text for pid in workers[1:]} == {True}, text
+print("✅ METRICS_DIR: contadores e histogramas sumados entre workers, gauges de los workers vivos")
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+# Tiempo de arranque: desde "import app" hasta la primera respuesta del
+# menú y hasta la primera respuesta semántica, con y sin calentamiento.
+# Cada medición corre en un proceso nuevo (arranque en frío).
+# Uso: python bench_startup.py [repeticiones]
+
+REPETICIONES = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+MEDICION = r"""
+import json, time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter() - t0
+
+client = app.app.test_client()
+r = client.post('/chat', json={'message': 'menu', 'session': 'bench-menu'})
+assert r.status_code == 200
+t_menu = time.perf_counter() - t0
+
+r = client.post('/chat', json={'message': '¿A qué hora es el check-in?', 'session': 'bench-semantic'})
+assert r.status_code == 200 and r.get_json()['source'] == 'semantic'
+t_semantic = time.perf_counter() - t0
+
+print(json.dumps({'import': t_import, 'menu': t_menu, 'semantic': t_semantic}))
+"""
+
+
+def medir(warmup):
+    env = dict(os.environ, MODEL_WARMUP='1' if warmup else '0')
+    out = subprocess.run([sys.executable, '-c', MEDICION], env=env, capture_output=True,
+                         text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+for warmup in (False, True):
+    resultados = [medir(warmup) for _ in range(REPETICIONES)]
+    prom = {k: sum(r[k] for r in resultados) / len(resultados) for k in resultados[0]}
+    print(f"MODEL_WARMUP={int(warmup)}: import {prom['import']:.2f} s | "
+          f"primer menú {prom['menu']:.2f} s | primera respuesta semántica {prom['semantic']:.2f} s")
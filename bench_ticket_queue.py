@@ -0,0 +1,102 @@
+import sys
+import time
+
+from db import get_connection
+from ticket_queue import fetch_queue, fetch_changes, update_status, TICKET_COLUMNS
+
+# Benchmark de la cola de tickets: página N con OFFSET vs. con cursor, y
+# cambio de estado masivo en una sentencia vs. una por ticket.
+# Trabaja sobre una tabla TEMPORAL "tickets" (tapa a la real solo en esta
+# conexión) con los mismos índices que migrations/003; no toca datos reales.
+# Uso: python bench_ticket_queue.py [tickets] [database] [password]
+
+TICKETS = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+overrides = {}
+if len(sys.argv) > 2:
+    overrides['database'] = sys.argv[2]
+if len(sys.argv) > 3:
+    overrides['password'] = sys.argv[3]
+PAGINA = 50
+
+conn = get_connection(**overrides)
+cur = conn.cursor()
+cur.execute("""
+    CREATE TEMP TABLE tickets (
+        id_ticket SERIAL PRIMARY KEY, codigo_ticket TEXT, nombre_cliente TEXT, telefono_cliente TEXT,
+        correo_cliente TEXT, fecha_entrada DATE, fecha_salida DATE, estado TEXT, fecha_creacion TIMESTAMP,
+        mensaje TEXT, id_habitacion INTEGER, actualizado_en TIMESTAMP NOT NULL DEFAULT now()
+    )
+""")
+# ~5% activos, como una tabla con historia
+cur.execute("""
+    INSERT INTO tickets (codigo_ticket, nombre_cliente, correo_cliente, estado, fecha_creacion, actualizado_en)
+    SELECT 'Res-' || n, 'Cliente ' || n, 'cliente' || n || '@test.com',
+           CASE WHEN n % 40 = 0 THEN 'pendiente' WHEN n % 40 = 1 THEN 'en_proceso' ELSE 'cerrado' END,
+           now() - make_interval(secs => %s - n), now() - interval '1 hour' + make_interval(secs => n / 1000.0)
+    FROM generate_series(1, %s) AS n
+""", (TICKETS, TICKETS))
+cur.execute("CREATE INDEX ON tickets (estado, fecha_creacion, id_ticket)")
+cur.execute("CREATE INDEX ON tickets (actualizado_en, id_ticket)")
+cur.execute("ANALYZE tickets")
+conn.commit()
+cur.execute("SELECT COUNT(*) FROM tickets WHERE estado IN ('pendiente', 'en_proceso')")
+activos = cur.fetchone()[0]
+conn.rollback()
+print(f"{TICKETS} tickets, {activos} activos")
+
+
+def medir(nombre, funcion, repeticiones=20):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    print(f"{nombre:<44} p50 {tiempos[len(tiempos) // 2] * 1000:8.2f} ms | max {tiempos[-1] * 1000:8.2f} ms")
+
+
+def pagina_offset(numero):
+    cur.execute(f"""
+        SELECT {', '.join(TICKET_COLUMNS)} FROM tickets
+        WHERE estado IN ('pendiente', 'en_proceso')
+        ORDER BY estado, fecha_creacion, id_ticket LIMIT %s OFFSET %s
+    """, (PAGINA, numero * PAGINA))
+    cur.fetchall()
+    conn.rollback()
+
+
+# Cursores de cada página recorriendo la cola completa
+cursores = [None]
+while True:
+    page = fetch_queue(conn, cursor=cursores[-1], limit=PAGINA)
+    if not page['next_cursor']:
+        break
+    cursores.append(page['next_cursor'])
+ultima = len(cursores) - 1
+print(f"{len(cursores)} páginas de {PAGINA}")
+
+medir("Primera página + total (cursor)", lambda: fetch_queue(conn, limit=PAGINA, with_count=True))
+medir("Primera página (OFFSET)", lambda: pagina_offset(0))
+medir(f"Página {ultima} (cursor)", lambda: fetch_queue(conn, cursor=cursores[ultima], limit=PAGINA))
+medir(f"Página {ultima} (OFFSET)", lambda: pagina_offset(ultima))
+
+inicio_feed = fetch_changes(conn)['cursor']
+cur.execute("UPDATE tickets SET actualizado_en = now() - interval '2 seconds' WHERE id_ticket % 10000 = 0")
+conn.commit()
+medir("Cambios desde el cursor (feed)", lambda: fetch_changes(conn, inicio_feed))
+
+ids = [row['id_ticket'] for row in fetch_queue(conn, estados=['pendiente'], limit=500)['tickets']]
+
+
+def uno_por_uno(estado):
+    for id_ in ids:
+        cur.execute("UPDATE tickets SET estado = %s WHERE id_ticket = %s", (estado, id_))
+    conn.commit()
+
+
+estados = iter(['en_proceso', 'pendiente'] * 20)
+medir(f"Cambiar estado de {len(ids)} (una sentencia)", lambda: update_status(conn, ids, next(estados)), 10)
+estados = iter(['en_proceso', 'pendiente'] * 20)
+medir(f"Cambiar estado de {len(ids)} (uno por uno)", lambda: uno_por_uno(next(estados)), 10)
+
+conn.close()
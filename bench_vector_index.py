@@ -0,0 +1,47 @@
+import time
+
+import torch
+
+from vector_index import ExactIndex, IVFIndex
+
+# Benchmark de los backends de búsqueda con datos sintéticos
+# (dimensión igual a la de paraphrase-multilingual-mpnet-base-v2)
+DIM = 768
+CONSULTAS = 200
+TAMANIOS = [1_000, 10_000, 100_000]
+
+torch.manual_seed(0)
+
+
+def dataset_sintetico(n):
+    # Preguntas agrupadas por temas, como en un catálogo real de FAQ
+    temas = torch.randn(max(1, n // 20), DIM)
+    asignacion = torch.randint(len(temas), (n,))
+    return temas[asignacion] + 0.6 * torch.randn(n, DIM)
+
+
+def medir(index, consultas):
+    inicio = time.perf_counter()
+    resultados = [index.search(q.unsqueeze(0), k=1)[0] for q in consultas]
+    latencia = (time.perf_counter() - inicio) / len(consultas) * 1000
+    return [r[0][0] for r in resultados], latencia
+
+
+print(f"{'filas':>8} | {'exacto (ms)':>11} | {'ivf (ms)':>8} | {'build ivf (s)':>13} | recall@1")
+print("-" * 62)
+for n in TAMANIOS:
+    embeddings = dataset_sintetico(n)
+    # Consultas = parafraseo de preguntas existentes (ruido pequeño)
+    elegidas = torch.randint(n, (CONSULTAS,))
+    consultas = embeddings[elegidas] + 0.3 * torch.randn(CONSULTAS, DIM)
+
+    exacto = ExactIndex(embeddings)
+    inicio = time.perf_counter()
+    ivf = IVFIndex(embeddings)
+    build = time.perf_counter() - inicio
+
+    esperados, t_exacto = medir(exacto, consultas)
+    obtenidos, t_ivf = medir(ivf, consultas)
+    recall = sum(a == b for a, b in zip(esperados, obtenidos)) / CONSULTAS
+
+    print(f"{n:>8} | {t_exacto:>11.3f} | {t_ivf:>8.3f} | {build:>13.2f} | {recall:.3f}")
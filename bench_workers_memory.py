@@ -0,0 +1,79 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+# Memoria por worker de gunicorn con 1, 4 y 8 workers, con y sin pre-fork
+# (MODEL_PRELOAD). Lee RSS y PSS de /proc/<pid>/smaps_rollup (solo Linux).
+# PSS reparte las páginas compartidas entre los procesos que las usan: es
+# la medida que muestra cuánto se ahorra al compartir el modelo.
+# Uso: python bench_workers_memory.py [workers ...]
+
+WORKERS = [int(n) for n in sys.argv[1:]] or [1, 4, 8]
+PORT = 5055
+URL = f"http://127.0.0.1:{PORT}"
+PREGUNTAS = ["¿A qué hora es el check-in?", "¿Tienen piscina?", "¿Aceptan mascotas?"]
+
+
+def memoria(pid):
+    """(rss_mb, pss_mb) de un proceso"""
+    valores = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for linea in f:
+            partes = linea.split()
+            if partes[0] in ('Rss:', 'Pss:'):
+                valores[partes[0]] = int(partes[1]) / 1024
+    return valores['Rss:'], valores['Pss:']
+
+
+def hijos(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def esperar_listo(workers, segundos=600):
+    """Espera varios /ready seguidos en 200 (los workers se reparten las peticiones)"""
+    limite = time.time() + segundos
+    seguidos = 0
+    while time.time() < limite:
+        try:
+            ok = requests.get(f"{URL}/ready", timeout=5).status_code == 200
+        except requests.RequestException:
+            ok = False
+        seguidos = seguidos + 1 if ok else 0
+        if seguidos >= workers * 5:
+            return
+        time.sleep(0.2 if ok else 1)
+    raise TimeoutError("Los workers no quedaron listos")
+
+
+def medir(workers, preload):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{PORT}",
+               MODEL_PRELOAD='1' if preload else '0')
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app'], env=env,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        esperar_listo(workers)
+        # Tocar el camino de inferencia en todos los workers
+        for _ in range(workers * 4):
+            for pregunta in PREGUNTAS:
+                requests.post(f"{URL}/chat", json={'message': pregunta, 'session': 'bench'}, timeout=60)
+
+        por_worker = [memoria(pid) for pid in hijos(master.pid)]
+        rss = sum(r for r, _ in por_worker) / len(por_worker)
+        pss = sum(p for _, p in por_worker) / len(por_worker)
+        total_pss = sum(p for _, p in por_worker) + memoria(master.pid)[1]
+        print(f"{workers} workers | preload={int(preload)} | RSS/worker {rss:7.1f} MB | "
+              f"PSS/worker {pss:7.1f} MB | PSS total (con master) {total_pss:7.1f} MB")
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait()
+
+
+for n in WORKERS:
+    for preload in (False, True):
+        medir(n, preload)
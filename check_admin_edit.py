@@ -0,0 +1,82 @@
+import glob
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import sentence_transformers
+import torch
+
+# Verifica que una edición del panel de admin se ve en /chat enseguida,
+# sin recargar el modelo: cambio de respuesta y cambio de pregunta.
+# La app corre desde una copia temporal del proyecto (con su propio
+# dataset.json y caché de embeddings) y con un codificador de mentira
+# (bolsa de palabras) en lugar del modelo real.
+# Uso: python check_admin_edit.py
+
+DIM = 256
+
+
+class CodificadorDePrueba:
+    """Cada palabra suma 1 en una dimensión fija: preguntas iguales dan cos_sim 1"""
+    device = 'cpu'
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, convert_to_tensor=False, convert_to_numpy=True, **kwargs):
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.split():
+                vectors[i, int(hashlib.md5(word.encode('utf-8')).hexdigest(), 16) % DIM] += 1.0
+        return torch.from_numpy(vectors) if convert_to_tensor else vectors
+
+
+sentence_transformers.SentenceTransformer = CodificadorDePrueba
+
+# Modelo cargado al importar (sin hilo de warmup), sin conexiones a
+# PostgreSQL al arrancar y sin servidor de inferencia
+os.environ['MODEL_PRELOAD'] = '1'
+os.environ['DB_POOL_MIN'] = '0'
+os.environ.pop('INFERENCE_URL', None)
+
+tmp_dir = tempfile.mkdtemp()
+for path in glob.glob('*.py') + ['dataset.json']:
+    shutil.copy(path, tmp_dir)
+sys.path.insert(0, tmp_dir)
+
+try:
+    import app
+    client = app.app.test_client()
+
+    def preguntar(mensaje, session='check-admin-edit'):
+        return client.post('/chat', json={'message': mensaje, 'session': session}).get_json()
+
+    def responde(item):
+        respuesta = preguntar(item['question'], session=f"check-admin-edit-{item['id']}")
+        return respuesta['source'] == 'semantic' and item['response'] in respuesta['reply']
+
+    # Un item que responde el modelo semántico (no un menú ni una palabra clave)
+    item = dict(next(it for it in app.DATASET if responde(it)))
+
+    # 1. Nueva respuesta: la misma pregunta ya responde lo editado
+    nueva = "Respuesta editada desde el panel de administrador."
+    r = client.post('/admin/update-item', json={'id': item['id'], 'response': nueva})
+    assert r.get_json()['success'], r.get_json()
+    respuesta = preguntar(item['question'])
+    assert nueva in respuesta['reply'] and item['response'] not in respuesta['reply'], respuesta
+
+    # 2. Nueva pregunta: se recodifica solo esa fila y /chat la encuentra
+    pregunta = "zafiro turquesa lavanda"
+    r = client.post('/admin/update-item', json={'id': item['id'], 'question': pregunta})
+    assert r.get_json()['success'], r.get_json()
+    respuesta = preguntar(pregunta)
+    assert respuesta['source'] == 'semantic' and nueva in respuesta['reply'], respuesta
+    print(f"✅ Edición del item {item['id']} visible en /chat sin recargar el modelo")
+finally:
+    shutil.rmtree(tmp_dir)
@@ -0,0 +1,71 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+from availability import AvailabilityIndex, ROOM_COLUMNS
+
+# Verifica la sincronización incremental del índice de disponibilidad con
+# una base de mentira: reservas hechas por otro proceso entran en el índice
+# sin esperar la recarga completa y la marca de la última lectura avanza.
+# tickets.actualizado_en es TIMESTAMP (sin zona), como en migrations/002.
+
+AHORA = datetime(2030, 1, 1, 12, 0, 0)
+habitaciones = [dict(zip(ROOM_COLUMNS, (i, str(100 + i), 2, 80.0, 'disponible', None, 1))) for i in (1, 2, 3)]
+tickets = []  # (codigo, id_habitacion, entrada, salida, estado, actualizado_en)
+
+
+class CursorDePrueba:
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        if sql.startswith(f"SELECT {', '.join(ROOM_COLUMNS)} FROM habitaciones"):
+            self.rows = [tuple(room[c] for c in ROOM_COLUMNS) for room in habitaciones]
+        elif 'MAX(actualizado_en)' in sql:
+            ultimo = max((t[5] for t in tickets), default=None)
+            # Como en PostgreSQL: COALESCE(timestamp, now()) da timestamptz
+            if re.search(r'now\(\)(?!::timestamp)', sql):
+                self.rows = [((ultimo or AHORA).replace(tzinfo=timezone.utc),)]
+            else:
+                self.rows = [(ultimo or AHORA,)]
+        elif 'WHERE actualizado_en >' in sql:
+            self.rows = sorted((t for t in tickets if t[5] > params[0]), key=lambda t: t[5])
+        elif 'WHERE id_habitacion IS NOT NULL' in sql:
+            self.rows = [t[:5] for t in tickets if t[1] is not None]
+        else:
+            raise AssertionError(f"Consulta inesperada: {sql}")
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+class ConexionDePrueba:
+    def cursor(self):
+        return CursorDePrueba()
+
+    def rollback(self):
+        pass
+
+
+conn = ConexionDePrueba()
+index = AvailabilityIndex()
+index.sync(conn)
+assert index.count_free('2030-02-01', '2030-02-05') == 3
+inicio = index._last_change
+assert inicio.tzinfo is None, inicio
+
+# Otro worker reserva dos habitaciones: las dos entran en la siguiente lectura
+tickets.append(('Res-001', 1, '2030-02-01', '2030-02-05', 'pendiente', AHORA + timedelta(seconds=1)))
+tickets.append(('Res-002', 2, '2030-02-03', '2030-02-06', 'pendiente', AHORA + timedelta(seconds=2)))
+index.sync(conn)
+libres = [room['id_habitacion'] for room in index.free_rooms('2030-02-01', '2030-02-05')]
+assert libres == [3], libres
+assert index._last_change == AHORA + timedelta(seconds=2), index._last_change
+
+# Una cancelación libera la habitación en la lectura siguiente
+tickets[0] = tickets[0][:4] + ('cancelado', AHORA + timedelta(seconds=3))
+index.sync(conn)
+libres = [room['id_habitacion'] for room in index.free_rooms('2030-02-01', '2030-02-05')]
+assert libres == [1, 3], libres
+assert index._last_change == AHORA + timedelta(seconds=3), index._last_change
+print("✅ Sincronización incremental: reservas y cancelaciones de otros procesos aplicadas")
@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from dataset_store import DatasetStore
+
+# Verifica que el log de cambios del dataset no pierde ediciones:
+# escritores concurrentes, un corte a mitad de línea y la compactación.
+
+tmp_dir = tempfile.mkdtemp()
+path = os.path.join(tmp_dir, 'dataset.json')
+shutil.copy('dataset.json', path)
+
+try:
+    store = DatasetStore(path, compact_every=50)
+    base = len(store.current().items)
+
+    # 1. Varios hilos agregando items a la vez
+    def agregar(hilo):
+        for n in range(40):
+            store.add_item({'id': f"{hilo}-{n}", 'question': f"pregunta {hilo} {n}",
+                            'response': 'ok', 'intent': 'prueba'})
+
+    hilos = [threading.Thread(target=agregar, args=(h,)) for h in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    store.update_item('0-0', {'response': 'editada'})
+    store.delete_item('0-1')
+    esperado = base + 8 * 40 - 1
+
+    # 2. Simular un corte: el proceso muere a mitad de escribir una línea
+    with open(store.log_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "item": {"id": "cortado"')
+
+    # 3. "Reiniciar": un store nuevo lee snapshot + log
+    recuperado = DatasetStore(path)
+    items = recuperado.current().items
+    ids = [it['id'] for it in items]
+    assert len(items) == esperado, (len(items), esperado)
+    assert len(set(ids)) == len(ids), "ids duplicados"
+    assert 'cortado' not in ids and '0-1' not in ids
+    assert next(it for it in items if it['id'] == '0-0')['response'] == 'editada'
+
+    # 4. Después del corte se puede seguir escribiendo y compactar
+    recuperado.add_item({'id': 'despues', 'question': 'x', 'response': 'y'})
+    recuperado.compact()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert len(json.load(f)) == esperado + 1
+    assert os.path.getsize(recuperado.log_path) == 0
+
+    print(f"✅ Sin ediciones perdidas ({esperado + 1} items)")
+finally:
+    shutil.rmtree(tmp_dir)
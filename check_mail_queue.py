@@ -0,0 +1,127 @@
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+
+from mail_queue import MailQueue
+
+# Verifica la cola de correos contra un servidor SMTP local de prueba:
+# reutiliza la conexión, reintenta cuando el servidor falla y manda a
+# dead-letter los destinatarios rechazados. Con varias colas sobre la misma
+# base (un hilo de envío por worker) cada mensaje sale una sola vez.
+
+recibidos = []
+conexiones = [0]
+fallar = threading.Event()
+
+
+class SMTPDePrueba(socketserver.StreamRequestHandler):
+    def handle(self):
+        conexiones[0] += 1
+        self.responder("220 localhost listo")
+        while True:
+            linea = self.rfile.readline().decode('utf-8', 'replace').strip()
+            if not linea:
+                return
+            comando = linea.split(' ', 1)[0].upper()
+            if fallar.is_set():
+                self.responder("421 servicio no disponible")
+                return
+            if comando in ('EHLO', 'HELO'):
+                self.responder("250 localhost")
+            elif comando == 'MAIL':
+                self.responder("250 ok")
+            elif comando == 'RCPT':
+                if 'rechazado' in linea:
+                    self.responder("550 buzón inexistente")
+                else:
+                    self.responder("250 ok")
+            elif comando == 'DATA':
+                self.responder("354 adelante")
+                datos = []
+                while True:
+                    l = self.rfile.readline()
+                    if l in (b'.\r\n', b'.\n', b''):
+                        break
+                    datos.append(l)
+                recibidos.append(b''.join(datos))
+                self.responder("250 guardado")
+            elif comando == 'RSET' or comando == 'NOOP':
+                self.responder("250 ok")
+            elif comando == 'QUIT':
+                self.responder("221 chao")
+                return
+            else:
+                self.responder("502 no implementado")
+
+    def responder(self, texto):
+        self.wfile.write((texto + "\r\n").encode('utf-8'))
+
+
+def esperar(condicion, segundos=10):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        if condicion():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+servidor = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPDePrueba)
+servidor.daemon_threads = True
+threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+tmp_dir = tempfile.mkdtemp()
+db_path = os.path.join(tmp_dir, 'mail_queue.db')
+cola = MailQueue(db_path, '127.0.0.1', servidor.server_address[1], use_tls=False,
+                 batch_size=10, max_attempts=3, backoff_base=0.2)
+cola.start()
+
+# 1. Varios mensajes por una sola conexión
+for n in range(25):
+    cola.enqueue('hotel@test.com', 'contacto@test.com', f"Mensaje {n}", f"<p>{n}</p>")
+assert esperar(lambda: len(recibidos) == 25), len(recibidos)
+assert conexiones[0] == 1, conexiones[0]
+
+# 2. Servidor caído: los mensajes esperan y se reintentan
+fallar.set()
+cola._close_server()
+cola.enqueue('hotel@test.com', 'contacto@test.com', "Durante la caída", "<p>x</p>")
+time.sleep(0.5)
+fallar.clear()
+assert esperar(lambda: len(recibidos) == 26), len(recibidos)
+
+# 3. Destinatario rechazado: va directo a dead-letter
+cola.enqueue('hotel@test.com', 'rechazado@test.com', "Rebota", "<p>x</p>")
+assert esperar(lambda: cola.stats().get('dead') == 1), cola.stats()
+
+# 4. La cola es persistente: lo pendiente sobrevive a un reinicio
+cola.stop()
+cola.enqueue('hotel@test.com', 'contacto@test.com', "Después del reinicio", "<p>x</p>")
+cola = MailQueue(db_path, '127.0.0.1', servidor.server_address[1], use_tls=False)
+cola.start()
+assert esperar(lambda: len(recibidos) == 27), len(recibidos)
+
+# 5. Cuatro workers sobre la misma base: ningún mensaje sale dos veces
+cola.stop()
+workers = [MailQueue(db_path, '127.0.0.1', servidor.server_address[1], use_tls=False, batch_size=5)
+           for _ in range(4)]
+for n in range(60):
+    workers[n % 4].enqueue('hotel@test.com', 'contacto@test.com', f"Compartido {n}", f"<p>{n}</p>")
+for worker in workers:
+    worker.start()
+assert esperar(lambda: workers[0].stats().get('pendiente', 0) == 0), workers[0].stats()
+time.sleep(0.3)
+compartidos = [m for m in recibidos if b'Subject: Compartido' in m]
+asuntos = {m.split(b'Subject: ', 1)[1].split(b'\n', 1)[0].strip() for m in compartidos}
+assert len(compartidos) == 60 and len(asuntos) == 60, (len(compartidos), len(asuntos))
+assert sum(worker.sent for worker in workers) == 60
+for worker in workers:
+    worker.stop()
+
+print(f"✅ Cola de correos OK: {len(recibidos)} enviados, {conexiones[0]} conexiones SMTP")
+print(workers[0].stats())
+servidor.shutdown()
+shutil.rmtree(tmp_dir)
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+from db import ConnectionPool
+
+# Verifica el pool de conexiones con SQLite como reemplazo local de
+# PostgreSQL: muchos hilos escribiendo, tope de conexiones y reconexión.
+
+tmp_dir = tempfile.mkdtemp()
+db_path = os.path.join(tmp_dir, 'pool.db')
+
+
+def conectar():
+    return sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+
+
+with conectar() as conn:
+    conn.execute("CREATE TABLE tickets (id INTEGER PRIMARY KEY, hilo INTEGER)")
+
+pool = ConnectionPool(min_size=2, max_size=5, timeout=10, check_after=0, factory=conectar)
+en_uso = []
+max_en_uso = [0]
+lock = threading.Lock()
+errores = []
+
+
+def trabajar(hilo):
+    for _ in range(20):
+        try:
+            with pool.connection() as conn:
+                with lock:
+                    en_uso.append(conn)
+                    max_en_uso[0] = max(max_en_uso[0], len(en_uso))
+                conn.execute("INSERT INTO tickets (hilo) VALUES (?)", (hilo,))
+                conn.commit()
+                with lock:
+                    en_uso.remove(conn)
+        except Exception as e:
+            errores.append(e)
+
+
+hilos = [threading.Thread(target=trabajar, args=(h,)) for h in range(50)]
+for h in hilos:
+    h.start()
+for h in hilos:
+    h.join()
+
+# Una conexión cerrada por fuera se detecta y se reemplaza
+conn = pool.getconn()
+conn.close()
+pool.putconn(conn)
+with pool.connection() as conn:
+    total = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+stats = pool.stats()
+assert not errores, errores[:3]
+assert total == 50 * 20, total
+assert max_en_uso[0] <= 5, max_en_uso[0]
+assert stats['in_use'] == 0, stats
+print(f"✅ Pool OK: {total} inserts, máx. {max_en_uso[0]} conexiones en uso")
+print(stats)
+
+pool.closeall()
+os.remove(db_path)
+os.rmdir(tmp_dir)
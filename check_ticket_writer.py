@@ -0,0 +1,203 @@
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from db import ConnectionPool
+from ticket_writer import TicketWriter
+
+# Verifica la escritura diferida de tickets con SQLite como reemplazo local
+# de PostgreSQL: ráfagas en pocos lotes, caída de la base, reintento de un
+# lote ya guardado (sin duplicados), fila inválida aislada y reinicio.
+
+tmp_dir = tempfile.mkdtemp()
+pg_path = os.path.join(tmp_dir, 'postgres.db')
+caida = threading.Event()          # la "base" no acepta conexiones
+perder_respuesta = threading.Event()  # el próximo commit se guarda pero "se corta la red"
+secuencias = {}
+lock = threading.Lock()
+
+
+def siguiente_codigo_ticket(prefijo, secuencia):
+    with lock:
+        secuencias[secuencia] = secuencias.get(secuencia, 0) + 1
+        return f"{prefijo}-{secuencias[secuencia]:03d}"
+
+
+def fecha(valor):
+    if valor is None:
+        return None
+    if not re.fullmatch(r'\d{4}-\d{2}-\d{2}', valor):
+        raise psycopg2.DataError(f'invalid input syntax for type date: "{valor}"')
+    return valor
+
+
+def a_sqlite(sql, params):
+    """Lo justo del dialecto de PostgreSQL que usa ticket_writer.py"""
+    params = list(params)
+    # = ANY(%s) / <> ALL(%s) con una lista -> IN / NOT IN (?, ?, ...)
+    for operador, sqlite in (('= ANY(%s)', 'IN'), ('<> ALL(%s)', 'NOT IN')):
+        while operador in sql:
+            pos = sql[:sql.index(operador)].count('%s')
+            valores = params.pop(pos)
+            sql = sql.replace(operador, f"{sqlite} ({', '.join(['%s'] * len(valores))})", 1)
+            params[pos:pos] = valores
+    sql = sql.replace('%s::date', 'fecha(%s)')
+    sql = re.sub(r'::\w+', '', sql).replace('FOR UPDATE', '').replace('%s', '?')
+    sql = sql.replace('generate_series(1, ?)',
+                      '(WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < ?) SELECT n FROM s)')
+    return sql, params
+
+
+class CursorDePrueba:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.db.cursor()
+
+    def execute(self, sql, params=()):
+        if caida.is_set():
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.cur.execute(*a_sqlite(sql, params))
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+    def fetchone(self):
+        return self.cur.fetchone()
+
+
+class ConexionDePrueba:
+    closed = 0
+
+    def __init__(self):
+        if caida.is_set():
+            raise psycopg2.OperationalError('could not connect to server: Connection refused')
+        self.db = sqlite3.connect(pg_path, timeout=30, check_same_thread=False)
+        self.db.create_function('siguiente_codigo_ticket', 2, siguiente_codigo_ticket)
+        self.db.create_function('fecha', 1, fecha)
+
+    def cursor(self):
+        return CursorDePrueba(self)
+
+    def commit(self):
+        self.db.commit()
+        if perder_respuesta.is_set():
+            perder_respuesta.clear()
+            raise psycopg2.OperationalError('connection lost after commit')
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        self.db.close()
+        self.closed = 1
+
+
+def esperar(condicion, segundos=15):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        if condicion():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def tickets():
+    with sqlite3.connect(pg_path) as db:
+        return db.execute("SELECT codigo_ticket, id_envio, id_habitacion FROM tickets").fetchall()
+
+
+with sqlite3.connect(pg_path) as db:
+    db.executescript("""
+        CREATE TABLE habitaciones (id_habitacion INTEGER PRIMARY KEY, estado TEXT);
+        INSERT INTO habitaciones VALUES (1, 'disponible'), (2, 'mantenimiento'), (3, NULL);
+        CREATE TABLE tickets (
+            id_ticket INTEGER PRIMARY KEY, codigo_ticket TEXT, nombre_cliente TEXT, telefono_cliente TEXT,
+            correo_cliente TEXT, fecha_entrada TEXT, fecha_salida TEXT, estado TEXT, fecha_creacion TEXT,
+            mensaje TEXT, id_habitacion INTEGER, id_envio TEXT UNIQUE
+        );
+    """)
+
+pool = ConnectionPool(min_size=1, max_size=4, timeout=5, check_after=0, factory=ConexionDePrueba)
+cola_path = os.path.join(tmp_dir, 'ticket_writer.db')
+escritos = []
+writer = TicketWriter(cola_path, pool, on_flushed=escritos.extend, window_ms=50,
+                      backoff_base=0.1, backoff_max=0.5, max_attempts=3, code_stock=50)
+writer.start()
+assert esperar(lambda: writer.stats()['codigos_reservados']['queja'] == 50), writer.stats()
+
+
+def queja(n):
+    return writer.enqueue('queja', {'nombre': f"Cliente {n}", 'correo': f"c{n}@test.com", 'estado': 'pendiente',
+                                    'creado': '2030-01-01T10:00:00', 'mensaje': 'Prueba'})
+
+
+# 1. Ráfaga: 300 quejas desde 30 hilos, pocas escrituras en la base
+with ThreadPoolExecutor(30) as hilos:
+    respuestas = list(hilos.map(queja, range(300)))
+assert esperar(lambda: len(tickets()) == 300), len(tickets())
+stats = writer.stats()
+assert stats['lotes'] < 50, stats
+codigos = [codigo for codigo, _, _ in tickets()]
+assert len(set(codigos)) == 300, "códigos repetidos"
+# Los códigos que se dieron al huésped son los que quedaron guardados
+assert {c for _, c in respuestas if c} <= set(codigos)
+print(f"✅ Ráfaga: 300 tickets en {stats['lotes']} lotes (máx. {stats['max_lote']})")
+
+# 2. Base caída: los tickets esperan en la cola y el lag crece
+caida.set()
+for n in range(300, 340):
+    queja(n)
+time.sleep(1.0)
+stats = writer.stats()
+assert stats['pendientes'] == 40 and stats['lag_s'] >= 0.9 and stats['caidas'] > 0, stats
+assert len(tickets()) == 300
+caida.clear()
+assert esperar(lambda: writer.stats()['pendientes'] == 0), writer.stats()
+assert len(tickets()) == 340, len(tickets())
+print(f"✅ Caída: 40 tickets esperaron {stats['lag_s']:.1f}s en la cola y se escribieron al volver la base")
+
+# 3. El commit llega a la base pero la respuesta se pierde: el reintento no duplica
+writer.stop()
+for n in range(340, 350):
+    queja(n)
+perder_respuesta.set()
+writer.start()
+assert esperar(lambda: writer.stats()['pendientes'] == 0), writer.stats()
+assert len(tickets()) == 350, len(tickets())
+assert writer.stats()['duplicados'] == 10, writer.stats()
+print("✅ Reintento idempotente: 10 tickets reenviados, ninguno duplicado")
+
+# 4. Una fila inválida no frena a las demás y termina en dead-letter
+writer.enqueue('reserva', {'nombre': 'Fecha mala', 'entrada': '2030-13-45x', 'salida': '2030-01-03',
+                           'estado': 'pendiente', 'creado': '2030-01-01T10:00:00'})
+for n in range(350, 355):
+    queja(n)
+assert esperar(lambda: writer.stats()['dead'] == 1 and len(tickets()) == 355), (writer.stats(), len(tickets()))
+
+# 5. Reservas para la misma habitación en el mismo lote: la segunda queda sin asignar
+writer.stop()
+for n, (entrada, salida) in enumerate([('2030-02-01', '2030-02-05'), ('2030-02-03', '2030-02-06')]):
+    writer.enqueue('reserva', {'nombre': f"Huésped {n}", 'entrada': entrada, 'salida': salida,
+                               'estado': 'pendiente', 'creado': '2030-01-01T10:00:00', 'habitacion': 1})
+# Y una reserva para una habitación que pasó a mantenimiento también
+writer.enqueue('reserva', {'nombre': 'Huésped 2', 'entrada': '2030-02-01', 'salida': '2030-02-05',
+                           'estado': 'pendiente', 'creado': '2030-01-01T10:00:00', 'habitacion': 2})
+# 6. Lo pendiente sobrevive a un reinicio
+writer.close()
+writer = TicketWriter(cola_path, pool, on_flushed=escritos.extend, window_ms=50)
+writer.start()
+assert esperar(lambda: len(tickets()) == 358), len(tickets())
+habitaciones = [row['habitacion'] for row in escritos[-3:]]
+assert sorted(habitaciones, key=str) == [1, None, None], habitaciones
+print("✅ Fila inválida aislada, solapamiento y habitación en mantenimiento resueltos, cola persistente tras reinicio")
+print(writer.stats())
+
+writer.close()
+shutil.rmtree(tmp_dir)
@@ -0,0 +1,50 @@
+import itertools
+
+_versions = itertools.count(1)
+
+
+class DatasetIndex:
+    """Índice del dataset construido una sola vez por versión.
+
+    Guarda id -> item, intent -> items (en el orden del dataset) y los
+    textos de submenú ya renderizados, para que /menu, /faq y los submenús
+    del chat no recorran el dataset en cada petición.
+    """
+
+    def __init__(self, items):
+        self.version = next(_versions)
+        self.by_id = {}
+        self.by_intent = {}
+
+        for item in items:
+            self.by_intent.setdefault(item.get('intent', 'general'), []).append(item)
+            try:
+                self.by_id[int(item.get('id'))] = item
+            except (TypeError, ValueError):
+                pass
+
+        self.menu = [{'intent': k, 'count': len(v)} for k, v in self.by_intent.items()]
+        self.menu_items = {
+            intent: [{'id': it['id'], 'question': it['question']} for it in its]
+            for intent, its in self.by_intent.items()
+        }
+        self.submenu_texts = {intent: render_submenu(intent, its) for intent, its in self.by_intent.items()}
+
+    def items_for(self, intent):
+        return self.by_intent.get(intent, [])
+
+    def get(self, item_id):
+        return self.by_id.get(int(item_id))
+
+    def submenu_text(self, intent):
+        return self.submenu_texts.get(intent) or render_submenu(intent, [])
+
+
+def render_submenu(intent, items):
+    if not items:
+        return "No hay información disponible para esta sección."
+    submenu_text = f"Has seleccionado '{intent}'. Estas son las opciones disponibles:\n"
+    for idx, it in enumerate(items, start=1):
+        submenu_text += f"{idx}. {it['question']}\n"
+    submenu_text += "\nEscribe el número de la pregunta para ver la respuesta o 'menu' para regresar al inicio."
+    return submenu_text
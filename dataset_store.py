@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializa dentro del proceso
+    fcntl = None
+
+from dataset_index import DatasetIndex
+
+# Versión publicada del dataset: todo lo que se sirve sale de aquí
+DatasetSnapshot = namedtuple('DatasetSnapshot', ['items', 'index', 'stats', 'etag'])
+
+
+class DatasetStore:
+    """Dataset en memoria persistido como snapshot + log de cambios.
+
+    - dataset.json es el snapshot; se escribe siempre a un temporal y se
+      renombra, así nunca queda un archivo a medias.
+    - Cada alta/cambio/baja se agrega como una línea a dataset.json.log
+      (con fsync) en vez de reescribir todo el JSON.
+    - Cada `compact_every` cambios el log se vuelca a un snapshot nuevo.
+
+    Las operaciones del log son idempotentes (put/delete por id), así que
+    volver a aplicarlas después de un corte no cambia el resultado.
+    El archivo solo se vuelve a leer si cambió en disco (como mucho una vez
+    cada `check_interval` segundos).
+    """
+
+    def __init__(self, path, check_interval=2.0, compact_every=200):
+        self.path = path
+        self.log_path = path + '.log'
+        self.lock_path = path + '.lock'
+        self.check_interval = check_interval
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._file_state = None
+        self._last_check = 0.0
+        self._log_entries = 0
+        self._snapshot = None
+        self.load()
+
+    def current(self):
+        return self._snapshot
+
+    def load(self):
+        """Lee snapshot + log del disco y publica el resultado"""
+        with self._locked(shared=True):
+            self._load()
+        return self._snapshot
+
+    def refresh_due(self):
+        """¿El próximo refresh() va a mirar el disco?"""
+        return time.monotonic() - self._last_check >= self.check_interval
+
+    def refresh(self):
+        """Recarga el dataset solo si los archivos cambiaron fuera de este
+        proceso. Devuelve True si hubo recarga."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        if self._stat() == self._file_state:
+            return False
+        self.load()
+        return True
+
+    def add_item(self, item):
+        """Agrega un item; devuelve False si el id ya existe"""
+        with self._locked():
+            if any(it.get('id') == item.get('id') for it in self._snapshot.items):
+                return False
+            self._write({'op': 'put', 'item': item})
+        return True
+
+    def update_item(self, item_id, changes):
+        """Actualiza campos de un item; devuelve el item nuevo o None"""
+        with self._locked():
+            for it in self._snapshot.items:
+                if it.get('id') == item_id:
+                    item = dict(it, **changes)
+                    self._write({'op': 'put', 'item': item})
+                    return item
+        return None
+
+    def delete_item(self, item_id):
+        with self._locked():
+            if not any(it.get('id') == item_id for it in self._snapshot.items):
+                return False
+            self._write({'op': 'delete', 'id': item_id})
+        return True
+
+    def replace_all(self, items):
+        """Reemplaza el dataset completo (importación)"""
+        with self._locked():
+            self._write_snapshot(items)
+            self._publish(items)
+        return self._snapshot
+
+    def compact(self):
+        """Vuelca el log a un snapshot nuevo de dataset.json"""
+        with self._locked():
+            self._write_snapshot(self._snapshot.items)
+            self._publish(self._snapshot.items)
+
+    # ---- internos (siempre con el lock tomado) ----
+
+    @contextmanager
+    def _locked(self, shared=False):
+        """Lock del hilo + flock del archivo, para que varios workers que
+        escriben el mismo dataset se serialicen"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                try:
+                    if not shared and self._stat() != self._file_state:
+                        # Otro proceso escribió: partir de su versión
+                        self._load()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        items = []
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+
+        self._log_entries = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'rb') as f:
+                good_offset = 0
+                for line in f:
+                    try:
+                        op = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        op = None
+                    if op is None or not line.endswith(b'\n'):
+                        # Última línea cortada por un corte: se descarta para
+                        # que las siguientes escrituras empiecen en una línea limpia
+                        f.close()
+                        os.truncate(self.log_path, good_offset)
+                        break
+                    items = _apply(items, op)
+                    good_offset += len(line)
+                    self._log_entries += 1
+
+        self._file_state = self._stat()
+        self._last_check = time.monotonic()
+        self._publish(items)
+
+    def _write(self, op):
+        items = _apply(self._snapshot.items, op)
+
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(op, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_entries += 1
+
+        if self._log_entries >= self.compact_every:
+            self._write_snapshot(items)
+        self._file_state = self._stat()
+        self._publish(items)
+
+    def _write_snapshot(self, items):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # El log ya está incluido en el snapshot
+        open(self.log_path, 'w').close()
+        self._log_entries = 0
+        self._file_state = self._stat()
+
+    def _publish(self, items):
+        state = self._file_state
+        self._snapshot = DatasetSnapshot(
+            items=items,
+            index=DatasetIndex(items),
+            stats=self._build_stats(items, state),
+            # Mismo ETag en todos los workers que vean los mismos archivos
+            etag=hashlib.sha1(repr(state).encode('utf-8')).hexdigest(),
+        )
+
+    def _build_stats(self, items, state):
+        last_modified = None
+        if state:
+            mtime = max(s[0] for s in state if s)
+            last_modified = datetime.fromtimestamp(mtime / 1e9).strftime('%Y-%m-%d %H:%M:%S')
+        return {
+            'total_items': len(items),
+            'unique_intents': len(set(item.get('intent', 'general') for item in items)),
+            'last_modified': last_modified,
+        }
+
+    def _stat(self):
+        states = []
+        for path in (self.path, self.log_path):
+            try:
+                st = os.stat(path)
+                states.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                states.append(None)
+        return tuple(states) if any(states) else None
+
+
+def _apply(items, op):
+    """Aplica una operación del log y devuelve una lista nueva"""
+    if op.get('op') == 'put':
+        item = op['item']
+        items = list(items)
+        for i, it in enumerate(items):
+            if it.get('id') == item.get('id'):
+                items[i] = item
+                return items
+        items.append(item)
+        return items
+    if op.get('op') == 'delete':
+        return [it for it in items if it.get('id') != op['id']]
+    return items
@@ -1,10 +1,165 @@
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
 
-def get_connection():
-    return psycopg2.connect(
-        host="localhost",
-        database="hotel_db",
-        user="postgres",
-        password="admin",
-        port="5432"
-    )
\ No newline at end of file
+DB_DEFAULTS = dict(
+    host="localhost",
+    database="hotel_db",
+    user="postgres",
+    password="admin",
+    port="5432"
+)
+
+def get_connection(**overrides):
+    params = dict(DB_DEFAULTS)
+    params.update(overrides)
+    return psycopg2.connect(**params)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Pool de conexiones thread-safe sobre get_connection.
+
+    - Mantiene entre `min_size` y `max_size` conexiones abiertas.
+    - Antes de entregar una conexión que estuvo inactiva más de
+      `check_after` segundos la prueba con SELECT 1 y, si falló, la
+      reemplaza por una nueva.
+    - Al devolver una conexión con una transacción fallida hace rollback,
+      así un error no envenena a las siguientes peticiones.
+    """
+
+    def __init__(self, min_size=1, max_size=10, timeout=5.0, check_after=30.0,
+                 factory=get_connection, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self._factory = lambda: factory(**connect_kwargs)
+        self._cond = threading.Condition()
+        self._idle = []  # [(conexión, momento en que quedó libre)]
+        self._size = 0
+        self._metrics = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'reconnects': 0,
+            'wait_total_ms': 0.0,
+            'wait_max_ms': 0.0,
+        }
+        for _ in range(min_size):
+            try:
+                self._idle.append((self._factory(), time.monotonic()))
+                self._size += 1
+            except Exception as e:
+                # La base puede no estar arriba todavía: se reintenta al pedirla
+                print("❌ Error abriendo conexión del pool:", e)
+                break
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeout(f"No hay conexiones libres después de {self.timeout}s")
+                self._cond.wait(remaining)
+
+            if self._idle:
+                conn, idle_since = self._idle.pop()
+            else:
+                conn, idle_since = None, None
+                self._size += 1
+
+            wait_ms = (time.monotonic() - start) * 1000
+            self._metrics['checkouts'] += 1
+            self._metrics['wait_total_ms'] += wait_ms
+            self._metrics['wait_max_ms'] = max(self._metrics['wait_max_ms'], wait_ms)
+
+        try:
+            if conn is None:
+                conn = self._factory()
+            elif not self._healthy(conn, idle_since):
+                self._close(conn)
+                conn = self._factory()
+                with self._cond:
+                    self._metrics['reconnects'] += 1
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn, broken=False):
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            if broken or getattr(conn, 'closed', 0):
+                self._size -= 1
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Conexión caída: no vuelve al pool
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, broken=broken)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._metrics)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        stats['wait_avg_ms'] = stats['wait_total_ms'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+    def closeall(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                self._close(conn)
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def _healthy(self, conn, idle_since):
+        if getattr(conn, 'closed', 0):
+            return False
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
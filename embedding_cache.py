@@ -0,0 +1,91 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+# Caché en disco de los embeddings de las preguntas del dataset.
+# Cada fila se identifica por el hash de (modelo, pregunta limpia), así que
+# solo se vuelven a codificar las preguntas nuevas o modificadas.
+# Claves y vectores van juntos en un solo .npz: quien lee nunca ve vectores
+# de una versión con las claves de otra.
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'embeddings')
+
+
+def question_key(model_name, question):
+    return hashlib.sha256(f"{model_name}\0{question}".encode('utf-8')).hexdigest()
+
+
+def cache_path(model_name, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{model_name.replace('/', '__')}.npz")
+
+
+def _load(model_name, cache_dir):
+    try:
+        with np.load(cache_path(model_name, cache_dir)) as data:
+            keys, vectors = data['keys'].tolist(), data['vectors']
+    except (OSError, ValueError, KeyError):
+        return [], None
+    if len(keys) != len(vectors):
+        return [], None
+    return keys, vectors
+
+
+def _save(model_name, cache_dir, keys, vectors):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(model_name, cache_dir)
+
+    # Temporal con nombre propio (dos workers pueden guardar a la vez) y un
+    # solo rename: el caché nunca queda a medias
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, keys=np.array(keys, dtype=str), vectors=vectors)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_embeddings(model, model_name, questions, cache_dir=CACHE_DIR, batch_size=1024, on_progress=None):
+    """Devuelve el tensor de embeddings de `questions`, leyendo del caché
+    lo que ya exista y codificando solo las preguntas que falten (en lotes
+    de `batch_size`, avisando a `on_progress(hechas, total)`)."""
+    keys = [question_key(model_name, q) for q in questions]
+    cached_keys, cached_vectors = _load(model_name, cache_dir)
+
+    # Caso rápido: el caché coincide exactamente con el dataset
+    if cached_vectors is not None and cached_keys == keys:
+        return torch.from_numpy(cached_vectors).to(model.device)
+
+    position = {key: i for i, key in enumerate(cached_keys)}
+    missing = [i for i, key in enumerate(keys) if key not in position]
+
+    new_vectors = None
+    if missing:
+        print(f"Codificando {len(missing)} preguntas nuevas o modificadas...")
+        parts = []
+        for start in range(0, len(missing), batch_size):
+            batch = [questions[i] for i in missing[start:start + batch_size]]
+            parts.append(model.encode(batch, convert_to_numpy=True))
+            if on_progress:
+                on_progress(min(start + batch_size, len(missing)), len(missing))
+        new_vectors = np.concatenate(parts)
+
+    if cached_vectors is not None:
+        dim = cached_vectors.shape[1]
+    elif new_vectors is not None:
+        dim = new_vectors.shape[1]
+    else:
+        dim = model.get_sentence_embedding_dimension()
+    vectors = np.empty((len(keys), dim), dtype=np.float32)
+
+    for i, key in enumerate(keys):
+        if key in position:
+            vectors[i] = cached_vectors[position[key]]
+    if missing:
+        vectors[missing] = new_vectors
+
+    _save(model_name, cache_dir, keys, vectors)
+    return torch.from_numpy(vectors).to(model.device)
@@ -0,0 +1,117 @@
+import threading
+from collections import namedtuple
+
+import torch
+
+from semantic import clean_text
+from embedding_cache import load_embeddings
+from vector_index import make_vector_index
+
+# Foto inmutable del índice. Los lectores toman una y la usan completa,
+# así nunca ven preguntas de una versión y embeddings de otra.
+IndexSnapshot = namedtuple('IndexSnapshot', ['ids', 'questions', 'responses', 'embeddings', 'search', 'version'])
+
+
+class EmbeddingIndex:
+    """Índice de embeddings de las preguntas del dataset.
+
+    Las altas, cambios y bajas codifican solo la pregunta afectada y
+    publican una foto nueva con una sola asignación, sin tocar la anterior.
+    """
+
+    def __init__(self, model, model_name, items):
+        self.model = model
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = 0
+        self.rebuild(items)
+
+    def snapshot(self):
+        return self._snapshot
+
+    def rebuild(self, items):
+        """Reconstruye el índice completo (usa el caché en disco)"""
+        questions = [clean_text(item["question"]) for item in items]
+        with self._lock:
+            embeddings = load_embeddings(self.model, self.model_name, questions)
+            self._snapshot = IndexSnapshot(
+                ids=[item.get("id") for item in items],
+                questions=questions,
+                responses=[item["response"] for item in items],
+                embeddings=embeddings,
+                search=make_vector_index(embeddings),
+                version=self._next_version(),
+            )
+
+    def prepare(self, items, on_progress=None):
+        """Calcula y guarda en el caché los embeddings de `items` sin
+        publicarlos; el índice actual sigue atendiendo mientras tanto"""
+        questions = [clean_text(item["question"]) for item in items]
+        load_embeddings(self.model, self.model_name, questions, on_progress=on_progress)
+
+    def add(self, item):
+        # Ya está (p. ej. el índice se reconstruyó con el item incluido)
+        if item.get("id") in self._snapshot.ids:
+            return self.update(item)
+        question = clean_text(item["question"])
+        row = self._encode(question)
+        with self._lock:
+            snap = self._snapshot
+            embeddings = torch.cat([snap.embeddings, row])
+            self._snapshot = IndexSnapshot(
+                ids=snap.ids + [item.get("id")],
+                questions=snap.questions + [question],
+                responses=snap.responses + [item["response"]],
+                embeddings=embeddings,
+                search=snap.search.rebuild(embeddings),
+                version=self._next_version(),
+            )
+
+    def update(self, item):
+        question = clean_text(item["question"])
+        with self._lock:
+            snap = self._snapshot
+            if item.get("id") not in snap.ids:
+                return False
+            i = snap.ids.index(item.get("id"))
+
+            embeddings = snap.embeddings
+            search = snap.search
+            if snap.questions[i] != question:
+                # Copia del tensor: los lectores actuales siguen con el viejo
+                embeddings = embeddings.clone()
+                embeddings[i] = self._encode(question)[0]
+                search = search.rebuild(embeddings)
+
+            questions = list(snap.questions)
+            responses = list(snap.responses)
+            questions[i] = question
+            responses[i] = item["response"]
+            self._snapshot = IndexSnapshot(snap.ids, questions, responses, embeddings, search,
+                                           self._next_version())
+        return True
+
+    def delete(self, item_id):
+        with self._lock:
+            snap = self._snapshot
+            if item_id not in snap.ids:
+                return False
+            i = snap.ids.index(item_id)
+            embeddings = torch.cat([snap.embeddings[:i], snap.embeddings[i + 1:]])
+            self._snapshot = IndexSnapshot(
+                ids=snap.ids[:i] + snap.ids[i + 1:],
+                questions=snap.questions[:i] + snap.questions[i + 1:],
+                responses=snap.responses[:i] + snap.responses[i + 1:],
+                embeddings=embeddings,
+                search=snap.search.rebuild(embeddings),
+                version=self._next_version(),
+            )
+        return True
+
+    def _next_version(self):
+        self._version += 1
+        return self._version
+
+    def _encode(self, question):
+        return self.model.encode([question], convert_to_tensor=True)
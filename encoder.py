@@ -0,0 +1,28 @@
+import torch
+from sentence_transformers import SentenceTransformer
+
+# Modos de inferencia del codificador en CPU:
+#   fp32 -> PyTorch de precisión completa (el de siempre)
+#   int8 -> cuantización dinámica int8 de las capas Linear
+#   onnx -> grafo exportado a ONNX Runtime (requiere optimum[onnxruntime])
+ENCODER_MODES = ('fp32', 'int8', 'onnx')
+
+
+def load_encoder(model_name, mode='fp32'):
+    if mode == 'fp32':
+        return SentenceTransformer(model_name)
+
+    if mode == 'int8':
+        model = SentenceTransformer(model_name, device='cpu')
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if mode == 'onnx':
+        # sentence-transformers exporta el modelo a ONNX la primera vez
+        return SentenceTransformer(model_name, device='cpu', backend='onnx')
+
+    raise ValueError(f"Modo de inferencia desconocido: {mode} (usa {', '.join(ENCODER_MODES)})")
+
+
+def cache_name(model_name, mode):
+    """Nombre para el caché de embeddings: cada modo produce vectores distintos"""
+    return model_name if mode == 'fp32' else f"{model_name}-{mode}"
@@ -0,0 +1,49 @@
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# Despliegue con varios workers compartiendo el modelo.
+# Uso: gunicorn app:app   (gunicorn lee este archivo automáticamente)
+#
+# Con MODEL_PRELOAD=1 (por defecto con gunicorn) el master importa la app
+# y carga el modelo y los embeddings una sola vez; los workers se crean con
+# fork y comparten esas páginas copy-on-write en lugar de tener cada uno su
+# copia.
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('WORKER_THREADS', 4))
+timeout = 120
+
+# La misma variable que lee app.py: aquí vale 1 si no se definió
+preload_app = os.environ.setdefault('MODEL_PRELOAD', '1') == '1'
+
+# Varios workers: las sesiones de chat y los tokens admin tienen que verse
+# desde cualquiera de ellos, así que por defecto van en SQLite
+os.environ.setdefault('SESSION_BACKEND', 'sqlite')
+
+# Métricas de todos los workers sumadas en /metrics (ver metrics.py)
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'hotel-metrics-{os.getpid()}'))
+
+# Repartir los núcleos entre workers para que torch no los sobresuscriba
+TORCH_THREADS = int(os.environ.get('TORCH_THREADS', max(1, multiprocessing.cpu_count() // workers)))
+
+
+def on_starting(server):
+    # Arranque limpio: los contadores de la ejecución anterior no se suman
+    os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def when_ready(server):
+    if preload_app:
+        import app
+        app.before_fork()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import app
+        app.after_fork(torch_threads=TORCH_THREADS)
@@ -0,0 +1,239 @@
+import csv
+import glob
+import json
+import os
+import re
+import threading
+import uuid
+
+# Importación masiva del dataset en segundo plano.
+# El archivo se lee por partes (JSON o CSV), cada fila se valida por
+# separado y los embeddings se calculan en lotes grandes antes de publicar.
+# El estado de cada job se guarda en `jobs_dir/<job_id>.json`: la consulta
+# de progreso puede caer en cualquier worker de gunicorn, no solo en el que
+# corre la importación.
+
+CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 200
+MAX_JOBS = 50
+SAVE_EVERY_ROWS = 5000
+
+_jobs_lock = threading.Lock()
+
+
+class ImportJob:
+    def __init__(self, filename, jobs_dir):
+        self.id = uuid.uuid4().hex
+        self.path = os.path.join(jobs_dir, f'{self.id}.json')
+        self.filename = filename
+        self.status = 'queued'  # queued -> parsing -> embedding -> done | failed
+        self.rows_read = 0
+        self.rows_valid = 0
+        self.error_count = 0
+        self.errors = []
+        self.embedded = 0
+        self.to_embed = 0
+        self.message = ''
+
+    def add_error(self, row, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': error})
+
+    def embedding_progress(self, done, total):
+        self.embedded, self.to_embed = done, total
+        self.save()
+
+    def set_status(self, status, message=''):
+        self.status = status
+        self.message = message
+        self.save()
+
+    def save(self):
+        """Escribe el estado completo (archivo temporal + rename: quien lo
+        lee nunca ve un JSON a medias)"""
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'rows_read': self.rows_read,
+            'rows_valid': self.rows_valid,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'embedded': self.embedded,
+            'to_embed': self.to_embed,
+            'message': self.message,
+        }
+
+
+def get_job(job_id, jobs_dir):
+    """Estado del job como dict (el de ImportJob.to_dict), o None"""
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+        return None
+    try:
+        with open(os.path.join(jobs_dir, f'{job_id}.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def start_import(path, filename, apply, jobs_dir, skip_invalid=False):
+    """Lanza la importación de `path` en un hilo y devuelve el job.
+
+    `apply(items, job)` publica el dataset nuevo (embeddings incluidos).
+    Si hay filas inválidas y `skip_invalid` es False no se importa nada.
+    """
+    os.makedirs(jobs_dir, exist_ok=True)
+    job = ImportJob(filename, jobs_dir)
+    job.save()
+    with _jobs_lock:
+        # Guardar solo los últimos jobs
+        saved = sorted(glob.glob(os.path.join(jobs_dir, '*.json')), key=os.path.getmtime)
+        for old_path in saved[:-MAX_JOBS]:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=_run, args=(job, path, apply, skip_invalid),
+                              name=f"import-{job.id[:8]}", daemon=True)
+    thread.start()
+    return job
+
+
+def _run(job, path, apply, skip_invalid):
+    try:
+        job.set_status('parsing')
+        items = _read_items(path, job)
+
+        if job.error_count and not skip_invalid:
+            job.set_status('failed', f'{job.error_count} filas inválidas; no se importó nada')
+            return
+        if not items:
+            job.set_status('failed', 'El archivo no contiene items válidos')
+            return
+
+        job.set_status('embedding')
+        apply(items, job)
+
+        job.set_status('done', f'Se importaron {len(items)} items exitosamente')
+    except Exception as e:
+        job.set_status('failed', str(e))
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _read_items(path, job):
+    is_csv = job.filename.lower().endswith('.csv')
+    # Los CSV exportados desde Excel suelen venir en cp1252
+    for encoding in ('utf-8-sig', 'cp1252'):
+        job.rows_read = job.rows_valid = job.error_count = 0
+        job.errors = []
+        try:
+            with open(path, 'r', encoding=encoding, newline='') as f:
+                rows = iter_csv_rows(f) if is_csv else iter_json_rows(f)
+                # El CSV no trae columna id: se numera por fila
+                return _validate(rows, job, auto_id=is_csv)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError('No se pudo leer el archivo (codificación desconocida)')
+
+
+def _validate(rows, job, auto_id=False):
+    items = []
+    seen_ids = set()
+    for row_number, row in rows:
+        job.rows_read += 1
+        if job.rows_read % SAVE_EVERY_ROWS == 0:
+            job.save()
+        if not isinstance(row, dict):
+            job.add_error(row_number, 'La fila no es un objeto')
+            continue
+
+        if auto_id and row.get('id') in (None, ''):
+            row['id'] = row_number
+        missing = [key for key in ('id', 'question', 'response') if not str(row.get(key) or '').strip()]
+        if missing:
+            job.add_error(row_number, f"Faltan campos: {', '.join(missing)}")
+            continue
+        if row['id'] in seen_ids:
+            job.add_error(row_number, f"ID repetido: {row['id']}")
+            continue
+
+        seen_ids.add(row['id'])
+        row.setdefault('intent', 'general')
+        items.append(row)
+        job.rows_valid += 1
+    return items
+
+
+def iter_json_rows(f):
+    """Recorre una lista JSON de objetos sin cargar todo el archivo"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('El JSON debe contener una lista de items')
+    buffer = buffer[1:]
+    row_number = 0
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            value, end = decoder.raw_decode(buffer)
+            rest = buffer[end:].lstrip()
+        except ValueError:
+            end = rest = None
+        # Un número cortado al final del bloque también se decodifica ("12" de
+        # "1234", "3" de "3.14"): solo vale si después viene "," o "]", o si
+        # ya no hay más archivo
+        if end is None or (not eof and rest[:1] not in (',', ']')):
+            if eof:
+                raise ValueError(f'JSON inválido cerca del item {row_number + 1}')
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if rest[:1] not in ('', ',', ']'):
+            raise ValueError(f'JSON inválido cerca del item {row_number + 1}')
+        row_number += 1
+        yield row_number, value
+        buffer = rest
+
+
+def iter_csv_rows(f):
+    """CSV con el formato de hotel_chatbot_dataset.csv
+    (Intent/Question/Response, separado por tabs o comas)"""
+    sample = f.read(4096)
+    f.seek(0)
+    delimiter = '\t' if '\t' in sample.split('\n', 1)[0] else ','
+
+    reader = csv.DictReader(f, delimiter=delimiter)
+    for row_number, row in enumerate(reader, start=1):
+        # Nombres de columna sin importar mayúsculas
+        row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key is not None}
+        yield row_number, row
+
+
+def save_upload(file_storage, upload_dir):
+    """Guarda el archivo subido en disco por partes"""
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.upload")
+    with open(path, 'wb') as out:
+        while True:
+            chunk = file_storage.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(chunk)
+    return path
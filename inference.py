@@ -0,0 +1,34 @@
+from semantic import best_matches
+from query_cache import normalize_query
+from metrics import STAGE_SECONDS
+
+# Búsqueda semántica compartida por la app (modo en proceso) y por el
+# servidor de inferencia (inference_server.py).
+
+# Subpregunta sin ningún candidato: cuenta como "no entendí" (score 0)
+NO_MATCH = (None, 0.0)
+
+
+def match_questions(index, encoder, cache, subquestions):
+    """[(respuesta, score)] del mejor match de cada subpregunta.
+
+    Las subpreguntas ya vistas salen del caché; el resto se codifica en un
+    solo lote y se busca en una sola pasada.
+    """
+    snap = index.snapshot()
+    if not snap.ids:
+        return []
+
+    with STAGE_SECONDS.time('cache'):
+        keys = [normalize_query(sub) for sub in subquestions]
+        matches = [cache.get(key, snap.version) for key in keys]
+    missing = [i for i, match in enumerate(matches) if match is None]
+
+    if missing:
+        results = best_matches(encoder, snap.search, [subquestions[i] for i in missing])
+        for i, result in zip(missing, results):
+            matches[i] = result[0] if result else NO_MATCH
+            cache.put(keys[i], matches[i], snap.version)
+
+    return [(snap.responses[best_match_index] if best_match_index is not None else None, best_score)
+            for best_match_index, best_score in matches]
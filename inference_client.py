@@ -0,0 +1,108 @@
+import http.client
+import json
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+# Cliente del servidor de inferencia (inference_server.py).
+# INFERENCE_URL puede ser http://host:puerto o unix:///ruta/al/socket.
+# Cada hilo reutiliza su propia conexión keep-alive.
+
+
+class InferenceUnavailable(Exception):
+    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class InferenceClient:
+    """match() y encode() remotos. Si el servidor no responde lanza
+    InferenceUnavailable y no lo vuelve a intentar hasta `retry_after`
+    segundos, para que el llamador use el modo en proceso sin esperar el
+    timeout en cada petición."""
+
+    def __init__(self, url, timeout=10.0, retry_after=30.0):
+        self.url = url
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._down_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def match(self, subquestions):
+        """[(respuesta, score)] del mejor match de cada subpregunta"""
+        result = self._post('/match', {'texts': subquestions})
+        return [tuple(match) for match in result['matches']]
+
+    def encode(self, texts):
+        """Embeddings como listas de floats"""
+        return self._post('/encode', {'texts': texts})['embeddings']
+
+    def ping(self):
+        try:
+            return self._request('GET', '/health', None).get('status') == 'ok'
+        except InferenceUnavailable:
+            return False
+
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def stats(self):
+        return {'url': self.url, 'requests': self.requests, 'failures': self.failures,
+                'available': self.available()}
+
+    def _post(self, path, payload):
+        if not self.available():
+            raise InferenceUnavailable(f"Servidor de inferencia caído: {self.url}")
+        return self._request('POST', path, payload)
+
+    def _request(self, method, path, payload):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.requests += 1
+        # Un reintento: la conexión reutilizada pudo haberse cerrado
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection()
+                if attempt == 2:
+                    self.failures += 1
+                    self._down_until = time.monotonic() + self.retry_after
+                    raise InferenceUnavailable(str(e)) from e
+                continue
+            if response.status != 200:
+                self.failures += 1
+                raise InferenceUnavailable(f"HTTP {response.status}: {data[:200]!r}")
+            return json.loads(data)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            parsed = urlparse(self.url)
+            if parsed.scheme == 'unix':
+                conn = UnixHTTPConnection(parsed.path, self.timeout)
+            else:
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,120 @@
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batcher import EncodeBatcher
+from dataset_store import DatasetStore
+from embedding_index import EmbeddingIndex
+from encoder import load_encoder, cache_name
+from inference import match_questions
+from metrics import CONTENT_TYPE, ENABLED as METRICS_ENABLED, REGISTRY
+from query_cache import QueryCache
+
+# Servidor de inferencia: hospeda el encoder y el índice vectorial en un
+# proceso aparte para escalar los workers web por separado. Los workers lo
+# usan a través de inference_client.py cuando INFERENCE_URL está definida.
+#
+# Uso: python inference_server.py [http://127.0.0.1:8765 | unix:///tmp/hotel-inference.sock]
+#
+# El dataset se lee de los mismos archivos que la app; cuando el panel de
+# admin los cambia, el índice se reconstruye solo (usa el caché en disco).
+
+MODEL_NAME = "paraphrase-multilingual-mpnet-base-v2"
+ENCODER_MODE = os.environ.get('ENCODER_MODE', 'fp32')
+DATA_FILE = os.path.join(os.path.dirname(__file__), 'dataset.json')
+LISTEN = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('INFERENCE_LISTEN', 'http://127.0.0.1:8765')
+
+ENCODE_BATCH_WINDOW_MS = float(os.environ.get('ENCODE_BATCH_WINDOW_MS', 5))
+ENCODE_BATCH_MAX = int(os.environ.get('ENCODE_BATCH_MAX', 64))
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 10000))
+
+store = DatasetStore(DATA_FILE)
+model = load_encoder(MODEL_NAME, ENCODER_MODE)
+index = EmbeddingIndex(model, cache_name(MODEL_NAME, ENCODER_MODE), store.current().items)
+# Junta en un lote las peticiones de todos los workers web
+encoder = EncodeBatcher(model, window_ms=ENCODE_BATCH_WINDOW_MS, max_batch=ENCODE_BATCH_MAX)
+query_cache = QueryCache(QUERY_CACHE_SIZE)
+
+
+def watch_dataset():
+    while True:
+        time.sleep(store.check_interval)
+        try:
+            if store.refresh():
+                index.rebuild(store.current().items)
+                print("✅ Índice actualizado desde el dataset")
+        except Exception as e:
+            print("❌ Error recargando el dataset:", e)
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: los clientes reutilizan la conexión
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.reply(200, {'status': 'ok', 'version': index.snapshot().version})
+        elif self.path == '/stats':
+            self.reply(200, {'batcher': encoder.stats(), 'query_cache': query_cache.stats()})
+        elif self.path == '/metrics' and METRICS_ENABLED:
+            # Etapas cache/encode/search de las peticiones a /match
+            self.send_body(200, REGISTRY.render().encode('utf-8'), CONTENT_TYPE)
+        else:
+            self.reply(404, {'error': 'no encontrado'})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            texts = json.loads(self.rfile.read(length))['texts']
+            if self.path == '/match':
+                self.reply(200, {'matches': match_questions(index, encoder, query_cache, texts)})
+            elif self.path == '/encode':
+                embeddings = encoder.encode(texts, convert_to_tensor=True) if texts else []
+                self.reply(200, {'embeddings': [row.tolist() for row in embeddings]})
+            else:
+                self.reply(404, {'error': 'no encontrado'})
+        except Exception as e:
+            self.reply(500, {'error': str(e)})
+
+    def reply(self, status, payload):
+        self.send_body(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler espera una tupla (host, puerto)
+        request, _ = super().get_request()
+        return request, ('unix', 0)
+
+
+def make_server(listen):
+    if listen.startswith('unix://'):
+        path = listen[len('unix://'):]
+        if os.path.exists(path):
+            os.remove(path)
+        return ThreadingUnixHTTPServer(path, InferenceHandler)
+    host, _, port = listen.split('://', 1)[-1].rpartition(':')
+    return ThreadingHTTPServer((host, int(port)), InferenceHandler)
+
+
+if __name__ == '__main__':
+    threading.Thread(target=watch_dataset, name='dataset-watch', daemon=True).start()
+    server = make_server(LISTEN)
+    print(f"✅ Servidor de inferencia escuchando en {LISTEN}")
+    server.serve_forever()
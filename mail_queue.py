@@ -0,0 +1,238 @@
+import smtplib
+import sqlite3
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from metrics import SMTP_ERRORS, SMTP_SECONDS
+
+# Cola persistente de correos salientes.
+# /enviar-contacto solo agrega el mensaje a la cola (SQLite en modo WAL) y
+# responde; un hilo en segundo plano los envía en lotes reutilizando una
+# conexión SMTP ya autenticada, reintenta con backoff exponencial y manda a
+# "dead" los que superan el máximo de intentos.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mail_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    remitente TEXT NOT NULL,
+    destinatario TEXT NOT NULL,
+    asunto TEXT NOT NULL,
+    html TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL,
+    ultimo_error TEXT,
+    creado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mail_queue_pendientes ON mail_queue (estado, proximo_intento);
+"""
+
+# Errores que no se arreglan reintentando
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+
+class MailQueue:
+    def __init__(self, db_path, smtp_host, smtp_port, username=None, password=None,
+                 use_tls=True, batch_size=20, max_attempts=6, backoff_base=5.0,
+                 idle_timeout=60.0, lease=300.0):
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.idle_timeout = idle_timeout
+        self.lease = lease
+
+        self._db = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._server = None
+        self._last_used = 0.0
+        self._thread = None
+        self.sent = 0
+        self.connections = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mail-queue', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._close_server()
+
+    def close(self):
+        """Detiene el envío y cierra la base (no se puede seguir usando)"""
+        self.stop()
+        self._db.close()
+
+    def enqueue(self, remitente, destinatario, asunto, html):
+        now = time.time()
+        with self._db_lock:
+            cur = self._db.execute(
+                "INSERT INTO mail_queue (remitente, destinatario, asunto, html, proximo_intento, creado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (remitente, destinatario, asunto, html, now, now))
+            self._db.commit()
+        self._wakeup.set()
+        return cur.lastrowid
+
+    def stats(self):
+        with self._db_lock:
+            rows = self._db.execute("SELECT estado, COUNT(*) FROM mail_queue GROUP BY estado").fetchall()
+        stats = {estado: count for estado, count in rows}
+        stats.update({'enviados': self.sent, 'conexiones_smtp': self.connections})
+        return stats
+
+    def dead_letters(self, limit=100):
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id, destinatario, asunto, intentos, ultimo_error, creado FROM mail_queue "
+                "WHERE estado = 'dead' ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(zip(('id', 'destinatario', 'asunto', 'intentos', 'ultimo_error', 'creado'), row))
+                for row in rows]
+
+    def retry_dead(self):
+        """Vuelve a poner en la cola los mensajes muertos"""
+        with self._db_lock:
+            cur = self._db.execute(
+                "UPDATE mail_queue SET estado = 'pendiente', intentos = 0, proximo_intento = ? "
+                "WHERE estado = 'dead'", (time.time(),))
+            self._db.commit()
+        self._wakeup.set()
+        return cur.rowcount
+
+    # ---- hilo de envío ----
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+                continue
+
+            # Nada que enviar: cerrar la conexión si lleva mucho sin usarse
+            if self._server and time.monotonic() - self._last_used > self.idle_timeout:
+                self._close_server()
+            self._wakeup.wait(self._seconds_to_next())
+            self._wakeup.clear()
+
+    def _next_batch(self):
+        """Toma el siguiente lote. Cada worker de gunicorn tiene su hilo de
+        envío sobre la misma base: el lote se reserva corriendo
+        proximo_intento `lease` segundos, así ningún otro hilo lo ve. Si el
+        proceso muere a mitad del lote, los mensajes vuelven solos a la cola
+        cuando vence la reserva."""
+        now = time.time()
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, remitente, destinatario, asunto, html, intentos FROM mail_queue "
+                    "WHERE estado = 'pendiente' AND proximo_intento <= ? ORDER BY id LIMIT ?",
+                    (now, self.batch_size)).fetchall()
+                if rows:
+                    self._db.execute(
+                        f"UPDATE mail_queue SET proximo_intento = ? WHERE id IN ({', '.join('?' * len(rows))})",
+                        [now + self.lease] + [row[0] for row in rows])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _seconds_to_next(self):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT MIN(proximo_intento) FROM mail_queue WHERE estado = 'pendiente'").fetchone()
+        if row[0] is None:
+            return self.idle_timeout
+        return min(self.idle_timeout, max(0.0, row[0] - time.time()))
+
+    def _send_batch(self, batch):
+        for pos, (id_, remitente, destinatario, asunto, html, intentos) in enumerate(batch):
+            msg = MIMEMultipart("alternative")
+            msg["Subject"] = asunto
+            msg["From"] = remitente
+            msg["To"] = destinatario
+            msg.attach(MIMEText(html, "html"))
+
+            try:
+                with SMTP_SECONDS.time():
+                    self._send(remitente, destinatario, msg.as_string())
+            except PERMANENT_ERRORS as e:
+                SMTP_ERRORS.inc()
+                self._mark_failed(id_, self.max_attempts, e)
+            except smtplib.SMTPDataError as e:
+                # El servidor rechazó solo este mensaje
+                SMTP_ERRORS.inc()
+                self._mark_failed(id_, intentos + 1, e)
+            except Exception as e:
+                # Servidor caído o conexión perdida: reconectar más tarde y
+                # posponer el resto del lote en vez de reintentar uno por uno
+                SMTP_ERRORS.inc()
+                self._close_server()
+                for row in batch[pos:]:
+                    self._mark_failed(row[0], row[5] + 1, e)
+                return
+            else:
+                with self._db_lock:
+                    self._db.execute("DELETE FROM mail_queue WHERE id = ?", (id_,))
+                    self._db.commit()
+                self.sent += 1
+
+    def _send(self, remitente, destinatario, raw):
+        if self._server is not None:
+            try:
+                self._server.sendmail(remitente, destinatario, raw)
+                self._last_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                # El servidor cerró la conexión reutilizada: abrir otra
+                self._close_server()
+        self._server = self._connect()
+        self._server.sendmail(remitente, destinatario, raw)
+        self._last_used = time.monotonic()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=30)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self.connections += 1
+        return server
+
+    def _close_server(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def _mark_failed(self, id_, intentos, error):
+        print("❌ Error al enviar correo:", error)
+        with self._db_lock:
+            if intentos >= self.max_attempts:
+                self._db.execute(
+                    "UPDATE mail_queue SET estado = 'dead', intentos = ?, ultimo_error = ? WHERE id = ?",
+                    (intentos, str(error), id_))
+            else:
+                espera = self.backoff_base * (2 ** (intentos - 1))
+                self._db.execute(
+                    "UPDATE mail_queue SET intentos = ?, proximo_intento = ?, ultimo_error = ? WHERE id = ?",
+                    (intentos, time.time() + espera, str(error), id_))
+            self._db.commit()
@@ -0,0 +1,349 @@
+import bisect
+import functools
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Métricas en memoria (histogramas y contadores) exportadas en el formato de
+# texto de Prometheus en /metrics. Sin dependencias: solo listas y un lock
+# por métrica.
+#
+# Con METRICS=0 todo queda en una comparación: observe/inc retornan de
+# inmediato y time() entrega un context manager que no hace nada.
+#
+# Con varios workers (gunicorn), METRICS_DIR es un directorio compartido:
+# cada proceso escribe ahí sus valores cada EXPORT_INTERVAL segundos y el
+# worker que atiende /metrics suma los de todos. Los archivos de workers
+# que ya terminaron se siguen sumando, así los contadores nunca bajan; los
+# gauges solo se toman de procesos vivos, con la etiqueta pid.
+
+ENABLED = os.environ.get('METRICS', '1') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR')
+EXPORT_INTERVAL = 1.0
+
+# Segundos: de 0.5 ms (menú, caché) a 10 s (modelo en frío, base lenta)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metric', 'key', 'start')
+
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, enabled=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.enabled = ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._children = {}  # valores de las etiquetas -> [conteos por bucket, suma, total]
+
+    def observe(self, value, *labelvalues):
+        if self.enabled:
+            self._observe(labelvalues, value)
+
+    def time(self, *labelvalues):
+        """with HIST.time('encode'): ... -> observa la duración del bloque"""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, labelvalues)
+
+    def _observe(self, key, value):
+        pos = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            child[0][pos] += 1
+            child[1] += value
+            child[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._children = {}
+
+    def snapshot(self):
+        """{valores de las etiquetas: (conteos por bucket, suma, total)}"""
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._children.items()}
+
+    @staticmethod
+    def merge(snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for key, (counts, total, count) in snapshot.items():
+                if key in merged:
+                    old_counts, old_total, old_count = merged[key]
+                    merged[key] = ([a + b for a, b in zip(old_counts, counts)], old_total + total, old_count + count)
+                else:
+                    merged[key] = (list(counts), total, count)
+        return merged
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        values = self.snapshot() if values is None else values
+        for key, (counts, total, count) in sorted(values.items()):
+            labels = _labels(self.labelnames, key)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=(), enabled=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.enabled = ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for key, value in snapshot.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        values = self.snapshot() if values is None else values
+        lines.extend(f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in sorted(values.items()))
+        return lines
+
+
+class Gauge:
+    """Valor calculado al momento del scrape: `collect()` devuelve un número
+    o un dict {valores de las etiquetas: número}"""
+
+    def __init__(self, name, help, collect, labelnames=()):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+
+    def reset(self):
+        pass
+
+    def snapshot(self):
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"❌ Error leyendo la métrica {self.name}:", e)
+            return {}
+        if not isinstance(values, dict):
+            values = {(): values}
+        return {key: float(value) for key, value in values.items() if value is not None}
+
+    def render(self, values=None, labelnames=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        values = self.snapshot() if values is None else values
+        labelnames = self.labelnames if labelnames is None else labelnames
+        lines.extend(f"{self.name}{_labels(labelnames, key)} {value}" for key, value in sorted(values.items()))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+        self._export_dir = None
+        self._export_path = None
+        self._export_stop = None
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), **kwargs):
+        return self.register(Histogram(name, help, labelnames, **kwargs))
+
+    def counter(self, name, help, labelnames=(), **kwargs):
+        return self.register(Counter(name, help, labelnames, **kwargs))
+
+    def gauge(self, name, help, collect, labelnames=()):
+        return self.register(Gauge(name, help, collect, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        if self._export_dir:
+            return self._render_merged(metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Borra los valores (en un worker recién creado con fork: los del
+        master ya están en su propio archivo)"""
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            metric.reset()
+
+    # ---- varios procesos (METRICS_DIR) ----
+
+    def start_export(self, directory=METRICS_DIR, interval=EXPORT_INTERVAL):
+        """Escribe los valores de este proceso en `directory` cada
+        `interval` segundos (sin directorio no hace nada)"""
+        if not ENABLED or not directory or self._export_stop is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._export_dir = directory
+        # pid + sufijo al azar: un pid reutilizado no pisa el archivo de un worker terminado
+        self._export_path = os.path.join(directory, f"{os.getpid()}-{os.urandom(4).hex()}.json")
+        self._export_stop = threading.Event()
+        thread = threading.Thread(target=self._export_loop, args=(self._export_stop, interval),
+                                  name='metrics-export', daemon=True)
+        thread.start()
+
+    def stop_export(self):
+        """Último volcado y fin del hilo (antes del fork o al cerrar)"""
+        if self._export_stop is None:
+            return
+        self._export_stop.set()
+        self._export_stop = None
+        self._write_export()
+
+    def _export_loop(self, stop, interval):
+        while not stop.wait(interval):
+            try:
+                self._write_export()
+            except Exception as e:
+                print("❌ Error guardando las métricas:", e)
+
+    def _write_export(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        data = {'pid': os.getpid(), 'time': time.time(), 'live': self._export_stop is not None,
+                'metrics': {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+                            for metric in metrics}}
+        fd, tmp_path = tempfile.mkstemp(dir=self._export_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._export_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _render_merged(self, metrics):
+        # Lo propio al día antes de leer lo de los demás
+        if self._export_stop is not None:
+            self._write_export()
+        exports = []
+        for path in glob.glob(os.path.join(self._export_dir, '*.json')):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    exports.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        now = time.time()
+        lines = []
+        for metric in metrics:
+            snapshots = [{tuple(key): tuple(value) if isinstance(value, list) else value
+                          for key, value in export['metrics'].get(metric.name, [])}
+                         for export in exports]
+            if isinstance(metric, Gauge):
+                # Solo procesos vivos; cada uno con su pid
+                values = {key + (str(export['pid']),): value
+                          for export, snapshot in zip(exports, snapshots)
+                          if export.get('live') and now - export['time'] < 3 * EXPORT_INTERVAL
+                          for key, value in snapshot.items()}
+                lines.extend(metric.render(values, metric.labelnames + ('pid',)))
+            else:
+                lines.extend(metric.render(metric.merge(snapshots)))
+        return "\n".join(lines) + "\n"
+
+
+def timed(metric, *labelvalues):
+    """Decorador: observa la duración de cada llamada. Con las métricas
+    apagadas devuelve la función original (costo cero)."""
+    def decorate(func):
+        if not metric.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metric.time(*labelvalues):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = Registry()
+
+# Etapas de /chat: chat_step (menús y palabras clave), router, split_questions,
+# cache, encode, search e inference (servidor de inferencia remoto)
+CHAT_SECONDS = REGISTRY.histogram('hotel_chat_seconds', 'Duración total de /chat y /chat/stream', ('endpoint',))
+STAGE_SECONDS = REGISTRY.histogram('hotel_chat_stage_seconds', 'Duración de cada etapa del chat', ('stage',))
+CHAT_BRANCHES = REGISTRY.counter('hotel_chat_branch_total',
+                                 'Qué rama respondió: menu, submenu, keyword, semantic o fallback', ('branch',))
+DB_SECONDS = REGISTRY.histogram('hotel_db_seconds', 'Duración de las operaciones en PostgreSQL', ('op',))
+DB_ERRORS = REGISTRY.counter('hotel_db_errors_total', 'Operaciones en PostgreSQL que fallaron', ('op',))
+SMTP_SECONDS = REGISTRY.histogram('hotel_smtp_seconds', 'Duración del envío de cada correo por SMTP')
+SMTP_ERRORS = REGISTRY.counter('hotel_smtp_errors_total', 'Correos que fallaron al enviarse por SMTP')
@@ -0,0 +1,47 @@
+import os
+import sys
+
+from db import get_connection
+
+# Aplica en orden los archivos de migrations/ que aún no se aplicaron.
+# Uso: python migrate.py [database] [password]
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+
+overrides = {}
+if len(sys.argv) > 1:
+    overrides['database'] = sys.argv[1]
+if len(sys.argv) > 2:
+    overrides['password'] = sys.argv[2]
+
+try:
+    conn = get_connection(**overrides)
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            nombre TEXT PRIMARY KEY,
+            aplicada_en TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+    conn.commit()
+
+    cur.execute("SELECT nombre FROM schema_migrations")
+    aplicadas = {row[0] for row in cur.fetchall()}
+
+    for nombre in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not nombre.endswith('.sql') or nombre in aplicadas:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, nombre), 'r', encoding='utf-8') as f:
+            sql = f.read()
+
+        cur.execute(sql)
+        cur.execute("INSERT INTO schema_migrations (nombre) VALUES (%s)", (nombre,))
+        conn.commit()
+        print(f"✅ {nombre}")
+
+    print("Migraciones al día")
+    conn.close()
+
+except Exception as e:
+    print(f"❌ Error aplicando migraciones: {e}")
+    sys.exit(1)
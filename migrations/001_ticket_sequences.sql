@@ -0,0 +1,19 @@
+-- Códigos de ticket generados por la base de datos dentro del INSERT.
+-- Una secuencia por tipo (Res- para reservas, QJ- para quejas), así dos
+-- envíos simultáneos nunca obtienen el mismo código.
+
+CREATE SEQUENCE IF NOT EXISTS tickets_res_seq;
+CREATE SEQUENCE IF NOT EXISTS tickets_qj_seq;
+
+-- Continuar desde el último código existente de cada tipo
+SELECT setval('tickets_res_seq', COALESCE(
+    (SELECT MAX(substring(codigo_ticket FROM '^Res-(\d+)$')::int) FROM tickets), 0) + 1, false);
+SELECT setval('tickets_qj_seq', COALESCE(
+    (SELECT MAX(substring(codigo_ticket FROM '^QJ-(\d+)$')::int) FROM tickets), 0) + 1, false);
+
+-- 'Res' + 7 -> 'Res-007' (sin cortar números de más de 3 dígitos)
+CREATE OR REPLACE FUNCTION siguiente_codigo_ticket(prefijo text, secuencia regclass)
+RETURNS text AS $$
+    SELECT prefijo || '-' || CASE WHEN n < 1000 THEN lpad(n::text, 3, '0') ELSE n::text END
+    FROM nextval(secuencia) AS n
+$$ LANGUAGE sql VOLATILE;
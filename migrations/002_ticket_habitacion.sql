@@ -0,0 +1,23 @@
+-- Cada reserva queda asignada a una habitación, y cada ticket guarda cuándo
+-- cambió por última vez: availability.py trae solo los tickets cambiados
+-- desde su última lectura en vez de releer la tabla completa.
+
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS id_habitacion INTEGER;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS actualizado_en TIMESTAMP NOT NULL DEFAULT now();
+
+CREATE OR REPLACE FUNCTION tickets_marcar_actualizado() RETURNS trigger AS $$
+BEGIN
+    NEW.actualizado_en := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tickets_actualizado_en ON tickets;
+CREATE TRIGGER tickets_actualizado_en
+    BEFORE UPDATE ON tickets
+    FOR EACH ROW EXECUTE PROCEDURE tickets_marcar_actualizado();
+
+CREATE INDEX IF NOT EXISTS tickets_actualizado_en_idx ON tickets (actualizado_en);
+-- Chequeo de solapamiento al reservar
+CREATE INDEX IF NOT EXISTS tickets_habitacion_fechas_idx
+    ON tickets (id_habitacion, fecha_entrada) WHERE id_habitacion IS NOT NULL;
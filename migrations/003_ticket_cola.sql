@@ -0,0 +1,26 @@
+-- Cola de tickets del panel de admin (ver ticket_queue.py).
+-- /admin/tickets/pending pagina por cursor sobre (estado, fecha_creacion, id_ticket)
+-- y /admin/tickets/changes sobre (actualizado_en, id_ticket): cada página
+-- es un recorrido corto del índice, sin OFFSET ni ordenar la tabla.
+-- Nota: CREATE INDEX bloquea escrituras en tickets mientras se construye
+-- (migrate.py corre cada archivo en una transacción, no admite CONCURRENTLY).
+
+CREATE INDEX IF NOT EXISTS tickets_cola_idx ON tickets (estado, fecha_creacion, id_ticket);
+
+DROP INDEX IF EXISTS tickets_actualizado_en_idx;
+CREATE INDEX IF NOT EXISTS tickets_cambios_idx ON tickets (actualizado_en, id_ticket);
+
+-- La marca de cambio se toma al escribir la fila (clock_timestamp) y no al
+-- empezar la transacción (now()); también en los INSERT. Así el orden de
+-- actualizado_en sigue de cerca al orden de commit.
+CREATE OR REPLACE FUNCTION tickets_marcar_actualizado() RETURNS trigger AS $$
+BEGIN
+    NEW.actualizado_en := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tickets_actualizado_en ON tickets;
+CREATE TRIGGER tickets_actualizado_en
+    BEFORE INSERT OR UPDATE ON tickets
+    FOR EACH ROW EXECUTE PROCEDURE tickets_marcar_actualizado();
@@ -0,0 +1,6 @@
+-- Escritura diferida de tickets (ticket_writer.py): cada envío llega con un
+-- id_envio único y el INSERT por lotes usa ON CONFLICT (id_envio) DO NOTHING,
+-- así reintentar un lote que ya se guardó no duplica tickets.
+
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS id_envio TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS tickets_id_envio_idx ON tickets (id_envio);
@@ -0,0 +1,79 @@
+import threading
+import time
+
+# Carga diferida de recursos pesados (modelo semántico, índice).
+# Importar la app ya no carga torch ni el modelo: se cargan la primera vez
+# que se necesitan o en un hilo de calentamiento al arrancar.
+
+
+class LazyLoader:
+    """Llama a factory() una sola vez, aunque lo pidan varios hilos a la vez.
+
+    get() espera a que termine la carga; peek() devuelve el valor solo si
+    ya está listo, sin bloquear. on_loaded(valor) corre justo después de
+    publicarlo (para ponerlo al día con cambios hechos mientras cargaba).
+    """
+
+    def __init__(self, factory, name='modelo', on_loaded=None):
+        self.factory = factory
+        self.name = name
+        self.on_loaded = on_loaded
+        self._value = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.error = None
+        self.load_seconds = None
+
+    @property
+    def ready(self):
+        return self._value is not None
+
+    def peek(self):
+        return self._value
+
+    def get(self):
+        value = self._value
+        if value is not None:
+            return value
+        with self._lock:
+            if self._value is None:
+                self._load()
+            return self._value
+
+    def start_warmup(self):
+        """Carga en segundo plano para que la primera pregunta no espere"""
+        if self.ready or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._warmup, name=f'warmup-{self.name}', daemon=True)
+        self._thread.start()
+
+    def status(self):
+        if self.ready:
+            return 'ready'
+        if self.error is not None:
+            return 'error'
+        if self._lock.locked():
+            return 'loading'
+        return 'idle'
+
+    def _warmup(self):
+        try:
+            self.get()
+        except Exception:
+            pass  # ya quedó en self.error; get() lo reintentará
+
+    def _load(self):
+        start = time.perf_counter()
+        print(f"Cargando {self.name}... (esto tarda unos segundos)")
+        try:
+            value = self.factory()
+        except Exception as e:
+            self.error = e
+            print(f"❌ Error cargando {self.name}: {e}")
+            raise
+        self.error = None
+        self.load_seconds = time.perf_counter() - start
+        self._value = value
+        print(f"✅ {self.name} listo en {self.load_seconds:.1f} s")
+        if self.on_loaded:
+            self.on_loaded(value)
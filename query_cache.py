@@ -0,0 +1,73 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from semantic import clean_text
+
+
+def normalize_query(text):
+    """clean_text + sin acentos + espacios colapsados: clave del caché"""
+    text = unicodedata.normalize('NFKD', clean_text(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class QueryCache:
+    """Caché LRU acotado: subpregunta normalizada -> (índice, score) del
+    mejor match. Cada entrada pertenece a una versión del índice; cuando el
+    dataset cambia, la versión cambia y el caché se vacía."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.version = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, version):
+        with self._lock:
+            # Resultado calculado con un índice viejo: no se guarda
+            if version != self.version:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._data:
+                self._data.clear()
+                self.invalidations += 1
+            self.version = version
@@ -0,0 +1,94 @@
+import re
+import threading
+from collections import Counter, namedtuple
+
+from query_cache import normalize_query
+
+# Enrutador por palabras clave que corre antes del modelo semántico.
+# Los disparadores salen del campo opcional "triggers" de los items del
+# dataset (se juntan por intent) y se compilan en una sola expresión
+# regular; el mensaje y los disparadores se comparan sin acentos.
+
+Route = namedtuple('Route', ['intent', 'trigger'])
+
+_Compiled = namedtuple('_Compiled', ['pattern', 'routes', 'priority'])
+
+
+def collect_triggers(items):
+    """intent -> disparadores normalizados, en el orden del dataset"""
+    triggers = {}
+    for item in items:
+        for trigger in item.get('triggers') or []:
+            trigger = normalize_query(str(trigger))
+            if trigger:
+                found = triggers.setdefault(item.get('intent', 'general'), [])
+                if trigger not in found:
+                    found.append(trigger)
+    return triggers
+
+
+def _drop_redundant(triggers):
+    """Quita los disparadores que contienen a otro del mismo intent
+    ("quiero reservar" ya lo cubre "reserva")"""
+    return [t for t in triggers if not any(o != t and o in t for o in triggers)]
+
+
+class IntentRouter:
+    """Busca todos los disparadores en una pasada y devuelve el intent del
+    primero en prioridad (orden de aparición en el dataset). Cuenta los
+    aciertos por regla para ver cuánto tráfico se ahorra el modelo."""
+
+    def __init__(self, items=()):
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.checked = 0
+        self.matched = 0
+        self._compiled = None
+        self.load(items)
+
+    def load(self, items):
+        """Recompila las reglas; los contadores se conservan"""
+        routes = {}
+        priority = {}
+        for intent, triggers in collect_triggers(items).items():
+            priority[intent] = len(priority)
+            for trigger in _drop_redundant(triggers):
+                routes.setdefault(trigger, Route(intent, trigger))
+
+        if routes:
+            # Los más largos primero para que gane el disparador más específico
+            alternatives = sorted(routes, key=len, reverse=True)
+            pattern = re.compile('|'.join(re.escape(t) for t in alternatives))
+        else:
+            pattern = None
+        self._compiled = _Compiled(pattern, routes, priority)
+
+    def route(self, message):
+        """Route(intent, trigger) o None si ninguna regla aplica"""
+        compiled = self._compiled
+        best = None
+        if compiled.pattern is not None:
+            for match in compiled.pattern.finditer(normalize_query(message)):
+                candidate = compiled.routes[match.group()]
+                if best is None or compiled.priority[candidate.intent] < compiled.priority[best.intent]:
+                    best = candidate
+
+        with self._lock:
+            self.checked += 1
+            if best is not None:
+                self.matched += 1
+                self.hits[best] += 1
+        return best
+
+    def rules(self):
+        return [{'intent': r.intent, 'trigger': r.trigger} for r in self._compiled.routes.values()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'matched': self.matched,
+                'rules': len(self._compiled.routes),
+                'hits': [{'intent': r.intent, 'trigger': r.trigger, 'hits': n}
+                         for r, n in self.hits.most_common()],
+            }
@@ -0,0 +1,29 @@
+import re
+
+from metrics import STAGE_SECONDS
+
+
+def clean_text(text):
+    text = text.lower()
+    text = re.sub(r'[¿?¡!.,]', '', text)
+    return text.strip()
+
+
+def split_questions(text):
+    # Dividir por conectores o signos de puntuación
+    parts = re.split(r'\?|y |además|también|,|\.|;', text.lower())
+    # Quitar vacíos y limpiar espacios
+    return [p.strip() for p in parts if len(p.strip()) > 3]
+
+
+def best_matches(model, search_index, subquestions, threshold=None):
+    """Codifica todas las subpreguntas en un solo lote y devuelve, por cada
+    una, el mejor match [(índice, score)] del índice (vacío si no supera
+    el umbral)."""
+    if not subquestions:
+        return []
+
+    with STAGE_SECONDS.time('encode'):
+        user_embs = model.encode(subquestions, convert_to_tensor=True)
+    with STAGE_SECONDS.time('search'):
+        return search_index.search(user_embs, k=1, threshold=threshold)
@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Almacenes de sesión con expiración (TTL), desalojo LRU y tope de memoria.
+# Se usan como un dict: store.get(k, default), store[k] = v, store.pop(k),
+# k in store. Los valores deben ser serializables a JSON.
+
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')
+SESSION_DB = os.environ.get('SESSION_DB', os.path.join(os.path.dirname(__file__), 'sessions.db'))
+
+
+class MemorySessionStore:
+    """Backend en proceso: rápido, pero cada worker tiene el suyo"""
+
+    def __init__(self, ttl, max_entries=10000, max_bytes=8 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # clave -> (expira, tamaño, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return default
+            # Expiración deslizante: cada uso renueva el TTL
+            self._data[key] = (time.monotonic() + self.ttl, entry[1], entry[2])
+            self._data.move_to_end(key)
+            return entry[2]
+
+    def __setitem__(self, key, value):
+        size = len(key) + len(json.dumps(value, ensure_ascii=False))
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            self._evict()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)[2]
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._data), 'bytes': self._bytes,
+                    'evictions': self.evictions, 'expirations': self.expirations}
+
+    def close(self):
+        pass
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry[1]
+        return entry
+
+    def _evict(self):
+        now = time.monotonic()
+        # Primero lo vencido más antiguo, luego lo menos usado
+        while self._data:
+            key, entry = next(iter(self._data.items()))
+            if entry[0] < now:
+                self._remove(key)
+                self.expirations += 1
+            elif len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(key)
+                self.evictions += 1
+            else:
+                break
+
+
+class SQLiteSessionStore:
+    """Backend compartido: todos los workers de gunicorn leen y escriben el
+    mismo archivo SQLite (modo WAL), así ven el mismo estado de conversación"""
+
+    def __init__(self, namespace, ttl, max_entries=100000, path=SESSION_DB, purge_every=500):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (namespace, expires)")
+        self._db.commit()
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM sessions WHERE namespace = ? AND key = ? AND expires >= ?",
+                (self.namespace, key, now)).fetchone()
+            if row is None:
+                return default
+            self._db.execute("UPDATE sessions SET expires = ? WHERE namespace = ? AND key = ?",
+                             (now + self.ttl, self.namespace, key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), time.time() + self.ttl))
+            self._db.commit()
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._db.commit()
+        return value
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM sessions WHERE namespace = ?",
+                                       (self.namespace,)).fetchone()[0]
+        return {'backend': 'sqlite', 'entries': entries, 'evictions': self.evictions}
+
+    def close(self):
+        """Una conexión SQLite no se puede usar en un proceso hijo: el master
+        la cierra antes del fork y cada worker abre su propio store"""
+        with self._lock:
+            self._db.close()
+
+    def _purge(self):
+        """Borra lo vencido y, si sobra, las sesiones más próximas a vencer
+        (las menos usadas, porque cada uso renueva el TTL)"""
+        self._db.execute("DELETE FROM sessions WHERE namespace = ? AND expires < ?",
+                         (self.namespace, time.time()))
+        cur = self._db.execute("""
+            DELETE FROM sessions WHERE namespace = ? AND key IN (
+                SELECT key FROM sessions WHERE namespace = ?
+                ORDER BY expires DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.namespace, self.namespace, self.max_entries))
+        self.evictions += cur.rowcount
+        self._db.commit()
+
+
+def make_session_store(namespace, ttl, max_entries=10000, backend=SESSION_BACKEND):
+    if backend == 'memory':
+        return MemorySessionStore(ttl, max_entries=max_entries)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(namespace, ttl, max_entries=max_entries)
+    raise ValueError(f"Backend de sesiones desconocido: {backend}")
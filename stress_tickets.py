@@ -0,0 +1,52 @@
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+
+# Prueba de carga: cientos de /enviar-fecha y /enviar-queja en paralelo
+# contra el servidor en marcha; verifica que ningún código se repita.
+# Cada reserva pide noches distintas (no se cruzan), así todas deberían
+# recibir habitación y código mientras haya una habitación reservable.
+# Uso: python stress_tickets.py [url] [envios_por_tipo]
+
+URL = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:5000"
+ENVIOS = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+INICIO = date(2030, 1, 1)
+
+
+def reserva(n):
+    entrada = INICIO + timedelta(days=2 * n)
+    r = requests.post(f"{URL}/enviar-fecha", json={
+        'nombre': f"Stress {n}", 'correo': f"stress{n}@test.com", 'numero': '8888-8888',
+        'fecha_inicio': entrada.isoformat(), 'fecha_final': (entrada + timedelta(days=2)).isoformat(),
+    })
+    return r.json()
+
+
+def queja(n):
+    r = requests.post(f"{URL}/enviar-queja", json={
+        'nombre': f"Stress {n}", 'correo': f"stress{n}@test.com", 'telefono': '8888-8888',
+        'motivo': 'Prueba de carga',
+    })
+    return r.json()
+
+
+with ThreadPoolExecutor(max_workers=64) as pool:
+    futuros = [pool.submit(reserva, n) for n in range(ENVIOS)]
+    futuros += [pool.submit(queja, n) for n in range(ENVIOS)]
+    respuestas = [f.result() for f in futuros]
+
+codigos = [r.get('codigo') for r in respuestas]
+sin_habitacion = sum(1 for r in respuestas if r.get('disponible') is False)
+fallidos = codigos.count(None) - sin_habitacion
+repetidos = {c: n for c, n in Counter(c for c in codigos if c).items() if n > 1}
+reservas = sum(1 for c in codigos if c and c.startswith('Res-'))
+quejas = sum(1 for c in codigos if c and c.startswith('QJ-'))
+
+print(f"Reservas: {reservas}  Quejas: {quejas}  Sin habitación: {sin_habitacion}  Sin código: {fallidos}")
+if repetidos:
+    print(f"❌ Códigos repetidos: {repetidos}")
+    sys.exit(1)
+print("✅ Todos los códigos son únicos")
@@ -0,0 +1,221 @@
+import base64
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+# Cola de tickets del panel de admin (índices en migrations/003).
+# Las listas se paginan por cursor (keyset): la página siguiente empieza
+# donde terminó la anterior, así que cuesta lo mismo la primera que la
+# número mil, y una fila que entra o sale no corre las demás páginas.
+
+TICKET_COLUMNS = ('id_ticket', 'codigo_ticket', 'nombre_cliente', 'telefono_cliente', 'correo_cliente',
+                  'fecha_entrada', 'fecha_salida', 'estado', 'fecha_creacion', 'mensaje',
+                  'id_habitacion', 'actualizado_en')
+
+ESTADOS_TICKET = ('pendiente', 'en_proceso', 'cerrado', 'cancelado', 'rechazado')
+ESTADOS_ACTIVOS = ('pendiente', 'en_proceso')
+
+# Un cambio entra al feed cuando tiene al menos FEED_SETTLE segundos: para
+# entonces ya terminaron las transacciones que escribieron antes que él, y
+# el cursor no se salta filas que aparecen tarde.
+FEED_SETTLE = 1.0
+MAX_PAGE = 500
+
+SQL_QUEUE_PAGE = f"""
+    SELECT {', '.join(TICKET_COLUMNS)} FROM tickets
+    WHERE estado = ANY(%s) AND (estado, fecha_creacion, id_ticket) > (%s, %s, %s)
+    ORDER BY estado, fecha_creacion, id_ticket
+    LIMIT %s
+"""
+
+SQL_QUEUE_COUNT = "SELECT COUNT(*) FROM tickets WHERE estado = ANY(%s)"
+
+SQL_CHANGES_PAGE = f"""
+    SELECT {', '.join(TICKET_COLUMNS)} FROM tickets
+    WHERE (actualizado_en, id_ticket) > (%s, %s)
+      AND actualizado_en <= now() - make_interval(secs => %s)
+    ORDER BY actualizado_en, id_ticket
+    LIMIT %s
+"""
+
+SQL_LAST_CHANGE = """
+    SELECT actualizado_en, id_ticket FROM tickets
+    WHERE actualizado_en <= now() - make_interval(secs => %s)
+    ORDER BY actualizado_en DESC, id_ticket DESC
+    LIMIT 1
+"""
+
+SQL_UPDATE_STATUS = """
+    UPDATE tickets SET estado = %s
+    WHERE id_ticket = ANY(%s) AND estado <> %s
+    RETURNING id_ticket, codigo_ticket, id_habitacion, fecha_entrada, fecha_salida, estado
+"""
+
+
+def ticket_from_row(row):
+    """Fila de tickets (en el orden de TICKET_COLUMNS) -> dict para JSON"""
+    ticket = dict(zip(TICKET_COLUMNS, row))
+    for key, value in ticket.items():
+        if isinstance(value, (date, datetime)):
+            ticket[key] = value.isoformat()
+    return ticket
+
+
+def encode_cursor(*values):
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, size):
+    """Cursor de la respuesta anterior -> lista de valores (ValueError si no es válido)"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Cursor inválido')
+    return values
+
+
+def fetch_queue(conn, estados=ESTADOS_ACTIVOS, cursor=None, limit=50, with_count=False):
+    """Una página de la cola ordenada por (estado, fecha_creacion, id_ticket)"""
+    estados = [estado for estado in estados if estado in ESTADOS_TICKET]
+    if not estados:
+        raise ValueError('Estado inválido')
+    after = decode_cursor(cursor, 3) if cursor else ['', datetime.min, 0]
+    limit = max(1, min(int(limit), MAX_PAGE))
+
+    cur = conn.cursor()
+    # Una fila de más para saber si hay otra página
+    cur.execute(SQL_QUEUE_PAGE, (estados, *after, limit + 1))
+    rows = cur.fetchall()
+    count = None
+    if with_count:
+        cur.execute(SQL_QUEUE_COUNT, (estados,))
+        count = cur.fetchone()[0]
+    conn.rollback()
+
+    page = {'tickets': [ticket_from_row(row) for row in rows[:limit]], 'next_cursor': None}
+    if len(rows) > limit:
+        last = page['tickets'][-1]
+        page['next_cursor'] = encode_cursor(last['estado'], last['fecha_creacion'], last['id_ticket'])
+    if with_count:
+        page['count'] = count
+    return page
+
+
+def fetch_changes(conn, cursor=None, limit=200, settle=FEED_SETTLE):
+    """Tickets creados o cambiados después del cursor. Sin cursor no trae
+    filas: devuelve el cursor del último cambio para empezar a escuchar."""
+    cur = conn.cursor()
+    if cursor is None:
+        cur.execute(SQL_LAST_CHANGE, (settle,))
+        row = cur.fetchone()
+        conn.rollback()
+        return {'tickets': [], 'cursor': encode_cursor(*(row or (datetime.min, 0))), 'more': False}
+
+    after = decode_cursor(cursor, 2)
+    limit = max(1, min(int(limit), MAX_PAGE))
+    cur.execute(SQL_CHANGES_PAGE, (*after, settle, limit))
+    rows = cur.fetchall()
+    conn.rollback()
+
+    tickets = [ticket_from_row(row) for row in rows]
+    if tickets:
+        cursor = encode_cursor(tickets[-1]['actualizado_en'], tickets[-1]['id_ticket'])
+    return {'tickets': tickets, 'cursor': cursor, 'more': len(rows) == limit}
+
+
+def update_status(conn, ids, estado):
+    """Cambia el estado de varios tickets en una sola sentencia.
+    Devuelve las filas cambiadas (las que ya tenían ese estado no cuentan)."""
+    if estado not in ESTADOS_TICKET:
+        raise ValueError('Estado inválido')
+    ids = sorted({int(id_) for id_ in ids})
+    if not ids:
+        return []
+    cur = conn.cursor()
+    cur.execute(SQL_UPDATE_STATUS, (estado, ids, estado))
+    rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+
+class ChangeFeed:
+    """Aviso de tickets nuevos o cambiados para los long-polls del panel.
+
+    Un solo hilo consulta el último cambio cada `interval` segundos (solo
+    mientras alguien espera) y despierta a todas las peticiones en espera:
+    diez paneles abiertos son una consulta por segundo, no diez.
+    El hilo se crea con la primera espera y de nuevo si el proceso cambió
+    (fork de gunicorn).
+    """
+
+    def __init__(self, pool, interval=1.0, settle=FEED_SETTLE):
+        self.pool = pool
+        self.interval = interval
+        self.settle = settle
+        self._cond = threading.Condition()
+        self._latest = None
+        self._waiters = 0
+        self._pid = None
+        self._stats = {'checks': 0, 'wakeups': 0, 'errors': 0}
+
+    def wait(self, cursor, timeout):
+        """Espera hasta `timeout` segundos a que haya cambios después del
+        cursor de fetch_changes. True si los hay."""
+        since = tuple(decode_cursor(cursor, 2))
+        if self._pid != os.getpid():
+            self._start()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._latest is None or self._latest <= since:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._waiters -= 1
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, waiters=self._waiters)
+
+    def _start(self):
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._waiters = 0
+            threading.Thread(target=self._run, name='ticket-feed', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._waiters:
+                    self._cond.wait()
+            try:
+                with self.pool.connection() as conn:
+                    cur = conn.cursor()
+                    cur.execute(SQL_LAST_CHANGE, (self.settle,))
+                    row = cur.fetchone()
+                    conn.rollback()
+                # Mismo formato que el cursor, para comparar tuplas
+                latest = tuple(decode_cursor(encode_cursor(*row), 2)) if row else None
+                with self._cond:
+                    self._stats['checks'] += 1
+                    if latest != self._latest:
+                        self._latest = latest
+                        self._stats['wakeups'] += 1
+                        self._cond.notify_all()
+            except Exception as e:
+                with self._cond:
+                    self._stats['errors'] += 1
+                print("❌ Error consultando cambios de tickets:", e)
+            time.sleep(self.interval)
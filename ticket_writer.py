@@ -0,0 +1,359 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+import psycopg2
+
+from availability import ESTADOS_LIBRES, ESTADOS_NO_RESERVABLES, to_day
+from db import PoolTimeout
+from metrics import DB_ERRORS, DB_SECONDS
+
+# Escritura diferida (write-behind) de reservas y quejas.
+# Con TICKET_WRITE_BEHIND=1, /enviar-fecha y /enviar-queja guardan el ticket
+# en una cola local (SQLite en modo WAL) y responden enseguida. Un hilo en
+# segundo plano junta lo que llegó en los últimos milisegundos y lo pasa a
+# PostgreSQL con un solo INSERT de varias filas y un solo commit.
+#
+# - Idempotente: cada envío tiene un id_envio único (migrations/004) y el
+#   INSERT usa ON CONFLICT DO NOTHING; si el commit llegó a la base pero la
+#   respuesta se perdió, el reintento no duplica tickets.
+# - Varios procesos pueden compartir el archivo: cada lote se toma con una
+#   reserva temporal (lease) y, si el proceso muere, otro lo reintenta.
+# - Base caída: los tickets esperan en la cola con backoff exponencial.
+#   Una fila que la base rechaza por sí sola (datos inválidos) se aísla y,
+#   tras varios intentos, pasa a "dead" sin frenar a las demás.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticket_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_envio TEXT NOT NULL UNIQUE,
+    tipo TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    reservado_hasta REAL NOT NULL DEFAULT 0,
+    ultimo_error TEXT,
+    creado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ticket_queue_pendientes ON ticket_queue (estado, reservado_hasta, id);
+"""
+
+# tipo -> (prefijo del código, secuencia) como en migrations/001
+TIPOS = {'reserva': ('Res', 'tickets_res_seq'), 'queja': ('QJ', 'tickets_qj_seq')}
+
+# Errores de conexión: la base no está, se reintenta todo el lote más tarde
+OUTAGE_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeout)
+
+# Códigos pedidos por adelantado a las secuencias: la respuesta al huésped
+# trae su código aunque el ticket todavía no esté en PostgreSQL
+SQL_RESERVAR_CODIGOS = "SELECT siguiente_codigo_ticket(%s, %s::regclass) FROM generate_series(1, %s)"
+
+SQL_BLOQUEAR_HABITACIONES = """
+    SELECT id_habitacion FROM habitaciones WHERE id_habitacion = ANY(%s)
+    ORDER BY id_habitacion FOR UPDATE
+"""
+
+FLUSH_COLUMNS = ('codigo', 'prefijo', 'secuencia', 'nombre', 'telefono', 'correo', 'entrada', 'salida',
+                 'estado', 'creado', 'mensaje', 'habitacion', 'id_envio')
+FLUSH_ROW = "(%s, %s, %s, %s, %s, %s, %s::date, %s::date, %s, %s::timestamp, %s, %s::int, %s)"
+
+# Un solo INSERT para todo el lote. Con las habitaciones ya bloqueadas,
+# una reserva cuya habitación tomó otro proceso (o se borró o pasó a
+# mantenimiento) queda sin asignar (id_habitacion NULL) para que el
+# personal la reasigne. Después de las filas van dos parámetros más: los
+# estados no reservables y los estados libres (listas).
+SQL_FLUSH = f"""
+    WITH v ({', '.join(FLUSH_COLUMNS)}) AS (VALUES {{rows}})
+    INSERT INTO tickets (
+        codigo_ticket, nombre_cliente, telefono_cliente, correo_cliente, fecha_entrada, fecha_salida,
+        estado, fecha_creacion, mensaje, id_habitacion, id_envio
+    )
+    SELECT COALESCE(v.codigo, siguiente_codigo_ticket(v.prefijo, v.secuencia::regclass)),
+           v.nombre, v.telefono, v.correo, v.entrada, v.salida, v.estado, v.creado, v.mensaje,
+           CASE WHEN NOT EXISTS (
+               SELECT 1 FROM habitaciones h
+               WHERE h.id_habitacion = v.habitacion
+                 AND COALESCE(h.estado, '') <> ALL(%s)
+           ) OR EXISTS (
+               SELECT 1 FROM tickets t
+               WHERE t.id_habitacion = v.habitacion AND t.estado <> ALL(%s)
+                 AND t.fecha_entrada < v.salida AND t.fecha_salida > v.entrada
+           ) THEN NULL ELSE v.habitacion END,
+           v.id_envio
+    FROM v WHERE true
+    ON CONFLICT (id_envio) DO NOTHING
+    RETURNING id_envio, codigo_ticket, id_habitacion
+"""
+
+
+class TicketWriter:
+    def __init__(self, db_path, pool, on_flushed=None, batch_size=500, window_ms=50,
+                 lease=30.0, max_attempts=8, backoff_base=1.0, backoff_max=30.0, code_stock=200):
+        self.pool = pool
+        self.on_flushed = on_flushed
+        self.batch_size = batch_size
+        self.window = window_ms / 1000
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.code_stock = code_stock
+
+        # Transacciones explícitas: BEGIN IMMEDIATE para tomar lotes entre procesos
+        self._db = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._codes = {tipo: deque() for tipo in TIPOS}
+        self._codes_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._failures = 0
+        self._stats = {'escritos': 0, 'duplicados': 0, 'lotes': 0, 'max_lote': 0,
+                       'caidas': 0, 'ultimo_error': None, 'ultima_escritura': None}
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ticket-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Detiene la escritura y cierra la cola (lo pendiente queda en el archivo)"""
+        self.stop()
+        self._db.close()
+
+    def enqueue(self, tipo, datos, id_envio=None):
+        """Guarda el ticket en la cola local. Devuelve (id_envio, código); el
+        código es None si no quedaban códigos reservados (lo asigna la base)."""
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de ticket desconocido: {tipo}")
+        id_envio = id_envio or uuid.uuid4().hex
+        codigo = self._take_code(tipo)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO ticket_queue (id_envio, tipo, datos, creado) VALUES (?, ?, ?, ?)",
+                (id_envio, tipo, json.dumps(dict(datos, codigo=codigo), default=str), time.time()))
+        self._wakeup.set()
+        return id_envio, codigo
+
+    def stats(self):
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT estado, COUNT(*), MIN(creado) FROM ticket_queue GROUP BY estado").fetchall()
+        counts = {estado: (count, oldest) for estado, count, oldest in rows}
+        pending, oldest = counts.get('pendiente', (0, None))
+        stats = dict(self._stats)
+        stats.update({
+            'pendientes': pending,
+            'dead': counts.get('dead', (0, None))[0],
+            # Antigüedad del ticket más viejo sin escribir en PostgreSQL
+            'lag_s': round(time.time() - oldest, 3) if oldest else 0.0,
+        })
+        with self._codes_lock:
+            stats['codigos_reservados'] = {tipo: len(codes) for tipo, codes in self._codes.items()}
+        return stats
+
+    def dead_letters(self, limit=100):
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id_envio, tipo, datos, intentos, ultimo_error, creado FROM ticket_queue "
+                "WHERE estado = 'dead' ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [{'id_envio': id_envio, 'tipo': tipo, 'datos': json.loads(datos), 'intentos': intentos,
+                 'ultimo_error': error, 'creado': creado}
+                for id_envio, tipo, datos, intentos, error, creado in rows]
+
+    def retry_dead(self):
+        with self._db_lock:
+            cur = self._db.execute(
+                "UPDATE ticket_queue SET estado = 'pendiente', intentos = 0, reservado_hasta = 0 "
+                "WHERE estado = 'dead'")
+        self._wakeup.set()
+        return cur.rowcount
+
+    def flush(self):
+        """Escribe lotes hasta vaciar la cola. Devuelve los tickets escritos;
+        si la base no responde lanza el error (los lotes quedan pendientes)."""
+        total = 0
+        while True:
+            batch = self._claim()
+            if not batch:
+                return total
+            try:
+                total += self._write_batch(batch)
+            except OUTAGE_ERRORS as e:
+                self._release(batch, e)
+                raise
+
+    # ---- códigos reservados ----
+
+    def _take_code(self, tipo):
+        with self._codes_lock:
+            codes = self._codes[tipo]
+            return codes.popleft() if codes else None
+
+    def _refill_codes(self):
+        for tipo, (prefijo, secuencia) in TIPOS.items():
+            with self._codes_lock:
+                missing = self.code_stock - len(self._codes[tipo])
+            if missing < self.code_stock // 2:
+                continue
+            with DB_SECONDS.time('ticket_codes'), self.pool.connection() as conn:
+                cur = conn.cursor()
+                cur.execute(SQL_RESERVAR_CODIGOS, (prefijo, secuencia, missing))
+                codes = [row[0] for row in cur.fetchall()]
+                conn.commit()
+            with self._codes_lock:
+                self._codes[tipo].extend(codes)
+
+    # ---- cola local ----
+
+    def _claim(self):
+        """Toma el siguiente lote (lease de `lease` segundos)"""
+        now = time.time()
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, id_envio, tipo, datos, intentos FROM ticket_queue "
+                    "WHERE estado = 'pendiente' AND reservado_hasta <= ? ORDER BY id LIMIT ?",
+                    (now, self.batch_size)).fetchall()
+                if rows:
+                    self._db.execute(
+                        f"UPDATE ticket_queue SET reservado_hasta = ? WHERE id IN ({', '.join('?' * len(rows))})",
+                        [now + self.lease] + [row[0] for row in rows])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return [(id_, id_envio, tipo, json.loads(datos), intentos) for id_, id_envio, tipo, datos, intentos in rows]
+
+    def _release(self, batch, error, delay=0.0):
+        with self._db_lock:
+            self._db.execute(
+                f"UPDATE ticket_queue SET reservado_hasta = ?, ultimo_error = ? "
+                f"WHERE id IN ({', '.join('?' * len(batch))})",
+                [time.time() + delay, str(error)] + [row[0] for row in batch])
+
+    def _done(self, batch):
+        with self._db_lock:
+            self._db.execute(f"DELETE FROM ticket_queue WHERE id IN ({', '.join('?' * len(batch))})",
+                             [row[0] for row in batch])
+
+    def _failed(self, row, error):
+        id_, _, _, _, intentos = row
+        intentos += 1
+        print("❌ Ticket rechazado por PostgreSQL:", error)
+        with self._db_lock:
+            if intentos >= self.max_attempts:
+                self._db.execute(
+                    "UPDATE ticket_queue SET estado = 'dead', intentos = ?, ultimo_error = ? WHERE id = ?",
+                    (intentos, str(error), id_))
+            else:
+                espera = min(self.backoff_max, self.backoff_base * (2 ** (intentos - 1)))
+                self._db.execute(
+                    "UPDATE ticket_queue SET intentos = ?, reservado_hasta = ?, ultimo_error = ? WHERE id = ?",
+                    (intentos, time.time() + espera, str(error), id_))
+
+    # ---- PostgreSQL ----
+
+    def _write_batch(self, batch):
+        try:
+            written = self._insert(batch)
+        except OUTAGE_ERRORS:
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                self._failed(batch[0], e)
+                return 0
+            # Alguna fila tiene datos que la base no acepta: de a una para aislarla
+            return sum(self._write_batch([row]) for row in batch)
+
+        self._done(batch)
+        self._stats['lotes'] += 1
+        self._stats['max_lote'] = max(self._stats['max_lote'], len(batch))
+        self._stats['escritos'] += len(written)
+        self._stats['duplicados'] += len(batch) - len(written)
+        self._stats['ultima_escritura'] = time.time()
+        if self.on_flushed and written:
+            by_envio = {row[1]: row for row in batch}
+            try:
+                self.on_flushed([{'id_envio': id_envio, 'tipo': by_envio[id_envio][2],
+                                  'datos': by_envio[id_envio][3], 'codigo': codigo, 'habitacion': habitacion}
+                                 for id_envio, codigo, habitacion in written])
+            except Exception as e:
+                print("❌ Error después de escribir tickets:", e)
+        return len(written)
+
+    def _insert(self, batch):
+        params, rooms, taken = [], set(), {}
+        for _, id_envio, tipo, datos, _ in batch:
+            prefijo, secuencia = TIPOS[tipo]
+            room = datos.get('habitacion')
+            if room is not None:
+                # Dos procesos pueden haber dado la misma habitación y sus
+                # reservas caer en el mismo lote: gana la primera
+                start, end = to_day(datos['entrada']), to_day(datos['salida'])
+                if any(s < end and e > start for s, e in taken.get(room, [])):
+                    room = None
+                else:
+                    taken.setdefault(room, []).append((start, end))
+                    rooms.add(room)
+            params.extend((datos.get('codigo'), prefijo, secuencia, datos.get('nombre'), datos.get('telefono'),
+                           datos.get('correo'), datos.get('entrada'), datos.get('salida'),
+                           datos.get('estado', 'pendiente'), datos.get('creado'), datos.get('mensaje'),
+                           room, id_envio))
+
+        with DB_SECONDS.time('ticket_flush'), self.pool.connection() as conn:
+            try:
+                cur = conn.cursor()
+                if rooms:
+                    cur.execute(SQL_BLOQUEAR_HABITACIONES, (sorted(rooms),))
+                cur.execute(SQL_FLUSH.format(rows=', '.join([FLUSH_ROW] * len(batch))),
+                            params + [list(ESTADOS_NO_RESERVABLES), list(ESTADOS_LIBRES)])
+                written = cur.fetchall()
+                conn.commit()
+            except Exception:
+                DB_ERRORS.inc('ticket_flush')
+                conn.rollback()
+                raise
+        return written
+
+    # ---- hilo de escritura ----
+
+    def _run(self):
+        self._wakeup.set()
+        while not self._stop.is_set():
+            # Sin avisos, revisa cada segundo (lotes de otros procesos o leases vencidos)
+            self._wakeup.wait(1.0)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            # Ventana corta para juntar en un lote las peticiones de una ráfaga
+            time.sleep(self.window)
+            try:
+                self.flush()
+                self._refill_codes()
+                self._failures = 0
+            except OUTAGE_ERRORS as e:
+                self._failures += 1
+                self._stats['caidas'] += 1
+                self._stats['ultimo_error'] = str(e)
+                espera = min(self.backoff_max, self.backoff_base * (2 ** (self._failures - 1)))
+                print(f"❌ PostgreSQL no disponible, tickets en cola (reintento en {espera:.0f}s):", e)
+                self._stop.wait(espera)
+            except Exception as e:
+                self._stats['ultimo_error'] = str(e)
+                print("❌ Error escribiendo tickets:", e)
+                self._stop.wait(self.backoff_base)
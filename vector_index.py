@@ -0,0 +1,120 @@
+import math
+import os
+
+import torch
+from sentence_transformers import util
+
+# Backend de búsqueda: "exact" (fuerza bruta) o "ivf" (aproximado)
+VECTOR_INDEX = os.environ.get('VECTOR_INDEX', 'exact')
+
+
+class ExactIndex:
+    """Búsqueda exacta por similitud coseno contra todas las preguntas."""
+
+    def __init__(self, embeddings):
+        # Normalizar una sola vez: cos_sim(q, e) == normalize(q) @ normalize(e).T
+        self.vectors = util.normalize_embeddings(embeddings)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def rebuild(self, embeddings):
+        return ExactIndex(embeddings)
+
+    def search(self, queries, k=1, threshold=None):
+        """Devuelve, por cada consulta, una lista [(índice, score), ...] de
+        los k mejores matches con score >= threshold."""
+        if len(self.vectors) == 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = util.normalize_embeddings(queries) @ self.vectors.T
+        top_scores, top_indexes = torch.topk(scores, min(k, len(self.vectors)), dim=1)
+        return [_filter(row_idx, row_scores, threshold)
+                for row_idx, row_scores in zip(top_indexes.tolist(), top_scores.tolist())]
+
+
+class IVFIndex:
+    """Índice aproximado IVF (inverted file).
+
+    Las preguntas se agrupan con k-means en `nlist` listas; cada consulta
+    solo se compara con las preguntas de las `nprobe` listas más cercanas.
+    """
+
+    def __init__(self, embeddings, nlist=None, nprobe=8, centroids=None, iterations=10):
+        self.vectors = util.normalize_embeddings(embeddings)
+        self.nprobe = nprobe
+
+        if centroids is None:
+            nlist = nlist or max(1, int(math.sqrt(len(self.vectors))))
+            centroids = _kmeans(self.vectors, nlist, iterations)
+        self.centroids = centroids
+
+        # Listas invertidas guardadas como un solo tensor ordenado por cluster
+        if len(self.vectors):
+            assign = torch.argmax(self.vectors @ self.centroids.T, dim=1)
+        else:
+            assign = torch.empty(0, dtype=torch.long)
+        self.order = torch.argsort(assign)
+        counts = torch.bincount(assign, minlength=len(self.centroids))
+        self.offsets = [0] + torch.cumsum(counts, dim=0).tolist()
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def rebuild(self, embeddings):
+        """Reasigna las filas reutilizando los centroides ya entrenados"""
+        if len(self.centroids) == 0:
+            return IVFIndex(embeddings, nprobe=self.nprobe)
+        return IVFIndex(embeddings, nprobe=self.nprobe, centroids=self.centroids)
+
+    def search(self, queries, k=1, threshold=None):
+        if len(self.vectors) == 0:
+            return [[] for _ in range(len(queries))]
+
+        queries = util.normalize_embeddings(queries)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = torch.topk(queries @ self.centroids.T, nprobe, dim=1).indices.tolist()
+
+        results = []
+        for query, clusters in zip(queries, probes):
+            candidates = torch.cat([self.order[self.offsets[c]:self.offsets[c + 1]] for c in clusters])
+            if len(candidates) == 0:
+                # Las listas más cercanas están vacías: búsqueda exacta
+                candidates = torch.arange(len(self.vectors))
+            scores = self.vectors[candidates] @ query
+            top_scores, top_pos = torch.topk(scores, min(k, len(candidates)))
+            results.append(_filter(candidates[top_pos].tolist(), top_scores.tolist(), threshold))
+        return results
+
+
+def _filter(indexes, scores, threshold):
+    return [(i, s) for i, s in zip(indexes, scores) if threshold is None or s >= threshold]
+
+
+def _kmeans(vectors, nlist, iterations):
+    if len(vectors) == 0:
+        return vectors[:0]
+
+    # Entrenar con una muestra: con 100k filas no hace falta usarlas todas
+    generator = torch.Generator().manual_seed(0)
+    sample = vectors[torch.randperm(len(vectors), generator=generator)[:max(nlist * 64, 1)]]
+    nlist = min(nlist, len(sample))
+    centroids = sample[:nlist].clone()
+
+    for _ in range(iterations):
+        assign = torch.argmax(sample @ centroids.T, dim=1)
+        sums = torch.zeros_like(centroids).index_add_(0, assign, sample)
+        counts = torch.bincount(assign, minlength=nlist)
+        # Los clusters vacíos conservan su centroide anterior
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled].unsqueeze(1)
+        centroids = util.normalize_embeddings(centroids)
+    return centroids
+
+
+def make_vector_index(embeddings, kind=VECTOR_INDEX):
+    if kind == 'exact':
+        return ExactIndex(embeddings)
+    if kind == 'ivf':
+        return IVFIndex(embeddings)
+    raise ValueError(f"Backend de índice desconocido: {kind}")